@@ -0,0 +1,79 @@
+# benchmarks/bench_archive.py
+"""
+Re-syncing a channel against the download archive: how fast already-fetched
+videos are recognised and new ones let through, with no network access.
+
+Records --known videos of a synthetic YouTube channel, then checks --known +
+--new entry URLs the way download_video does (URL -> extractor/ID -> archive).
+Exits with status 1 if any video is misclassified.
+
+Usage: python -m benchmarks.bench_archive [--known 10000] [--new 200]
+"""
+import argparse
+import os
+import string
+import sys
+import tempfile
+import time
+
+from src.video_downloader.archive import DownloadArchive, archive_key
+from src.video_downloader.downloader import url_archive_id
+
+ALPHABET = string.ascii_letters + string.digits + "-_"
+
+
+def video_id(index):
+    """A deterministic 11-character YouTube-style ID."""
+    chars = []
+    for _ in range(11):
+        index, digit = divmod(index * 7919 + 17, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return "".join(chars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--known", type=int, default=10000)
+    parser.add_argument("--new", type=int, default=200)
+    args = parser.parse_args()
+
+    ids = list(dict.fromkeys(video_id(index) for index in range(args.known + args.new)))
+    known, new = ids[:args.known], ids[args.known:]
+    new_ids = set(new)
+    url_archive_id("https://www.youtube.com/watch?v=warmupxxxxx")  # import yt-dlp extractors
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        archive = DownloadArchive(os.path.join(tmpdir, "archive.sqlite3"))
+        start = time.perf_counter()
+        archive.add_many((archive_key("Youtube", vid, "mp4", "1080"), None, None) for vid in known)
+        record_ms = (time.perf_counter() - start) * 1000
+        archive.close()
+
+        start = time.perf_counter()
+        archive = DownloadArchive(os.path.join(tmpdir, "archive.sqlite3"))
+        open_ms = (time.perf_counter() - start) * 1000
+
+        wrong = 0
+        to_fetch = 0
+        start = time.perf_counter()
+        for vid in known + new:
+            video = url_archive_id(f"https://www.youtube.com/watch?v={vid}")
+            fetched = video is not None and archive.contains(archive_key(*video, "mp4", "1080"))
+            to_fetch += not fetched
+            wrong += fetched != (vid not in new_ids)
+        check_ms = (time.perf_counter() - start) * 1000
+        stats = archive.stats()
+        archive.close()
+
+    total = len(known) + len(new)
+    print(f"recorded {len(known)} videos in {record_ms:.0f} ms; reopened (bloom rebuilt) in {open_ms:.0f} ms")
+    print(f"checked {total} entries in {check_ms:.0f} ms ({check_ms * 1000 / total:.1f} µs each): "
+          f"{to_fetch} to fetch, {stats['bloom_negatives']} answered by the bloom filter, "
+          f"{stats['db_lookups']} database lookups")
+    if wrong:
+        print(f"{wrong} videos misclassified!")
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
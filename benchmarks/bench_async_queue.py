@@ -0,0 +1,75 @@
+# benchmarks/bench_async_queue.py
+"""
+Cost of tracking many downloads through AsyncDownloadQueueManager.
+
+Queues --tasks short downloads from a coroutine, awaits all their handles and
+reports the time per task, the memory per tracked handle (tracemalloc) and the
+peak thread count. Exits with status 1 if the thread count grows with the
+number of tasks or a handle does not resolve.
+
+Usage: python -m benchmarks.bench_async_queue [--tasks 10000] [--workers 8]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import sys
+import threading
+import time
+import tracemalloc
+
+from src.video_downloader.async_queue import AsyncDownloadQueueManager
+
+
+def download(url, progress_hooks=(), **options):
+    for done in (0, 512, 1024):
+        for hook in progress_hooks:
+            hook({"status": "downloading", "filename": url, "downloaded_bytes": done,
+                  "total_bytes": 1024, "info_dict": {}})
+
+
+async def run(task_count, workers):
+    peak_threads = threading.active_count()
+    release = threading.Event()
+
+    def gated(url, **options):
+        release.wait()
+        download(url, **options)
+
+    async with AsyncDownloadQueueManager(gated, max_workers=workers) as queue:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        handles = [queue.add_download(f"https://example.com/{index}", {}) for index in range(task_count)]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        per_handle = sum(stat.size_diff for stat in after.compare_to(before, "filename")) / task_count
+
+        start = time.perf_counter()
+        release.set()
+        pending = set(asyncio.ensure_future(handle) for handle in handles)
+        while pending:
+            _, pending = await asyncio.wait(pending, timeout=0.05)
+            peak_threads = max(peak_threads, threading.active_count())
+        elapsed = time.perf_counter() - start
+        resolved = sum(handle.done() for handle in handles)
+    return per_handle, elapsed, peak_threads, resolved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        per_handle, elapsed, peak_threads, resolved = asyncio.run(run(args.tasks, args.workers))
+    print(f"{args.tasks} tasks on {args.workers} workers: {elapsed * 1e6 / args.tasks:.0f} µs/task, "
+          f"{per_handle:.0f} bytes/tracked task, peak {peak_threads} threads, {resolved} resolved")
+
+    # Workers, the progress batcher, the main thread and the executor used by aclose
+    failed = peak_threads > args.workers + 4 or resolved != args.tasks
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# benchmarks/bench_autoscale.py
+"""
+WorkerAutoscaler against a local bandwidth-limited stand-in server.
+
+Scenario "bandwidth": every connection is capped at --connection-kb KiB/s and
+the server at --bandwidth-kb KiB/s in total, so about bandwidth/connection
+workers fill the pipe. Downloads --files files with a fixed pool of 3 workers
+and with the autoscaler (1..16 workers) and prints the decisions.
+
+Scenario "throttled": the server answers HTTP 429 beyond --max-connections
+concurrent requests; the autoscaler has to back off. Refused tasks are
+retried after a short back-off (RetryPolicy with a 1 s throttle delay).
+
+Exits with status 1 if the autoscaler is not faster than 3 fixed workers in
+the first scenario or never backs off in the second.
+
+Usage: python -m benchmarks.bench_autoscale [--files 80]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.media_server import LocalMediaServer
+from src.video_downloader.archive import set_download_archive
+from src.video_downloader.autoscale import WorkerAutoscaler
+from src.video_downloader.downloader import download_video
+from src.video_downloader.queue_manager import DownloadQueueManager
+from src.video_downloader.retry import RetryPolicy
+
+
+def run(server, urls, workers, autoscale, interval):
+    manager = DownloadQueueManager(download_video, max_workers=workers,
+                                   retry_policy=RetryPolicy(throttle_delay=1.0, failure_threshold=0))
+    scaler = None
+    if autoscale:
+        scaler = WorkerAutoscaler(manager, min_workers=1, max_workers=16, interval=interval, hold=4)
+    peak = workers
+    with tempfile.TemporaryDirectory() as out:
+        options = {"output_path": os.path.join(out, "%(title)s.%(ext)s"), "organize_folders": False,
+                   "use_archive": False}
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            if scaler is not None:
+                scaler.start()
+            for url in urls:
+                manager.add_download(url, options)
+            while not manager.wait_until_idle(0.1):
+                peak = max(peak, manager.max_workers)
+            if scaler is not None:
+                scaler.stop()
+            manager.stop_processing()
+        elapsed = time.perf_counter() - start
+    info = manager.get_queue_info()
+    decisions = list(scaler.decisions) if scaler is not None else []
+    return elapsed, info, decisions, peak
+
+
+def describe(decisions):
+    for decision in decisions:
+        print(f"    {decision.workers_before:>2} -> {decision.workers:<2} {decision.reason:<9} "
+              f"{decision.rate / 1024:7.0f} KiB/s  failed {decision.failed}  throttled {decision.throttled}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=80)
+    parser.add_argument("--file-kb", type=int, default=96)
+    parser.add_argument("--connection-kb", type=int, default=128)
+    parser.add_argument("--bandwidth-kb", type=int, default=1024)
+    parser.add_argument("--max-connections", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args()
+    set_download_archive(None)
+    failed = False
+
+    with LocalMediaServer(bandwidth=args.bandwidth_kb * 1024,
+                          connection_rate=args.connection_kb * 1024) as server:
+        urls = [server.add_file(f"clip{index}.mp4", args.file_kb * 1024) for index in range(args.files)]
+        fixed, _, _, _ = run(server, urls, 3, False, args.interval)
+        auto, info, decisions, peak = run(server, urls, 1, True, args.interval)
+    print(f"bandwidth: {args.files} x {args.file_kb} KiB, {args.connection_kb} KiB/s per connection, "
+          f"{args.bandwidth_kb} KiB/s total")
+    print(f"  3 fixed workers {fixed:.2f} s, autoscaled {auto:.2f} s (peak {peak} workers, "
+          f"{info['completed_total']} completed)")
+    describe(decisions)
+    failed |= auto >= fixed
+
+    with LocalMediaServer(connection_rate=args.connection_kb * 1024,
+                          max_connections=args.max_connections) as server:
+        urls = [server.add_file(f"clip{index}.mp4", args.file_kb * 1024) for index in range(args.files)]
+        _, info, decisions, peak = run(server, urls, 1, True, args.interval)
+    print(f"throttled: HTTP 429 beyond {args.max_connections} connections")
+    print(f"  peak {peak} workers, {info['completed_total']} completed, {info['failed_total']} failed")
+    describe(decisions)
+    failed |= not any(decision.reason in ("throttled", "errors") for decision in decisions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# benchmarks/bench_fragments.py
+"""
+Adaptive fragment concurrency against a local HLS stand-in with injected latency.
+
+Serves an HLS stream of --fragments fragments from LocalMediaServer, delaying
+every response by --latency seconds, and downloads it with download_video:
+once one fragment at a time, then --runs times with fragment_concurrency="auto"
+(the level ramps up from run to run), then once more while the server answers
+fragment requests with HTTP 429. Exits with status 1 if the tuned runs are not
+at least twice as fast as the sequential one or the level does not back off
+after the 429s.
+
+Usage: python -m benchmarks.bench_fragments [--fragments 80] [--latency 0.05]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.media_server import LocalMediaServer
+from src.video_downloader.archive import set_download_archive
+from src.video_downloader.downloader import download_video
+from src.video_downloader.fragments import FragmentConcurrency, set_fragment_concurrency
+from src.video_downloader.scheduler import host_of
+
+
+def timed_download(url, fragment_concurrency):
+    with tempfile.TemporaryDirectory() as out:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            download_video(url, os.path.join(out, "%(title)s.%(ext)s"), organize_folders=False,
+                           use_archive=False, fragment_concurrency=fragment_concurrency)
+        elapsed = time.perf_counter() - start
+        if not os.listdir(out):
+            raise RuntimeError(f"nothing downloaded from {url}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fragments", type=int, default=80)
+    parser.add_argument("--fragment-kb", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--runs", type=int, default=6)
+    args = parser.parse_args()
+
+    set_download_archive(None)
+    concurrency = FragmentConcurrency()
+    set_fragment_concurrency(concurrency)
+    with LocalMediaServer(latency=args.latency) as server:
+        url = server.add_hls("stream", args.fragments, args.fragment_kb * 1024)
+        host = host_of(url)
+
+        sequential = timed_download(url, 1)
+        print(f"{args.fragments} fragments, {args.latency * 1000:.0f} ms latency: "
+              f"1 at a time {sequential:.2f} s")
+        tuned = []
+        for run in range(args.runs):
+            level = concurrency.level(host)
+            tuned.append(timed_download(url, "auto"))
+            print(f"  auto run {run + 1}: level {level:>2} -> {tuned[-1]:.2f} s")
+
+        before = concurrency.level(host)
+        server.throttle(3)
+        throttled = timed_download(url, "auto")
+        after = concurrency.level(host)
+        print(f"  with 3 x HTTP 429: level {before} -> {after}, {throttled:.2f} s")
+
+    best = min(tuned[-3:])
+    print(f"speed-up at the tuned level: {sequential / best:.1f}x")
+    return 1 if sequential < 2 * best or after >= before else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
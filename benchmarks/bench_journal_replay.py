@@ -0,0 +1,63 @@
+# benchmarks/bench_journal_replay.py
+"""
+Time to rebuild a DownloadQueueManager from a journal of many tasks.
+
+Usage: python -m benchmarks.bench_journal_replay [--tasks 100000] [--playlist-size 500]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+import uuid
+
+from src.video_downloader.journal import TaskJournal
+from src.video_downloader.queue_manager import DownloadQueueManager, DownloadStatus, DownloadTask
+
+
+def build_journal(path, count, playlist_size):
+    """Journal `count` tasks grouped into playlists, about half of them already finished."""
+    journal = TaskJournal(path)
+    options = {"output_path": "/downloads/%(title)s.%(ext)s", "file_format": "mp4", "resolution": "1080"}
+    batch = []
+    for start in range(0, count, playlist_size):
+        parent = DownloadTask(
+            id=str(uuid.uuid4()), url=f"https://example.com/playlist/{start}",
+            options=dict(options, is_playlist=True), status=DownloadStatus.DOWNLOADING,
+        )
+        batch.append(parent)
+        for index in range(start, min(start + playlist_size, count)):
+            batch.append(DownloadTask(
+                id=str(uuid.uuid4()), url=f"https://example.com/watch/{index}",
+                options=options, parent_id=parent.id,
+                status=DownloadStatus.COMPLETED if index % 2 else DownloadStatus.PENDING,
+            ))
+    journal.record_many(batch)
+    return journal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--playlist-size", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "queue.sqlite3")
+        build_journal(path, args.tasks, args.playlist_size).close()
+
+        journal = TaskJournal(path)
+        manager = DownloadQueueManager(lambda url, **options: None, journal=journal)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            resumed = manager.restore_from_journal()
+        elapsed = time.perf_counter() - start
+        journal.close()
+
+    print(f"replayed {len(manager.active_tasks)} tasks ({len(resumed)} playlists to resume) "
+          f"in {elapsed * 1000:.0f} ms, {manager.task_queue.qsize()} entries requeued")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# benchmarks/bench_metrics.py
+"""
+Cost and correctness of the metrics surface.
+
+Times get_metrics() plus Prometheus rendering on a 100k-task queue (it must
+not grow with the queue), then runs a short batch of simulated downloads (some
+retried, some failing) while scraping /metrics from a MetricsServer, and
+checks every scrape: each sample belongs to a family declared with HELP and
+TYPE, no series is labelled per task (unbounded cardinality), histogram buckets are cumulative and end in +Inf equal to _count, and
+the final counters match the run. Exits with status 1 on any mismatch or if
+the median get_metrics() + render takes longer than --max-ms.
+
+Usage: python -m benchmarks.bench_metrics [--tasks 100000]
+"""
+import argparse
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from benchmarks.bench_journal_replay import build_journal
+from src.video_downloader.journal import TaskJournal
+from src.video_downloader.metrics import MetricsServer, render_prometheus
+from src.video_downloader.queue_manager import DownloadQueueManager
+from src.video_downloader.retry import RetryPolicy
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(?:[a-zA-Z_][a-zA-Z0-9_]*="(?:[^"\\]|\\.)*",?)*\})? (\S+)$')
+
+
+def check_exposition(text):
+    """Problems found in a Prometheus text exposition (empty list: valid)."""
+    problems = []
+    declared = {}  # family -> type
+    buckets = {}  # (family, labels without le) -> [cumulative counts]
+    counts = {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ", 3)
+            declared[name] = kind
+            continue
+        if line.startswith("#") or not line:
+            continue
+        match = _SAMPLE.match(line)
+        if match is None:
+            problems.append(f"malformed: {line}")
+            continue
+        name, labels, value = match.group(1), match.group(2) or "", match.group(3)
+        family = re.sub(r"_(bucket|sum|count)$", "", name) if name not in declared else name
+        if family not in declared:
+            problems.append(f"undeclared: {name}")
+        if 'task="' in labels:
+            problems.append(f"unbounded per-task label: {line}")
+        try:
+            float(value)
+        except ValueError:
+            problems.append(f"bad value: {line}")
+        if name.endswith("_bucket"):
+            key = (family, re.sub(r',?le="[^"]*"', "", labels).replace("{,", "{").replace("{}", ""))
+            buckets.setdefault(key, []).append(float(value))
+        elif name.endswith("_count") and declared.get(family) == "histogram":
+            counts[(family, labels)] = float(value)
+    for key, values in buckets.items():
+        if values != sorted(values):
+            problems.append(f"buckets not cumulative: {key}")
+        if counts.get(key) != values[-1]:
+            problems.append(f"+Inf bucket != _count: {key}")
+    return problems
+
+
+def bench_scrape(count):
+    """Median get_metrics + render time (µs) with `count` journaled tasks loaded."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "queue.sqlite3")
+        build_journal(path, count, 500).close()
+        journal = TaskJournal(path)
+        manager = DownloadQueueManager(lambda url, **options: None, journal=journal)
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager.restore_from_journal()
+        journal.close()
+    timings = []
+    for _ in range(200):
+        start = time.perf_counter()
+        render_prometheus(manager.get_metrics())
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return len(manager.active_tasks), timings[len(timings) // 2] * 1e6
+
+
+def simulated_download(url, progress_hooks=(), **options):
+    """Extraction, then 8 chunks, failing as the URL asks."""
+    if "flaky" in url and not getattr(simulated_download, url, False):
+        setattr(simulated_download, url, True)
+        raise Exception("HTTP Error 503: Service Unavailable")
+    if "missing" in url:
+        raise Exception("HTTP Error 404: Not Found")
+    time.sleep(0.02)
+    for chunk in range(1, 9):
+        time.sleep(0.01)
+        for hook in progress_hooks:
+            hook({"status": "downloading", "filename": url, "downloaded_bytes": chunk * 64 * 1024,
+                  "total_bytes": 512 * 1024, "speed": 6.4e6, "info_dict": {}})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--downloads", type=int, default=200)
+    parser.add_argument("--max-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    tasks, median_us = bench_scrape(args.tasks)
+    print(f"get_metrics + render with {tasks} tasks: {median_us:.0f} µs median")
+    failed = median_us / 1000 > args.max_ms
+
+    urls = []
+    for index in range(args.downloads):
+        kind = "flaky" if index % 10 == 0 else "missing" if index % 25 == 1 else "ok"
+        urls.append(f"https://example.com/{kind}/{index}")
+    manager = DownloadQueueManager(simulated_download, max_workers=8,
+                                   retry_policy=RetryPolicy(base_delay=0.05, failure_threshold=0))
+    problems, scrapes, slowest = [], 0, 0.0
+    with MetricsServer(manager, port=0) as server, contextlib.redirect_stdout(io.StringIO()), \
+            contextlib.redirect_stderr(io.StringIO()):
+        stop = threading.Event()
+
+        def scrape():
+            nonlocal scrapes, slowest
+            while not stop.is_set():
+                start = time.perf_counter()
+                text = urllib.request.urlopen(server.url).read().decode()
+                slowest = max(slowest, time.perf_counter() - start)
+                problems.extend(check_exposition(text))
+                scrapes += 1
+                time.sleep(0.02)
+
+        scraper = threading.Thread(target=scrape)
+        scraper.start()
+        for url in urls:
+            manager.add_download(url, {})
+        manager.wait_until_idle(60)
+        stop.set()
+        scraper.join()
+        final = urllib.request.urlopen(server.url).read().decode()
+        manager.stop_processing()
+    problems.extend(check_exposition(final))
+
+    snapshot = manager.get_metrics()
+    flaky = sum("flaky" in url for url in urls)
+    missing = sum("missing" in url for url in urls)
+    expected = {
+        "completed_total": len(urls) - missing,
+        "failures": {"permanent": missing},
+        "retries": {"transient": flaky},
+        "extract/download observations": len(urls) - missing,
+    }
+    actual = {
+        "completed_total": snapshot["completed_total"],
+        "failures": snapshot["failures"],
+        "retries": snapshot["retries"],
+        "extract/download observations": snapshot["stage_durations"]["download"]["count"],
+    }
+    print(f"{len(urls)} simulated downloads, {scrapes} scrapes (slowest {slowest * 1000:.1f} ms), "
+          f"{len(problems)} exposition problems")
+    print(f"  {actual}")
+    print(f"  download utilisation over the run: "
+          f"{snapshot['workers']['download']['busy_seconds']:.2f} busy worker-seconds")
+    for problem in problems[:10]:
+        print(f"  {problem}")
+    failed |= bool(problems) or actual != expected or scrapes == 0
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
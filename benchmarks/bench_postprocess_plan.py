@@ -0,0 +1,101 @@
+# benchmarks/bench_postprocess_plan.py
+"""
+I/O saved by planning post-processing per file instead of a fixed ffmpeg chain.
+
+Writes local sample files standing in for typical fetch results (merged and
+progressive MP4, M4V, WebM, MP3 and M4A audio) and compares, per file, the
+fixed chain download_video used to register (FFmpegVideoRemuxer for every MP4
+download, FFmpegExtractAudio for every MP3 one, each skipped by yt-dlp only
+when the extension already matches) with the steps plan_postprocessing picks.
+Bytes rewritten counts one full read and write of the file per ffmpeg pass.
+The planned jobs that need no ffmpeg are run on the samples and timed.
+Exits with status 1 if the plan rewrites more than the fixed chain, schedules
+ffmpeg for a file already in its target format, or a job fails.
+
+Usage: python -m benchmarks.bench_postprocess_plan [--size-mb 64]
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from src.video_downloader.postprocess import PostProcessJob, plan_postprocessing
+
+# (file name, target format, vcodec, acodec)
+SAMPLES = [
+    ("merged.mp4", "mp4", "avc1.64001F", "mp4a.40.2"),
+    ("progressive.mp4", "mp4", "avc1.42001E", "mp4a.40.2"),
+    ("apple.m4v", "mp4", "avc1.4D401F", "mp4a.40.2"),
+    ("fallback.webm", "mp4", "vp09.00.40.08", "opus"),
+    ("legacy.webm", "mp4", "vp8", "vorbis"),
+    ("podcast.mp3", "mp3", "none", "mp3"),
+    ("music.m4a", "mp3", "none", "mp4a.40.2"),
+]
+FFMPEG_FREE = ("Rename",)
+
+
+def fixed_chain_passes(ext, file_format):
+    """Full ffmpeg passes the old fixed chain ran on a file."""
+    target = "mp3" if file_format == "mp3" else "mp4"
+    return 0 if ext == target else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=64, help="size of each sample file")
+    args = parser.parse_args()
+    size = args.size_mb * 1024 * 1024
+
+    failed = False
+    fixed_bytes = planned_bytes = 0
+    run_seconds = 0.0
+    workdir = tempfile.mkdtemp(prefix="vd-plan-")
+    try:
+        chunk = os.urandom(1024 * 1024)
+        print(f"{'file':<18}{'fixed chain':<28}{'planned':<24}")
+        for name, file_format, vcodec, acodec in SAMPLES:
+            path = os.path.join(workdir, name)
+            with open(path, "wb") as f:
+                for _ in range(args.size_mb):
+                    f.write(chunk)
+            ext = os.path.splitext(name)[1][1:]
+            info = {"filepath": path, "ext": ext, "vcodec": vcodec, "acodec": acodec, "title": name}
+
+            fixed = "FFmpegExtractAudio" if file_format == "mp3" else "FFmpegVideoRemuxer"
+            fixed_passes = fixed_chain_passes(ext, file_format)
+            steps = [pp["key"] for pp in plan_postprocessing(info, file_format)]
+            planned_passes = sum(step not in FFMPEG_FREE for step in steps)
+            fixed_bytes += 2 * size * fixed_passes
+            planned_bytes += 2 * size * planned_passes
+            print(f"{name:<18}{fixed + (' (pass)' if fixed_passes else ' (skip)'):<28}"
+                  f"{', '.join(steps) or '-':<24}")
+
+            if planned_passes and ext == ("mp3" if file_format == "mp3" else "mp4"):
+                print(f"  ffmpeg planned for {name}, which is already {file_format}")
+                failed = True
+            if planned_passes == 0:
+                job = PostProcessJob([info], file_format)
+                start = time.perf_counter()
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        job.run()
+                except Exception as e:
+                    print(f"  post-processing {name} failed: {e}")
+                    failed = True
+                run_seconds += time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    saved = fixed_bytes - planned_bytes
+    print(f"bytes rewritten by ffmpeg: fixed {fixed_bytes / 2 ** 20:.0f} MiB, "
+          f"planned {planned_bytes / 2 ** 20:.0f} MiB, saved {saved / 2 ** 20:.0f} MiB")
+    print(f"ffmpeg-free jobs ran in {run_seconds * 1000:.1f} ms")
+    return 1 if failed or planned_bytes > fixed_bytes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
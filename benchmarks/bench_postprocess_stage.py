@@ -0,0 +1,89 @@
+# benchmarks/bench_postprocess_stage.py
+"""
+Throughput of downloads followed by CPU-bound post-processing, inline vs staged.
+
+Each simulated download waits --fetch seconds (network) and then needs a
+CPU-bound subprocess of --process seconds, standing in for ffmpeg. Runs the
+batch once with post-processing inside the download workers and once with a
+separate post-processing pool, and reports wall time and the per-stage
+timings. Exits with status 1 if the staged run is not faster.
+
+Usage: python -m benchmarks.bench_postprocess_stage [--tasks 16] [--workers 2]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from src.video_downloader.queue_manager import DownloadQueueManager
+
+
+class BusyJob:
+    """A post-processing job that keeps one CPU busy in a child process."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def run(self):
+        code = f"import time\nend = time.perf_counter() + {self.seconds}\nwhile time.perf_counter() < end: pass"
+        subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def make_download(fetch, process):
+    def download(url, defer_postprocessing=False, **options):
+        time.sleep(fetch)
+        job = BusyJob(process)
+        if not defer_postprocessing:
+            job.run()
+            return None
+        return job
+    return download
+
+
+def run(task_count, workers, postprocess_workers, fetch, process):
+    manager = DownloadQueueManager(
+        make_download(fetch, process), max_workers=workers, postprocess_workers=postprocess_workers
+    )
+    start = time.perf_counter()
+    for index in range(task_count):
+        manager.add_download(f"https://example.com/{index}", {})
+    manager.wait_until_idle(300)
+    elapsed = time.perf_counter() - start
+    manager.stop_processing()
+    tasks = list(manager.get_all_tasks().values())
+    return elapsed, tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--postprocess-workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--fetch", type=float, default=0.3)
+    parser.add_argument("--process", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        inline, inline_tasks = run(args.tasks, args.workers, 0, args.fetch, args.process)
+        staged, staged_tasks = run(args.tasks, args.workers, args.postprocess_workers,
+                                   args.fetch, args.process)
+
+    print(f"{args.tasks} tasks, {args.workers} download workers: inline {inline:.2f} s")
+    print(f"  + {args.postprocess_workers} post-processing workers: staged {staged:.2f} s "
+          f"({inline / staged:.1f}x)")
+    for stage in ("fetch", "handoff", "postprocess"):
+        values = [task.stage_times[stage] for task in staged_tasks if task.stage_times]
+        if values:
+            print(f"  {stage:<11} median {statistics.median(values) * 1000:.0f} ms, "
+                  f"max {max(values) * 1000:.0f} ms")
+
+    unfinished = [task for task in inline_tasks + staged_tasks if task.status.value != "completed"]
+    return 1 if unfinished or staged >= inline else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
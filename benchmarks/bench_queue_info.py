@@ -0,0 +1,195 @@
+# benchmarks/bench_queue_info.py
+"""
+Cost of DownloadQueueManager.get_queue_info on a large queue, plus a stress run
+that checks its counters against a full recount.
+
+The stress run adds, cancels (queued and running), reprioritises and clears
+tasks from several threads while workers complete and fail downloads (some of
+them playlists that fan out into entries). Exits with status 1 if the counters ever disagree with
+the tasks they describe.
+
+Usage: python -m benchmarks.bench_queue_info [--tasks 100000] [--stress-tasks 3000]
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_journal_replay import build_journal
+from src.video_downloader.journal import TaskJournal
+from src.video_downloader.queue_manager import DownloadQueueManager, DownloadStatus
+
+STATUS_KEYS = {
+    DownloadStatus.PENDING: "pending",
+    DownloadStatus.DOWNLOADING: "downloading",
+    DownloadStatus.POSTPROCESSING: "postprocessing",
+    DownloadStatus.COMPLETED: "completed",
+    DownloadStatus.FAILED: "failed",
+    DownloadStatus.CANCELLED: "cancelled",
+}
+
+
+def bench_lookup(count):
+    """Median get_queue_info time with `count` journaled tasks loaded."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "queue.sqlite3")
+        build_journal(path, count, 500).close()
+        journal = TaskJournal(path)
+        manager = DownloadQueueManager(lambda url, **options: None, journal=journal)
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager.restore_from_journal()
+        journal.close()
+
+    timings = []
+    for _ in range(1000):
+        start = time.perf_counter()
+        manager.get_queue_info()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return len(manager.active_tasks), timings[len(timings) // 2] * 1e6
+
+
+def recount(manager):
+    """Counters computed from scratch, taken atomically with the manager's own."""
+    with manager.lock:
+        expected = {key: 0 for key in (*STATUS_KEYS.values(), "playlists")}
+        downloaded = expected_bytes = 0
+        for task in manager.active_tasks.values():
+            # Running playlists are reported apart from downloads
+            if task.child_ids and task.status == DownloadStatus.DOWNLOADING:
+                expected["playlists"] += 1
+            else:
+                expected[STATUS_KEYS[task.status]] += 1
+            downloaded += task.downloaded_bytes
+            expected_bytes += task.total_bytes
+        expected.update(total=len(manager.active_tasks), bytes_downloaded=downloaded,
+                        bytes_expected=expected_bytes)
+        counts = manager._status_counts
+        actual = {key: counts[status] for status, key in STATUS_KEYS.items()}
+        actual["downloading"] -= manager._playlists_running
+        actual.update(playlists=manager._playlists_running,
+                      total=len(manager.active_tasks), bytes_downloaded=manager._bytes_downloaded,
+                      bytes_expected=manager._bytes_expected)
+    return expected, actual
+
+
+def stress(task_count, workers, seed):
+    rng = random.Random(seed)
+
+    def download(url, progress_hooks=(), **options):
+        size = 1000 + int(url.rsplit("/", 1)[1]) % 5000
+        for name in ("video", "audio"):
+            for done in range(0, size + 1, size // 4):
+                for hook in progress_hooks:
+                    hook({"status": "downloading", "filename": f"{url}.{name}",
+                          "downloaded_bytes": done, "total_bytes": size, "info_dict": {}})
+            time.sleep(random.random() * 0.01)
+        if random.random() < 0.2:
+            raise RuntimeError("simulated failure")
+
+    def expander(url):
+        if "/playlist/" not in url:
+            return []
+        base = int(url.rsplit("/", 1)[1]) * 100
+        return [{"url": f"https://example.com/watch/{base + i}", "index": i + 1} for i in range(5)]
+
+    manager = DownloadQueueManager(download, max_workers=workers, playlist_expander=expander,
+                                   max_per_host=None)
+    adding = threading.Event()
+    problems = []
+
+    def add_tasks():
+        for index in range(task_count):
+            kind = "playlist" if index % 10 == 0 else "watch"
+            manager.add_download(f"https://example.com/{kind}/{index}",
+                                 {"is_playlist": kind == "playlist"},
+                                 priority=rng.randint(0, 3))
+        adding.set()
+
+    def meddle():
+        local = random.Random(seed + 1)
+        task_ids = []
+        for step in itertools.count():
+            if adding.is_set() and not manager.get_queue_info()["pending"]:
+                break
+            if step % 50 == 0:
+                # Playlist entries appear as their playlists are expanded
+                task_ids = list(manager.get_all_tasks())
+            task_id = local.choice(task_ids) if task_ids else None
+            if task_id is not None:
+                roll = local.random()
+                if roll < 0.3:
+                    manager.remove_download(task_id)
+                elif roll < 0.5:
+                    # Also interrupts running downloads and whole playlists
+                    manager.cancel_download(task_id)
+                else:
+                    manager.set_priority(task_id, local.randint(0, 5))
+            if local.random() < 0.01:
+                manager.clear_completed()
+            time.sleep(0.0002)
+
+    def check():
+        while not finished.is_set():
+            info = manager.get_queue_info()
+            keys = [*STATUS_KEYS.values(), "playlists"]
+            counted = sum(info[key] for key in keys)
+            if counted != info["total"] or min(info[key] for key in keys) < 0:
+                problems.append(("inconsistent snapshot", info))
+            expected, actual = recount(manager)
+            if expected != actual:
+                problems.append(("counter drift", expected, actual))
+            time.sleep(0.001)
+
+    finished = threading.Event()
+    threads = [threading.Thread(target=f) for f in (add_tasks, meddle, check)]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        threads[0].join()
+        threads[1].join()
+        if not manager.wait_until_idle(timeout=120):
+            problems.append(("never became idle", manager.get_queue_info()))
+        info = manager.get_queue_info()
+        if info["pending"] or info["downloading"]:
+            problems.append(("idle with work left", info))
+        finished.set()
+        threads[2].join()
+        manager.stop_processing()
+    elapsed = time.perf_counter() - start
+
+    expected, actual = recount(manager)
+    if expected != actual:
+        problems.append(("final counter drift", expected, actual))
+    return manager.get_queue_info(), elapsed, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--stress-tasks", type=int, default=3000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    loaded, micros = bench_lookup(args.tasks)
+    print(f"get_queue_info with {loaded} tasks: {micros:.1f} µs median")
+
+    info, elapsed, problems = stress(args.stress_tasks, args.workers, args.seed)
+    print(f"stress: {args.stress_tasks} tasks on {args.workers} workers in {elapsed:.1f} s -> "
+          f"{info['completed']} completed, {info['failed']} failed, {info['cancelled']} cancelled, "
+          f"{info['total']} still listed, {info['bytes_downloaded']} bytes")
+    for problem in problems[:10]:
+        print("MISMATCH:", *problem)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# benchmarks/bench_queue_view.py
+"""
+Cost of refreshing the GUI queue list as tasks change, for a large queue.
+
+Compares rebuilding a QListWidget on every event (the old display) with the
+QueueListModel that updates rows in place. Runs offscreen; no network needed.
+
+Usage: python -m benchmarks.bench_queue_view [--tasks 50000] [--events 200]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication, QListView, QListWidget, QListWidgetItem
+
+from src.gui.queue_model import QueueFilterProxyModel, QueueListModel, task_label
+from src.video_downloader.queue_manager import DownloadStatus, DownloadTask
+
+
+def make_tasks(count):
+    return [
+        DownloadTask(id=str(uuid.uuid4()), url=f"https://example.com/watch?v={index:08d}", options={})
+        for index in range(count)
+    ]
+
+
+def advance(tasks, event, batch):
+    """Simulate one event: a few running tasks make progress, one of them finishes."""
+    changed = []
+    for offset in range(batch):
+        task = tasks[(event * batch + offset) % len(tasks)]
+        task.status = DownloadStatus.DOWNLOADING
+        task.progress = min(100.0, task.progress + 7.5)
+        changed.append(task)
+    changed[0].status = DownloadStatus.COMPLETED
+    return changed
+
+
+def time_ms(func):
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_rebuild(app, tasks, events, batch):
+    widget = QListWidget()
+    widget.show()
+
+    def rebuild():
+        widget.clear()
+        for task in tasks:
+            widget.addItem(QListWidgetItem(task_label(task)))
+        app.processEvents()
+
+    timings = []
+    for event in range(events):
+        advance(tasks, event, batch)
+        timings.append(time_ms(rebuild))
+    widget.close()
+    return timings
+
+
+def bench_model(app, tasks, events, batch):
+    model = QueueListModel()
+    proxy = QueueFilterProxyModel()
+    proxy.setSourceModel(model)
+    view = QListView()
+    view.setModel(proxy)
+    view.setUniformItemSizes(True)
+    view.show()
+
+    initial = time_ms(lambda: (model.update_tasks(tasks), app.processEvents()))
+    timings = []
+    for event in range(events):
+        changed = advance(tasks, event, batch)
+        timings.append(time_ms(lambda: (model.update_tasks(changed), app.processEvents())))
+    filtering = time_ms(lambda: (proxy.set_status_filter([DownloadStatus.DOWNLOADING]), app.processEvents()))
+    sorting = time_ms(lambda: (proxy.set_sort_mode("Progress"), app.processEvents()))
+    sorted_timings = []
+    for event in range(events):
+        changed = advance(tasks, events + event, batch)
+        sorted_timings.append(time_ms(lambda: (model.update_tasks(changed), app.processEvents())))
+    view.close()
+    return initial, timings, filtering, sorting, sorted_timings
+
+
+def summary(timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return f"median {statistics.median(timings):8.2f} ms  p95 {p95:8.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=50000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=10, help="tasks changed per event")
+    parser.add_argument("--rebuild-events", type=int, default=3,
+                        help="events to time for the rebuild strategy (it is slow)")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    rebuild = bench_rebuild(app, make_tasks(args.tasks), args.rebuild_events, args.batch)
+    initial, model, filtering, sorting, model_sorted = bench_model(
+        app, make_tasks(args.tasks), args.events, args.batch
+    )
+
+    print(f"{args.tasks} tasks, {args.batch} changed per event")
+    print(f"rebuild list widget     {summary(rebuild)}  per event")
+    print(f"model, initial load     {initial:8.2f} ms")
+    print(f"model, queue order      {summary(model)}  per event")
+    print(f"model, status filter    {filtering:8.2f} ms to apply")
+    print(f"model, sort by progress {sorting:8.2f} ms to apply")
+    print(f"model, filtered+sorted  {summary(model_sorted)}  per event")
+
+
+if __name__ == "__main__":
+    main()
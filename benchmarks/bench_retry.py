@@ -0,0 +1,142 @@
+# benchmarks/bench_retry.py
+"""
+Retries and per-host circuit breakers against a local stand-in server.
+
+Scenario "flaky": of --files files, every third answers its first two
+requests with HTTP 503, every fifth its first with HTTP 429, and one URL does
+not exist (404). Runs them on one worker without retries and with retries;
+the retried run must complete everything but the missing file, fetch that one
+only once (permanent errors are not retried) and keep downloading other files
+while a failed one waits out its back-off.
+
+Scenario "circuit": the same host name resolving to a server that answers
+every request with HTTP 503 ("localhost") and a healthy one ("127.0.0.1").
+Counts the requests the down host gets while the healthy files download, with
+and without the circuit breaker; the breaker must cut them and must not slow
+the healthy host down.
+
+Exits with status 1 if any of these checks fails.
+
+Usage: python -m benchmarks.bench_retry [--files 15]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.media_server import LocalMediaServer
+from src.video_downloader.archive import set_download_archive
+from src.video_downloader.downloader import download_video
+from src.video_downloader.metadata_cache import set_metadata_cache
+from src.video_downloader.queue_manager import DownloadQueueManager
+from src.video_downloader.retry import RetryPolicy
+
+
+def run(urls, workers, policy, until=None):
+    """
+    Download urls; returns (seconds, manager, event log).
+
+    :param until: Only wait for these URLs, then stop the manager
+    """
+    manager = DownloadQueueManager(download_video, max_workers=workers, retry_policy=policy)
+    events = []
+    manager.on_task_completed = lambda task: events.append(("completed", task.url, time.perf_counter()))
+    manager.on_task_failed = lambda task: events.append(("failed", task.url, time.perf_counter()))
+    manager.on_task_retrying = lambda task: events.append(("retrying", task.url, time.perf_counter()))
+    wait_for = set(until or urls)
+    with tempfile.TemporaryDirectory() as out:
+        options = {"output_path": os.path.join(out, "%(title)s.%(ext)s"), "organize_folders": False,
+                   "use_archive": False}
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            for url in urls:
+                manager.add_download(url, options)
+            while not wait_for <= {url for kind, url, _ in events if kind != "retrying"}:
+                time.sleep(0.05)
+            elapsed = time.perf_counter() - start
+            manager.stop_processing(timeout=2)
+    return elapsed, manager, events
+
+
+def overlapped(events):
+    """Whether some download finished while another one waited for its retry."""
+    waiting = set()
+    for kind, url, _ in events:
+        if kind == "retrying":
+            waiting.add(url)
+        elif url in waiting:
+            waiting.discard(url)
+        elif waiting and kind == "completed":
+            return True
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=15)
+    parser.add_argument("--file-kb", type=int, default=64)
+    parser.add_argument("--connection-kb", type=int, default=256)
+    args = parser.parse_args()
+    set_download_archive(None)
+    set_metadata_cache(None)
+    policy = RetryPolicy(base_delay=0.5, throttle_delay=1.0, failure_threshold=0)
+    failed = False
+
+    with LocalMediaServer(connection_rate=args.connection_kb * 1024) as server:
+        def prepare():
+            urls = [server.add_file(f"clip{index}.mp4", args.file_kb * 1024) for index in range(args.files)]
+            for index in range(args.files):
+                if index % 3 == 0:
+                    server.fail(f"clip{index}.mp4", 2, 503)
+                elif index % 5 == 0:
+                    server.fail(f"clip{index}.mp4", 1, 429)
+            server.requests.clear()
+            return urls + [server.url("missing.mp4")]
+
+        results = {}
+        for name, run_policy in (("no retries", None), ("retries", policy)):
+            elapsed, manager, events = run(prepare(), 1, run_policy)
+            info = manager.get_queue_info()
+            results[name] = (info, events)
+            print(f"flaky, {name}: {elapsed:.2f} s, {info['completed_total']} completed, "
+                  f"{info['failed_total']} failed, {info['retries_total']} retries "
+                  f"({info['throttled_total']} throttled)")
+        info, events = results["retries"]
+        missing_requests = server.requests.get("/missing.mp4", 0)
+        print(f"  missing file requested {missing_requests}x; other downloads ran during back-offs: "
+              f"{overlapped(events)}")
+        failed |= info["completed_total"] != args.files or info["failed_total"] != 1
+        failed |= missing_requests != 1 or not overlapped(events)
+        failed |= results["no retries"][0]["failed_total"] <= 1
+
+    with LocalMediaServer(connection_rate=args.connection_kb * 1024) as healthy, \
+            LocalMediaServer() as down:
+        healthy_urls = [healthy.add_file(f"clip{index}.mp4", 4 * args.file_kb * 1024)
+                        for index in range(args.files)]
+        down_urls = []
+        for index in range(args.files):
+            down.add_file(f"clip{index}.mp4", args.file_kb * 1024)
+            down.fail(f"clip{index}.mp4", None, 503)
+            down_urls.append(down.url(f"clip{index}.mp4").replace("127.0.0.1", "localhost"))
+        urls = [url for pair in zip(down_urls, healthy_urls) for url in pair]
+
+        counts = {}
+        for name, threshold in (("no breaker", 0), ("breaker", 3)):
+            down.requests.clear()
+            run_policy = RetryPolicy(base_delay=0.2, max_retries=5, failure_threshold=threshold, cooldown=2.0)
+            elapsed, manager, events = run(urls, 4, run_policy, until=healthy_urls)
+            counts[name] = (sum(down.requests.values()), elapsed)
+            completed = sum(1 for kind, url, _ in events if kind == "completed" and url in healthy_urls)
+            print(f"circuit, {name}: healthy host done in {elapsed:.2f} s ({completed} completed), "
+                  f"down host got {counts[name][0]} requests meanwhile")
+            failed |= completed != len(healthy_urls)
+        failed |= counts["breaker"][0] >= counts["no breaker"][0]
+        failed |= counts["breaker"][1] > counts["no breaker"][1] * 1.25
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
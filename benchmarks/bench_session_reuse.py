@@ -0,0 +1,66 @@
+# benchmarks/bench_session_reuse.py
+"""
+Per-task overhead of building a fresh YoutubeDL for every download versus
+reusing a long-lived YoutubeDLSession, measured on many short clips served
+from localhost.
+
+Usage: python -m benchmarks.bench_session_reuse [--tasks 1000] [--size 16384]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import os
+import tempfile
+import time
+
+from src.video_downloader.downloader import download_video
+from src.video_downloader.metadata_cache import set_metadata_cache
+from src.video_downloader.session import YoutubeDLSession
+
+from .media_server import LocalMediaServer
+
+
+def run(urls, output_dir, session):
+    start = time.perf_counter()
+    for url in urls:
+        download_video(
+            url,
+            output_path=os.path.join(output_dir, "%(title)s.%(ext)s"),
+            file_format="mp4",
+            organize_folders=False,
+            session=session,
+        )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--size", type=int, default=16 * 1024, help="clip size in bytes")
+    args = parser.parse_args()
+
+    # Measure construction overhead, not cache hits or logging
+    set_metadata_cache(None)
+    logging.disable(logging.INFO)
+
+    with LocalMediaServer() as server:
+        urls = [server.add_file(f"clip{i}.mp4", args.size) for i in range(args.tasks)]
+        results = {}
+        for label in ("fresh", "session"):
+            session = YoutubeDLSession() if label == "session" else None
+            with tempfile.TemporaryDirectory() as output_dir, \
+                    contextlib.redirect_stdout(io.StringIO()), \
+                    contextlib.redirect_stderr(io.StringIO()):
+                results[label] = run(urls, output_dir, session)
+            if session is not None:
+                session.close()
+
+    for label, elapsed in results.items():
+        print(f"{label:>8}: {elapsed:8.2f}s total, {elapsed / args.tasks * 1000:7.2f} ms/task")
+    saved = (results["fresh"] - results["session"]) / args.tasks * 1000
+    print(f"   saved: {saved:7.2f} ms/task")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_startup.py
+"""
+Import-time cost of the GUI and downloader modules, measured with -X importtime.
+
+Each target is imported in a fresh interpreter several times and the median
+cumulative import time is reported. Exits with status 1 if a target is slower
+than --max-ms, or if a module that should stay lazy (yt_dlp) gets imported.
+
+Usage: python -m benchmarks.bench_startup [--repeat 5] [--max-ms 400]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# (name, module to import, modules that must not be imported along with it)
+TARGETS = [
+    ("downloader", "src.video_downloader.downloader", ["yt_dlp"]),
+    ("cli", "src.video_downloader.cli", ["yt_dlp", "PyQt6"]),
+    ("gui", "src.gui.main_window", ["yt_dlp"]),
+]
+
+
+def measure(module):
+    """Import a module in a fresh interpreter; return (cumulative µs, imported module names)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative[module], set(cumulative)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=400.0,
+                        help="fail if any target's median exceeds this (default: 400)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    failed = False
+    for name, module, forbidden in TARGETS:
+        timings = []
+        leaked = set()
+        for _ in range(args.repeat):
+            micros, imported = measure(module)
+            timings.append(micros / 1000)
+            leaked |= {mod for mod in imported if mod.split(".")[0] in forbidden}
+        median = statistics.median(timings)
+        regressed = median > args.max_ms
+        failed = failed or regressed or bool(leaked)
+        results.append({
+            "target": name, "module": module, "median_ms": round(median, 1),
+            "min_ms": round(min(timings), 1), "eager_imports": sorted(leaked),
+            "regressed": regressed,
+        })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            note = ""
+            if r["eager_imports"]:
+                note += f"  imports {', '.join(sorted({m.split('.')[0] for m in r['eager_imports']}))}!"
+            if r["regressed"]:
+                note += f"  over {args.max_ms:.0f} ms!"
+            print(f"{r['target']:<11} {r['median_ms']:8.1f} ms median  {r['min_ms']:8.1f} ms min{note}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
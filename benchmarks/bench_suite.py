@@ -0,0 +1,242 @@
+# benchmarks/bench_suite.py
+"""
+Offline throughput suite: the whole download path against a local stand-in.
+
+Runs DownloadQueueManager with download_video (sessions, playlist expansion,
+the post-processing pool, as the CLI sets them up) on synthetic media served
+from localhost and read by yt-dlp's generic extractor, across scenarios,
+worker counts and file sizes:
+
+  files     --count plain MP4 files
+  hls       --count HLS streams of 8 fragments each
+  playlist  one RSS feed of --count entries, expanded into child tasks
+
+Each combination runs in its own process, so peak RSS is its own. Records
+tasks/sec, bytes/sec, per-task time to first byte (from the start of the
+attempt: extraction and format selection included) and peak RSS, and writes
+them with the commit, Python and yt-dlp versions as JSON (--output).
+--compare reads an earlier result file and exits with status 1 when a
+combination got slower than --tolerance allows. Any name lookup other than
+localhost fails, so nothing reaches the network; a combination with failed
+downloads also exits with status 1.
+
+Usage: python -m benchmarks.bench_suite [--workers 1 4] [--sizes 256K 4M]
+       [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCENARIOS = ("files", "hls", "playlist")
+HLS_FRAGMENTS = 8
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Higher is better for these, lower for the rest
+_HIGHER_IS_BETTER = ("tasks_per_second", "bytes_per_second")
+_COMPARED = ("tasks_per_second", "bytes_per_second", "ttfb_median")
+
+
+def parse_size(value):
+    """'256K' / '4M' / '1048576' -> bytes."""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    value = value.strip().upper()
+    if value[-1:] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def _offline():
+    """Make every name lookup outside localhost fail."""
+    lookup = socket.getaddrinfo
+
+    def local_only(host, *args, **kwargs):
+        if host not in ("127.0.0.1", "localhost", "::1", None):
+            raise socket.gaierror(f"bench_suite runs offline; refusing to resolve {host}")
+        return lookup(host, *args, **kwargs)
+
+    socket.getaddrinfo = local_only
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # kilobytes on Linux
+
+
+def run_point(scenario, workers, size, count):
+    """Download one scenario in this process and return its measurements."""
+    _offline()
+    from benchmarks.media_server import LocalMediaServer
+    from src.video_downloader.archive import set_download_archive
+    from src.video_downloader.downloader import download_video, get_playlist_entries
+    from src.video_downloader.metadata_cache import set_metadata_cache
+    from src.video_downloader.queue_manager import DEFAULT_POSTPROCESS_WORKERS, DownloadQueueManager
+    from src.video_downloader.session import YoutubeDLSession
+
+    set_download_archive(None)
+    set_metadata_cache(None)
+    with LocalMediaServer() as server:
+        if scenario == "files":
+            urls = [server.add_file(f"clip{index}.mp4", size) for index in range(count)]
+        elif scenario == "hls":
+            urls = [server.add_hls(f"stream{index}", HLS_FRAGMENTS, max(1, size // HLS_FRAGMENTS))
+                    for index in range(count)]
+        else:
+            urls = [server.add_playlist("feed", [server.add_file(f"entry{index}.mp4", size)
+                                                 for index in range(count)])]
+        manager = DownloadQueueManager(
+            download_video,
+            max_workers=workers,
+            playlist_expander=get_playlist_entries,
+            session_factory=YoutubeDLSession,
+            postprocess_workers=DEFAULT_POSTPROCESS_WORKERS,
+        )
+        with tempfile.TemporaryDirectory() as out, contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            options = {"output_path": os.path.join(out, "%(title)s.%(ext)s"), "organize_folders": False,
+                       "use_archive": False, "is_playlist": scenario == "playlist"}
+            start = time.perf_counter()
+            for url in urls:
+                manager.add_download(url, options)
+            manager.wait_until_idle()
+            elapsed = time.perf_counter() - start
+            manager.stop_processing()
+
+    # Playlist parents only stand for their entries
+    tasks = [task for task in manager.get_all_tasks().values() if not task.child_ids]
+    info = manager.get_queue_info()
+    ttfb = sorted(task.stage_times["extract"] for task in tasks if "extract" in task.stage_times)
+    return {
+        "scenario": scenario,
+        "workers": workers,
+        "file_size": size,
+        "count": count,
+        "tasks": len(tasks),
+        "completed": info["completed_total"],
+        "failed": info["failed_total"],
+        "seconds": round(elapsed, 3),
+        "tasks_per_second": round(info["completed_total"] / elapsed, 2),
+        "bytes_per_second": round(info["bytes_transferred"] / elapsed),
+        "ttfb_median": round(statistics.median(ttfb), 4) if ttfb else None,
+        "ttfb_p95": round(ttfb[int(0.95 * (len(ttfb) - 1))], 4) if ttfb else None,
+        "peak_rss": _peak_rss(),
+    }
+
+
+def _environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=_ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        from yt_dlp.version import __version__ as yt_dlp_version
+    except ImportError:
+        yt_dlp_version = None
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "yt_dlp": yt_dlp_version,
+    }
+
+
+def _key(result):
+    return result["scenario"], result["workers"], result["file_size"], result.get("count")
+
+
+def compare(results, baseline, tolerance):
+    """Print the change of each compared metric; returns the regressions found."""
+    previous = {_key(result): result for result in baseline["results"]}
+    regressions = []
+    print(f"\nagainst {baseline['environment'].get('commit') or 'baseline'}:")
+    for result in results:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        changes = []
+        for metric in _COMPARED:
+            if not old.get(metric) or result.get(metric) is None:
+                continue
+            ratio = result[metric] / old[metric]
+            changes.append(f"{metric} {ratio - 1:+.0%}")
+            worse = ratio < 1 - tolerance if metric in _HIGHER_IS_BETTER else ratio > 1 + tolerance
+            if worse:
+                regressions.append(f"{_key(result)} {metric}: {old[metric]} -> {result[metric]}")
+        print(f"  {result['scenario']:>8} w={result['workers']} size={result['file_size']}: {', '.join(changes)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[256 * 1024, 4 * 1024 ** 2],
+                        help="file sizes, e.g. 256K 4M")
+    parser.add_argument("--count", type=int, default=12, help="files, streams or playlist entries per run")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="relative slowdown tolerated by --compare (default: 0.25)")
+    parser.add_argument("--point", nargs=3, metavar=("SCENARIO", "WORKERS", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.point:
+        scenario, workers, size = args.point
+        print(json.dumps(run_point(scenario, int(workers), int(size), args.count)))
+        return 0
+
+    results, failed = [], False
+    print(f"{'scenario':>8} {'workers':>7} {'size':>9} {'tasks/s':>8} {'MB/s':>8} "
+          f"{'ttfb p50':>9} {'ttfb p95':>9} {'peak RSS':>9}")
+    for scenario in args.scenarios:
+        for size in args.sizes:
+            for workers in args.workers:
+                child = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.bench_suite", "--count", str(args.count),
+                     "--point", scenario, str(workers), str(size)],
+                    cwd=_ROOT, capture_output=True, text=True,
+                )
+                if child.returncode != 0:
+                    print(f"{scenario:>8} {workers:7d} {size:9d} crashed:\n{child.stderr[-2000:]}")
+                    failed = True
+                    continue
+                result = json.loads(child.stdout.strip().splitlines()[-1])
+                results.append(result)
+                failed |= result["failed"] > 0 or result["completed"] != result["tasks"]
+                rss = f"{result['peak_rss'] / 1024 ** 2:.0f} MB" if result["peak_rss"] else "-"
+                print(f"{scenario:>8} {workers:7d} {size:9d} {result['tasks_per_second']:8.2f} "
+                      f"{result['bytes_per_second'] / 1024 ** 2:8.2f} {result['ttfb_median'] or 0:8.3f}s "
+                      f"{result['ttfb_p95'] or 0:8.3f}s {rss:>9}"
+                      + (f"  ({result['failed']} failed)" if result["failed"] else ""))
+
+    report = {"environment": _environment(), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresults written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"  slower: {regression}")
+        failed |= bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+# benchmarks/bench_task_memory.py
+"""
+Memory held per queued task, and by the finished-task history, measured with tracemalloc.
+
+Queues --tasks downloads (workers are held back so they all stay pending) and
+reports the traced bytes per task. Then pushes --finished tasks through
+clear_completed and checks that the history stays bounded. Exits with status 1
+if a queued task costs more than --max-bytes or the history grows past its size.
+
+Usage: python -m benchmarks.bench_task_memory [--tasks 100000] [--finished 200000]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import tracemalloc
+
+from src.video_downloader.queue_manager import DownloadQueueManager, DownloadStatus, DownloadTask
+
+OPTIONS = {
+    "output_path": "/downloads/%(title)s_1080p.%(ext)s",
+    "file_format": "mp4",
+    "resolution": "1080",
+    "is_playlist": False,
+}
+
+
+def traced(func):
+    """Run func and return (result, bytes still allocated by it)."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = func()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return result, allocated
+
+
+def bench_queued(count):
+    release = threading.Event()
+    manager = DownloadQueueManager(lambda url, **options: release.wait(), max_workers=1)
+
+    def queue_tasks():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for index in range(count):
+                manager.add_download(f"https://example.com/watch?v={index:011d}", OPTIONS)
+        return manager
+
+    _, allocated = traced(queue_tasks)
+    profiles = len(manager.option_profiles)
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager.is_running = False
+        release.set()
+        manager.stop_processing()
+    return allocated / count, profiles
+
+
+def bench_history(count, history_size, spill_path):
+    manager = DownloadQueueManager(lambda url, **options: None,
+                                   history_size=history_size, history_path=spill_path)
+    options = manager.option_profiles.intern(OPTIONS)
+
+    def churn():
+        # Finish tasks in batches, as a long-running daemon would
+        for start in range(0, count, 1000):
+            with manager.lock:
+                for index in range(start, min(start + 1000, count)):
+                    task = DownloadTask(id=f"task-{index}", url=f"https://example.com/{index}",
+                                        options=options, status=DownloadStatus.COMPLETED)
+                    manager._track(task)
+            manager.clear_completed()
+
+    _, allocated = traced(churn)
+    return allocated, len(manager.completed_tasks), manager.completed_tasks.spilled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--finished", type=int, default=200000)
+    parser.add_argument("--history-size", type=int, default=1000)
+    parser.add_argument("--max-bytes", type=float, help="fail if a queued task costs more than this")
+    args = parser.parse_args()
+
+    per_task, profiles = bench_queued(args.tasks)
+    print(f"queued {args.tasks} tasks: {per_task:.0f} bytes/task traced, {profiles} option profile(s)")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        spill_path = os.path.join(tmpdir, "history.jsonl")
+        allocated, kept, spilled = bench_history(args.finished, args.history_size, spill_path)
+        spill_size = os.path.getsize(spill_path) if os.path.exists(spill_path) else 0
+    print(f"finished {args.finished} tasks: {kept} kept in memory ({allocated / 1024:.0f} KiB traced), "
+          f"{spilled} spilled to disk ({spill_size / 1024 ** 2:.1f} MiB)")
+
+    failed = kept > args.history_size
+    if args.max_bytes is not None and per_task > args.max_bytes:
+        print(f"queued task cost exceeds {args.max_bytes:.0f} bytes")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# benchmarks/bench_tracing.py
+"""
+Cost of tracing spans, and what a trace of real downloads contains.
+
+Times an instrumented block with tracing off and on, and a batch of no-op
+downloads through the queue both ways. Then downloads --files MP4 files and
+an HLS stream from a local stand-in server (reusing YoutubeDL sessions) with
+tracing on, exports the trace and checks it: every event is well formed and
+survives a JSON round trip, every worker thread is named, and every completed
+task has its wait, task, download_function, extract, process, select_formats,
+transfer and postprocessor spans, tagged with its ID and on its worker's
+thread. Exits with status 1 if a check fails or a span with tracing off costs
+more than --max-ns.
+
+Usage: python -m benchmarks.bench_tracing [--files 6] [--trace out.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.media_server import LocalMediaServer
+from src.video_downloader.archive import set_download_archive
+from src.video_downloader.downloader import download_video
+from src.video_downloader.metadata_cache import set_metadata_cache
+from src.video_downloader.queue_manager import DownloadQueueManager
+from src.video_downloader.session import YoutubeDLSession
+from src.video_downloader.tracing import Tracer, set_tracer, span
+
+# Spans every downloaded task must have (MoveFiles: yt-dlp's last postprocessor)
+_TASK_SPANS = {"wait", "task", "download_function", "extract", "process", "select_formats", "transfer",
+               "MoveFiles", "report"}
+
+
+def span_cost(count):
+    """Nanoseconds per `with span(...)` block, net of an empty loop."""
+    start = time.perf_counter()
+    for _ in range(count):
+        pass
+    empty = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(count):
+        with span("bench", "bench", index=1):
+            pass
+    return max(0.0, time.perf_counter() - start - empty) / count * 1e9
+
+
+def queue_batch(count):
+    """Seconds to run count no-op downloads through a 4-worker queue."""
+    manager = DownloadQueueManager(lambda url, **options: None, max_workers=4)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for index in range(count):
+            manager.add_download(f"https://example.com/{index}", {})
+        manager.wait_until_idle(120)
+        elapsed = time.perf_counter() - start
+        manager.stop_processing()
+    return elapsed
+
+
+def check_trace(trace, manager):
+    """Problems found in an exported trace of manager's tasks (empty list: valid)."""
+    problems = []
+    trace = json.loads(json.dumps(trace))
+    named = {event["tid"] for event in trace["traceEvents"] if event["ph"] == "M"}
+    spans = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    for event in spans:
+        if not {"name", "cat", "ts", "dur", "pid", "tid"} <= set(event) or event["dur"] < 0:
+            problems.append(f"malformed: {event}")
+        elif event["tid"] not in named:
+            problems.append(f"unnamed thread: {event}")
+    by_task = {}
+    for event in spans:
+        task_id = event.get("args", {}).get("task")
+        if task_id is not None:
+            by_task.setdefault(task_id, []).append(event)
+    for task_id, task in manager.get_all_tasks().items():
+        if task.status.value != "completed":
+            problems.append(f"task {task_id} {task.status.value}: {task.error_message}")
+            continue
+        events = by_task.get(task_id, [])
+        missing = _TASK_SPANS - {event["name"] for event in events}
+        if missing:
+            problems.append(f"task {task_id} lacks {sorted(missing)}")
+        if len({event["tid"] for event in events}) != 1:
+            problems.append(f"task {task_id} spans several threads")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=6)
+    parser.add_argument("--tasks", type=int, default=2000, help="no-op downloads in the queue batch")
+    parser.add_argument("--max-ns", type=float, default=1000.0)
+    parser.add_argument("--trace", help="also write the trace of the downloads to this file")
+    args = parser.parse_args()
+    set_download_archive(None)
+    set_metadata_cache(None)
+
+    off = span_cost(200000)
+    set_tracer(Tracer())
+    on = span_cost(200000)
+    set_tracer(None)
+    print(f"span: {off:.0f} ns with tracing off, {on:.0f} ns with tracing on "
+          f"(a task runs about {len(_TASK_SPANS)} spans)")
+    batch_off = queue_batch(args.tasks)
+    set_tracer(Tracer())
+    batch_on = queue_batch(args.tasks)
+    set_tracer(None)
+    print(f"{args.tasks} no-op downloads: {batch_off:.2f} s with tracing off, {batch_on:.2f} s with tracing on")
+    failed = off > args.max_ns
+
+    with LocalMediaServer(connection_rate=1024 * 1024) as server:
+        urls = [server.add_file(f"clip{index}.mp4", 256 * 1024) for index in range(args.files)]
+        urls.append(server.add_hls("stream", 8, 32 * 1024))
+        manager = DownloadQueueManager(download_video, max_workers=3, session_factory=YoutubeDLSession)
+        tracer = Tracer()
+        set_tracer(tracer)
+        with tempfile.TemporaryDirectory() as out, contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            options = {"output_path": os.path.join(out, "%(title)s.%(ext)s"), "organize_folders": False,
+                       "use_archive": False}
+            for url in urls:
+                manager.add_download(url, options)
+            manager.wait_until_idle(120)
+            manager.stop_processing()
+        set_tracer(None)
+    trace = tracer.export()
+    if args.trace:
+        tracer.save(args.trace)
+    problems = check_trace(trace, manager)
+    totals = {}
+    for event in trace["traceEvents"]:
+        if event["ph"] == "X":
+            count, total = totals.get(event["name"], (0, 0.0))
+            totals[event["name"]] = (count + 1, total + event["dur"] / 1000)
+    print(f"{len(urls)} downloads traced: {len(tracer)} spans, {len(problems)} problems")
+    for name, (count, total) in sorted(totals.items(), key=lambda item: -item[1][1]):
+        print(f"  {name:>18}: {count:3d} spans, {total:8.1f} ms")
+    for problem in problems[:10]:
+        print(f"  {problem}")
+    failed |= bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+# benchmarks/media_server.py
+import functools
+import http.server
+import os
+import tempfile
+import threading
+import time
+
+from src.video_downloader.bandwidth import TokenBucket
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        media = self.server.media
+        if media.latency:
+            time.sleep(media.latency)
+        if self.path.endswith(".ts") and media._take_throttled():
+            self.send_error(429, "Too Many Requests")
+            return
+        status = media._take_failure(self.path)
+        if status is not None:
+            self.send_error(status)
+            return
+        if not media._open_connection():
+            self.send_error(429, "Too Many Requests")
+            return
+        try:
+            super().do_GET()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client stopped reading (e.g. yt-dlp probing a direct link)
+        finally:
+            media._close_connection()
+
+    def copyfile(self, source, outputfile):
+        media = self.server.media
+        if media._bandwidth is None and media.connection_rate is None:
+            return super().copyfile(source, outputfile)
+        connection = TokenBucket(media.connection_rate)
+        while True:
+            chunk = source.read(16 * 1024)
+            if not chunk:
+                break
+            if media._bandwidth is not None:
+                media._bandwidth.consume(len(chunk))
+            connection.consume(len(chunk))
+            outputfile.write(chunk)
+
+
+class LocalMediaServer:
+    """
+    Serves synthetic media files from a temporary directory on localhost.
+
+    ``add_file``, ``add_hls`` and ``add_playlist`` create plain files, HLS
+    streams and RSS-feed playlists, all readable by yt-dlp's generic extractor.
+
+    ``latency`` delays every response by that many seconds, and
+    ``throttle(n)`` answers the next n fragment requests with HTTP 429, and
+    ``fail(name, n, status)`` the next n requests for one file with ``status``.
+    ``bandwidth`` caps the bytes/sec shared by all responses and
+    ``connection_rate`` the bytes/sec of each one; requests beyond
+    ``max_connections`` at once are answered with HTTP 429.
+    """
+
+    def __init__(self, latency=0.0, bandwidth=None, connection_rate=None, max_connections=None):
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="vd-bench-")
+        self.root = self._tmpdir.name
+        self.latency = latency
+        self.connection_rate = connection_rate
+        self.max_connections = max_connections
+        self._bandwidth = TokenBucket(bandwidth, burst_seconds=0.1) if bandwidth else None
+        self._connections = 0
+        self._throttled = 0
+        self._failures = {}  # request path -> [requests left to fail, status]
+        self.requests = {}  # request path -> count, failed ones included
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def add_file(self, name, size):
+        """Create a file of random bytes and return its URL."""
+        with open(os.path.join(self.root, name), "wb") as f:
+            f.write(os.urandom(size))
+        return self.url(name)
+
+    def add_hls(self, name, fragment_count, fragment_size, duration=2):
+        """Create an HLS stream of fragment_count random .ts fragments and return its playlist URL."""
+        os.makedirs(os.path.join(self.root, name), exist_ok=True)
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3", f"#EXT-X-TARGETDURATION:{duration}",
+                 "#EXT-X-MEDIA-SEQUENCE:0", "#EXT-X-PLAYLIST-TYPE:VOD"]
+        for index in range(fragment_count):
+            with open(os.path.join(self.root, name, f"{index}.ts"), "wb") as f:
+                f.write(os.urandom(fragment_size))
+            lines += [f"#EXTINF:{duration:.1f},", f"{name}/{index}.ts"]
+        lines.append("#EXT-X-ENDLIST")
+        with open(os.path.join(self.root, f"{name}.m3u8"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return self.url(f"{name}.m3u8")
+
+    def add_playlist(self, name, urls):
+        """Create an RSS feed (a playlist to yt-dlp's generic extractor) of the given media URLs and return its URL."""
+        items = "".join(
+            f"<item><title>{name} {index}</title><link>{url}</link><guid>{url}</guid>"
+            f"<enclosure url=\"{url}\" type=\"video/mp4\"/></item>"
+            for index, url in enumerate(urls, start=1)
+        )
+        with open(os.path.join(self.root, f"{name}.xml"), "w") as f:
+            f.write(f'<?xml version="1.0"?><rss version="2.0"><channel><title>{name}</title>'
+                    f"<link>{self.url(name + '.xml')}</link>{items}</channel></rss>")
+        return self.url(f"{name}.xml")
+
+    def throttle(self, count):
+        """Answer the next count fragment requests with HTTP 429."""
+        with self._lock:
+            self._throttled = count
+
+    def _take_throttled(self):
+        with self._lock:
+            if self._throttled <= 0:
+                return False
+            self._throttled -= 1
+            return True
+
+    def fail(self, name, count, status=503):
+        """Answer the next count requests for a file with an HTTP error (count None: all of them)."""
+        with self._lock:
+            self._failures["/" + name] = [count, status]
+
+    def _take_failure(self, path):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            failure = self._failures.get(path)
+            if failure is None:
+                return None
+            if failure[0] is not None:
+                failure[0] -= 1
+                if failure[0] <= 0:
+                    del self._failures[path]
+            return failure[1]
+
+    def _open_connection(self):
+        with self._lock:
+            if self.max_connections is not None and self._connections >= self.max_connections:
+                return False
+            self._connections += 1
+            return True
+
+    def _close_connection(self):
+        with self._lock:
+            self._connections -= 1
+
+    def url(self, name):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/{name}"
+
+    def start(self):
+        handler = functools.partial(_QuietHandler, directory=self.root)
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.media = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        self._tmpdir.cleanup()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
@@ -1,6 +1,8 @@
 # src/gui/app.py
 import sys
 import os
+import logging
+from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import QApplication
 
 # Support running both as a package (python -m) and as a top-level script (PyInstaller)
@@ -16,6 +18,7 @@ except Exception:  # Fallbacks for script/frozen contexts
 
 def run_app():
     """Initialize and run the GUI application"""
+    logging.basicConfig(level=logging.INFO)
     app = QApplication(sys.argv)
 
     # Load and apply the stylesheet (handle PyInstaller one-file via _MEIPASS)
@@ -43,6 +46,8 @@ def run_app():
 
     window = MainWindow()
     window.show()
+    # Start importing yt-dlp in the background once the window has been painted
+    QTimer.singleShot(0, window.warm_up_downloader)
     return app.exec()
 
 
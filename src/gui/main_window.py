@@ -3,6 +3,8 @@ import os
 import re
 import subprocess
 import platform
+import threading
+import time
 from PyQt6.QtWidgets import (
     QMainWindow,
     QWidget,
@@ -16,30 +18,73 @@ from PyQt6.QtWidgets import (
     QFileDialog,
     QMessageBox,
     QApplication,
-    QListWidget,
-    QListWidgetItem,
+    QListView,
+    QSpinBox,
+    QCheckBox,
+    QAbstractItemView,
     QTabWidget,
     QGroupBox,
     QTextEdit,
 )
 from PyQt6.QtCore import Qt, QObject, pyqtSignal
 from PyQt6.QtGui import QIcon
+from .queue_model import QueueFilterProxyModel, QueueListModel, TaskRole
 from .worker import DownloaderWorker
+from ..video_downloader.autoscale import WorkerAutoscaler
 from ..video_downloader.downloader import (
     download_video,
-    get_video_info,
-    sanitize_filename,
-    create_organized_folders,
+    get_playlist_entries,
+    preload_yt_dlp,
 )
-from ..video_downloader.queue_manager import DownloadQueueManager, DownloadStatus
+from ..video_downloader.journal import TaskJournal
+from ..video_downloader.queue_manager import (
+    DEFAULT_POSTPROCESS_WORKERS,
+    DownloadQueueManager,
+    DownloadStatus,
+)
+from ..video_downloader.session import YoutubeDLSession
+
+
+# (label, statuses shown) choices for the queue filter; None shows everything
+QUEUE_FILTERS = [
+    ("All", None),
+    ("Downloading", [DownloadStatus.DOWNLOADING]),
+    ("Processing", [DownloadStatus.POSTPROCESSING]),
+    ("Queued", [DownloadStatus.PENDING]),
+    ("Completed", [DownloadStatus.COMPLETED]),
+    ("Failed", [DownloadStatus.FAILED]),
+]
+
+# (label, bytes/sec) choices for the global speed limit; None is unlimited
+SPEED_LIMITS = [
+    ("Unlimited", None),
+    ("500 KB/s", 500 * 1024),
+    ("1 MB/s", 1024 * 1024),
+    ("2 MB/s", 2 * 1024 * 1024),
+    ("5 MB/s", 5 * 1024 * 1024),
+    ("10 MB/s", 10 * 1024 * 1024),
+]
+
+# Fragments of an HLS/DASH stream fetched at once; "Auto" tunes it per site
+FRAGMENT_CHOICES = [
+    ("Auto", "auto"),
+    ("1", 1),
+    ("2", 2),
+    ("4", 4),
+    ("8", 8),
+    ("16", 16),
+]
 
 
 class _UiBridge(QObject):
     task_started = pyqtSignal(object)
-    task_progress = pyqtSignal(object)
+    tasks_progress = pyqtSignal(list)  # coalesced: every task that changed since the last batch
     task_completed = pyqtSignal(object)
     task_failed = pyqtSignal(object)
+    task_cancelled = pyqtSignal(object)
+    task_retrying = pyqtSignal(object)
     queue_empty = pyqtSignal()
+    workers_scaled = pyqtSignal(object)  # ScalingDecision
 
 
 class MainWindow(QMainWindow):
@@ -104,6 +149,50 @@ class MainWindow(QMainWindow):
         # Store reference to resolution label for later use
         self.resolution_label = resolution_label
 
+        # Speed Limit Selection (shared by all downloads, applied immediately)
+        speed_layout = QHBoxLayout()
+        speed_label = QLabel("Speed limit:")
+        self.speed_limit_combo = QComboBox()
+        for text, limit in SPEED_LIMITS:
+            self.speed_limit_combo.addItem(text, limit)
+        self.speed_limit_combo.currentIndexChanged.connect(self.on_speed_limit_changed)
+        speed_layout.addWidget(speed_label)
+        speed_layout.addWidget(self.speed_limit_combo)
+        format_res_layout.addLayout(speed_layout)
+
+        # Fragment concurrency (applies to downloads queued afterwards)
+        fragments_layout = QHBoxLayout()
+        fragments_label = QLabel("Fragments:")
+        self.fragments_combo = QComboBox()
+        for text, value in FRAGMENT_CHOICES:
+            self.fragments_combo.addItem(text, value)
+        self.fragments_combo.setToolTip(
+            "Fragments of a streamed (HLS/DASH) video fetched at once. "
+            "Auto ramps up while throughput improves and backs off on errors."
+        )
+        fragments_layout.addWidget(fragments_label)
+        fragments_layout.addWidget(self.fragments_combo)
+        format_res_layout.addLayout(fragments_layout)
+
+        # Parallel downloads (the worker pool is resized while downloads run)
+        workers_layout = QHBoxLayout()
+        workers_label = QLabel("Parallel:")
+        self.workers_spin = QSpinBox()
+        self.workers_spin.setRange(1, 10)
+        self.workers_spin.setValue(3)
+        self.workers_spin.valueChanged.connect(self.on_parallel_downloads_changed)
+        # With Auto, the pool follows throughput between 1 and the spin box range
+        self.autoscale_checkbox = QCheckBox("Auto")
+        self.autoscale_checkbox.setToolTip(
+            "Adjust the number of parallel downloads to the measured throughput; "
+            "back off on errors and when sites throttle."
+        )
+        self.autoscale_checkbox.toggled.connect(self.on_autoscale_toggled)
+        workers_layout.addWidget(workers_label)
+        workers_layout.addWidget(self.workers_spin)
+        workers_layout.addWidget(self.autoscale_checkbox)
+        format_res_layout.addLayout(workers_layout)
+
         # Add some stretch to keep the dropdowns from expanding too much
         format_res_layout.addStretch()
         layout.addLayout(format_res_layout)
@@ -129,10 +218,34 @@ class MainWindow(QMainWindow):
 
         # Download Queue Display
         queue_layout = QVBoxLayout()
+        queue_header = QHBoxLayout()
         queue_label = QLabel("Download Queue:")
-        self.queue_list = QListWidget()
+        self.queue_filter_combo = QComboBox()
+        for text, statuses in QUEUE_FILTERS:
+            self.queue_filter_combo.addItem(text, statuses)
+        self.queue_filter_combo.currentIndexChanged.connect(self.on_queue_filter_changed)
+        self.queue_sort_combo = QComboBox()
+        self.queue_sort_combo.addItems(list(QueueFilterProxyModel.SORT_ROLES))
+        self.queue_sort_combo.currentTextChanged.connect(self.on_queue_sort_changed)
+        queue_header.addWidget(queue_label)
+        queue_header.addStretch()
+        queue_header.addWidget(QLabel("Show:"))
+        queue_header.addWidget(self.queue_filter_combo)
+        queue_header.addWidget(QLabel("Sort:"))
+        queue_header.addWidget(self.queue_sort_combo)
+        self.cancel_button = QPushButton("Cancel Selected")
+        self.cancel_button.clicked.connect(self.cancel_selected_downloads)
+        queue_header.addWidget(self.cancel_button)
+        # Model/view: rows are updated in place instead of rebuilding the list
+        self.queue_model = QueueListModel(self)
+        self.queue_proxy = QueueFilterProxyModel(self)
+        self.queue_proxy.setSourceModel(self.queue_model)
+        self.queue_list = QListView()
+        self.queue_list.setModel(self.queue_proxy)
+        self.queue_list.setUniformItemSizes(True)
+        self.queue_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.queue_list.setMaximumHeight(100)
-        queue_layout.addWidget(queue_label)
+        queue_layout.addLayout(queue_header)
         queue_layout.addWidget(self.queue_list)
         layout.addLayout(queue_layout)
 
@@ -151,27 +264,79 @@ class MainWindow(QMainWindow):
         # Add stretch to push everything to the top
         layout.addStretch()
 
-        # Initialize download queue manager
-        self.queue_manager = DownloadQueueManager(download_video, max_workers=3)
+        # Initialize download queue manager (journaled so the queue survives restarts)
+        try:
+            journal = TaskJournal()
+        except Exception as e:
+            print(f"Warning: Queue journal unavailable, queue will not survive restarts: {e}")
+            journal = None
+        self.queue_manager = DownloadQueueManager(
+            download_video,
+            max_workers=self.workers_spin.value(),
+            playlist_expander=get_playlist_entries,
+            session_factory=YoutubeDLSession,
+            max_per_host=2,
+            journal=journal,
+            progress_rate=10,  # at most 10 progress batches/sec reach the event loop
+            # ffmpeg steps run on their own pool, so workers keep downloading
+            postprocess_workers=DEFAULT_POSTPROCESS_WORKERS,
+        )
         # Bridge signals to ensure thread-safe GUI updates
         self._bridge = _UiBridge()
         self._bridge.task_started.connect(self.on_task_started)
-        self._bridge.task_progress.connect(self.on_task_progress)
+        self._bridge.tasks_progress.connect(self.on_tasks_progress)
         self._bridge.task_completed.connect(self.on_task_completed)
         self._bridge.task_failed.connect(self.on_task_failed)
+        self._bridge.task_cancelled.connect(self.on_task_cancelled)
+        self._bridge.task_retrying.connect(self.on_task_retrying)
         self._bridge.queue_empty.connect(self.on_queue_empty)
+        self._bridge.workers_scaled.connect(self.on_workers_scaled)
         self.setup_queue_callbacks()
+        self.autoscaler = WorkerAutoscaler(
+            self.queue_manager,
+            min_workers=self.workers_spin.minimum(),
+            max_workers=self.workers_spin.maximum(),
+        )
+        self.autoscaler.on_decision = lambda decision: self._bridge.workers_scaled.emit(decision)
         
         # Download tracking
         self.active_downloads = {}  # task_id -> task info
         self.last_download_path = None  # Store last download location
 
+        self.resume_journaled_downloads()
+
+    def resume_journaled_downloads(self):
+        """Requeue downloads left unfinished by a previous run or crash."""
+        resumed = self.queue_manager.restore_from_journal()
+        # Finished tasks from earlier runs are history; keep the journal small
+        self.queue_manager.clear_completed()
+        self.queue_model.sync(self.queue_manager.get_all_tasks())
+        if not resumed:
+            return
+
+        for task_id in resumed:
+            task = self.queue_manager.get_task_status(task_id)
+            self.active_downloads[task_id] = {
+                "url": task.url,
+                "options": task.options,
+                "started": task.status == DownloadStatus.DOWNLOADING,
+            }
+        self.queue_manager.start_processing()
+        self.status_label.setText(f"Resuming {len(resumed)} unfinished download(s)...")
+        self.update_queue_display()
+
+    def warm_up_downloader(self):
+        """Import yt-dlp in a background thread so the first download starts quickly."""
+        threading.Thread(target=preload_yt_dlp, name="ImportWarmup", daemon=True).start()
+
     def setup_queue_callbacks(self):
         """Setup callbacks for the download queue manager."""
         self.queue_manager.on_task_started = lambda task: self._bridge.task_started.emit(task)
-        self.queue_manager.on_task_progress = lambda task: self._bridge.task_progress.emit(task)
+        self.queue_manager.on_progress_batch = lambda tasks: self._bridge.tasks_progress.emit(tasks)
         self.queue_manager.on_task_completed = lambda task: self._bridge.task_completed.emit(task)
         self.queue_manager.on_task_failed = lambda task: self._bridge.task_failed.emit(task)
+        self.queue_manager.on_task_cancelled = lambda task: self._bridge.task_cancelled.emit(task)
+        self.queue_manager.on_task_retrying = lambda task: self._bridge.task_retrying.emit(task)
         self.queue_manager.on_queue_empty = lambda: self._bridge.queue_empty.emit()
 
     def show_error_dialog(self, message):
@@ -242,6 +407,31 @@ class MainWindow(QMainWindow):
         self.resolution_label.setVisible(is_video)
         print(f"DEBUG: Resolution label visible: {is_video}")
 
+    def on_speed_limit_changed(self, index):
+        """Apply the selected global speed limit to running and queued downloads."""
+        limit = self.speed_limit_combo.itemData(index)
+        self.queue_manager.set_bandwidth_limit(limit)
+
+    def on_parallel_downloads_changed(self, count):
+        """Grow or shrink the worker pool without restarting the queue."""
+        self.queue_manager.set_max_workers(count)
+
+    def on_autoscale_toggled(self, enabled):
+        """Hand the worker count to the autoscaler, or take it back."""
+        self.workers_spin.setEnabled(not enabled)
+        if enabled:
+            self.autoscaler.start()
+        else:
+            self.autoscaler.stop()
+            self.queue_manager.set_max_workers(self.workers_spin.value())
+
+    def on_workers_scaled(self, decision):
+        """Show the autoscaler's worker count in the (disabled) spin box."""
+        self.workers_spin.blockSignals(True)
+        self.workers_spin.setValue(decision.workers)
+        self.workers_spin.blockSignals(False)
+        print(f"DEBUG: Autoscaler {decision.workers_before} -> {decision.workers} workers ({decision.reason})")
+
     def start_download(self):
         """Add download to the multi-threaded queue."""
         print("DEBUG: start_download() called")
@@ -283,44 +473,12 @@ class MainWindow(QMainWindow):
                 else None
             ),
             "is_playlist": True,  # Always treat as playlist to handle both single videos and playlists
+            "fragment_concurrency": self.fragments_combo.currentData(),
         }
         print(f"DEBUG: Download options = {options}")
 
-        # Check for existing file and prompt for overwrite (single video only)
-        if not options["is_playlist"]:
-            try:
-                info = get_video_info(url)
-                if info:
-                    sanitized_title = sanitize_filename(info.get("title", ""))
-                    base_dir = os.path.dirname(options["output_path"]) or os.getcwd()
-                    download_folder = create_organized_folders(
-                        base_path=base_dir,
-                        is_playlist=False,
-                        playlist_info=None,
-                        video_info=info,
-                        file_format=options["file_format"],
-                    )
-                    # Rebuild resolution suffix as used in filename
-                    res_suffix = ""
-                    if options["file_format"] == "mp4" and options["resolution"]:
-                        res_suffix = f"_{options['resolution']}p"
-                    candidate_path = os.path.join(
-                        str(download_folder), f"{sanitized_title}{res_suffix}.{options['file_format']}"
-                    )
-                    if os.path.exists(candidate_path):
-                        reply = QMessageBox.question(
-                            self,
-                            "File Exists",
-                            f"A file with the same name exists:\n{candidate_path}\n\nReplace it?",
-                            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
-                            QMessageBox.StandardButton.No,
-                        )
-                        if reply == QMessageBox.StandardButton.No:
-                            self.status_label.setText("Download cancelled by user (existing file).")
-                            return
-            except Exception:
-                # Non-blocking: if we fail to check, proceed without prompt
-                pass
+        # Videos already downloaded in this format/resolution are skipped by the
+        # download archive before any network access (see archive.py)
 
         try:
             # Add to queue
@@ -339,6 +497,7 @@ class MainWindow(QMainWindow):
             self.download_button.setEnabled(False)
             self.status_label.setText("Download added to queue...")
             QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+            self.queue_model.update_tasks([self.queue_manager.get_task_status(task_id)])
             self.update_queue_display()
             print("DEBUG: start_download() completed successfully")
             
@@ -352,6 +511,9 @@ class MainWindow(QMainWindow):
 
     def on_task_started(self, task):
         """Called when a download task starts."""
+        # An expanded playlist lists its entries, which are queued from now on
+        entries = [self.queue_manager.get_task_status(child_id) for child_id in task.child_ids]
+        self.queue_model.update_tasks([task] + [entry for entry in entries if entry is not None])
         if task.id in self.active_downloads:
             self.active_downloads[task.id]["started"] = True
             # Show playlist position if available
@@ -363,6 +525,12 @@ class MainWindow(QMainWindow):
                 self.status_label.setText(f"Downloading: {task.url[:50]}...")
             self.update_queue_display()
 
+    def on_tasks_progress(self, tasks):
+        """Called with a batch of tasks whose progress changed."""
+        self.queue_model.update_tasks(tasks)
+        for task in tasks:
+            self.on_task_progress(task)
+
     def on_task_progress(self, task):
         """Called when a download task progress updates."""
         if task.id in self.active_downloads:
@@ -376,6 +544,7 @@ class MainWindow(QMainWindow):
 
     def on_task_completed(self, task):
         """Called when a download task completes successfully."""
+        self.queue_model.update_tasks([task])
         if task.id in self.active_downloads:
             del self.active_downloads[task.id]
             self.status_label.setText("Download completed successfully!")
@@ -396,6 +565,7 @@ class MainWindow(QMainWindow):
 
     def on_task_failed(self, task):
         """Called when a download task fails."""
+        self.queue_model.update_tasks([task])
         if task.id in self.active_downloads:
             del self.active_downloads[task.id]
             self.show_error_dialog(f"Download failed: {task.error_message}")
@@ -404,6 +574,38 @@ class MainWindow(QMainWindow):
             QApplication.restoreOverrideCursor()
             self.update_queue_display()
 
+    def on_task_retrying(self, task):
+        """Called when a failed download goes back into the queue to be retried."""
+        self.queue_model.update_tasks([task])
+        print(f"DEBUG: Task {task.id} will be retried ({task.error_kind}): {task.error_message}")
+        if task.id in self.active_downloads:
+            delay = max(0, round(task.retry_at - time.time())) if task.retry_at else 0
+            self.status_label.setText(f"Download interrupted, retrying in {delay}s: {task.url[:50]}...")
+            self.progress_bar.setValue(0)
+
+    def on_task_cancelled(self, task):
+        """Called when a download task is cancelled."""
+        self.queue_model.update_tasks([task])
+        if task.id in self.active_downloads:
+            del self.active_downloads[task.id]
+            self.status_label.setText("Download cancelled.")
+            self.download_button.setEnabled(True)
+            QApplication.restoreOverrideCursor()
+            self.update_queue_display()
+
+    def cancel_selected_downloads(self):
+        """Cancel the selected queue entries; running downloads stop at their next chunk."""
+        for index in self.queue_list.selectionModel().selectedIndexes():
+            task = index.data(TaskRole)
+            if task is not None:
+                self.queue_manager.cancel_download(task.id)
+
+    def closeEvent(self, event):
+        """Stop the workers; interrupted downloads resume from the journal next time."""
+        self.autoscaler.stop()
+        self.queue_manager.stop_processing(timeout=5)
+        super().closeEvent(event)
+
     def on_queue_empty(self):
         """Called when the download queue is empty."""
         self.status_label.setText("All downloads completed!")
@@ -412,33 +614,26 @@ class MainWindow(QMainWindow):
         QApplication.restoreOverrideCursor()
         self.update_queue_display()
 
+    def on_queue_filter_changed(self, index):
+        """Show only the tasks with the selected status."""
+        self.queue_proxy.set_status_filter(self.queue_filter_combo.itemData(index))
+
+    def on_queue_sort_changed(self, mode):
+        """Re-sort the queue list."""
+        self.queue_proxy.set_sort_mode(mode)
+
     def update_queue_display(self):
-        """Update the download queue display."""
-        self.queue_list.clear()
-        
-        # Get all tasks from queue manager
-        all_tasks = self.queue_manager.get_all_tasks()
+        """Update the queue summary; rows are kept current by the queue model."""
         queue_info = self.queue_manager.get_queue_info()
         
-        # Add active downloads
-        for task_id, task in all_tasks.items():
-            if task.status == DownloadStatus.DOWNLOADING:
-                item_text = f"🔄 Downloading: {task.url[:40]}... ({task.progress:.1f}%)"
-            elif task.status == DownloadStatus.PENDING:
-                item_text = f"⏳ Queued: {task.url[:40]}..."
-            elif task.status == DownloadStatus.COMPLETED:
-                item_text = f"✅ Completed: {task.url[:40]}..."
-            elif task.status == DownloadStatus.FAILED:
-                item_text = f"❌ Failed: {task.url[:40]}..."
-            else:
-                item_text = f"📋 {task.url[:40]}..."
-            
-            item = QListWidgetItem(item_text)
-            self.queue_list.addItem(item)
-        
         # Update status with queue info
         if queue_info["total"] > 0:
             status_text = f"Queue: {queue_info['downloading']} downloading, {queue_info['pending']} pending"
             if queue_info["failed"] > 0:
                 status_text += f", {queue_info['failed']} failed"
+            if queue_info["bytes_expected"] > 0:
+                status_text += (
+                    f" ({queue_info['bytes_downloaded'] / 1024 ** 2:.1f}"
+                    f" of {queue_info['bytes_expected'] / 1024 ** 2:.1f} MB)"
+                )
             self.status_label.setText(status_text)
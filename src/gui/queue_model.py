@@ -0,0 +1,155 @@
+# src/gui/queue_model.py
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, QSortFilterProxyModel, Qt
+
+from ..video_downloader.queue_manager import DownloadStatus
+
+# Custom item data roles
+TaskRole = Qt.ItemDataRole.UserRole + 1  # the DownloadTask itself
+StatusRole = Qt.ItemDataRole.UserRole + 2  # DownloadStatus
+StatusOrderRole = Qt.ItemDataRole.UserRole + 3  # running first, then queued, then finished
+ProgressRole = Qt.ItemDataRole.UserRole + 4  # percent complete
+
+_STATUS_ORDER = {
+    DownloadStatus.DOWNLOADING: 0,
+    DownloadStatus.POSTPROCESSING: 1,
+    DownloadStatus.PENDING: 2,
+    DownloadStatus.FAILED: 3,
+    DownloadStatus.COMPLETED: 4,
+    DownloadStatus.CANCELLED: 5,
+}
+
+
+def task_label(task) -> str:
+    """One-line description of a task for the queue list."""
+    if task.status == DownloadStatus.DOWNLOADING:
+        return f"🔄 Downloading: {task.url[:40]}... ({task.progress:.1f}%)"
+    if task.status == DownloadStatus.POSTPROCESSING:
+        return f"⚙️ Processing: {task.url[:40]}..."
+    if task.status == DownloadStatus.PENDING and task.retries:
+        return f"🔁 Retry {task.retries}: {task.url[:40]}..."
+    if task.status == DownloadStatus.PENDING:
+        return f"⏳ Queued: {task.url[:40]}..."
+    if task.status == DownloadStatus.COMPLETED:
+        return f"✅ Completed: {task.url[:40]}..."
+    if task.status == DownloadStatus.FAILED:
+        return f"❌ Failed: {task.url[:40]}..."
+    return f"📋 {task.url[:40]}..."
+
+
+class QueueListModel(QAbstractListModel):
+    """
+    List model over download tasks, updated in place.
+
+    Rows are only added, changed or removed for the tasks an event is about, so
+    the cost of an update does not depend on the size of the queue. Labels are
+    built on demand for the rows the view actually paints.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._tasks = []  # row -> DownloadTask
+        self._rows = {}  # task id -> row
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._tasks)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        task = self._tasks[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return task_label(task)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{task.url}\n{task.error_message}" if task.error_message else task.url
+        if role == TaskRole:
+            return task
+        if role == StatusRole:
+            return task.status
+        if role == StatusOrderRole:
+            return _STATUS_ORDER.get(task.status, len(_STATUS_ORDER))
+        if role == ProgressRole:
+            return task.progress
+        return None
+
+    def task_at(self, row: int):
+        return self._tasks[row]
+
+    def update_tasks(self, tasks):
+        """Refresh rows for these tasks, appending the ones not shown yet."""
+        new_tasks = []
+        for task in tasks:
+            row = self._rows.get(task.id)
+            if row is None:
+                new_tasks.append(task)
+                continue
+            self._tasks[row] = task
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+        if new_tasks:
+            # A task may appear twice in one batch; only add it once
+            new_tasks = list({task.id: task for task in new_tasks}.values())
+            first = len(self._tasks)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_tasks) - 1)
+            for offset, task in enumerate(new_tasks):
+                self._rows[task.id] = first + offset
+                self._tasks.append(task)
+            self.endInsertRows()
+
+    def remove_tasks(self, task_ids):
+        """Remove the rows of these tasks."""
+        rows = sorted((self._rows[task_id] for task_id in set(task_ids) if task_id in self._rows),
+                      reverse=True)
+        if not rows:
+            return
+        # Remove contiguous runs from the end so earlier row numbers stay valid
+        start = end = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == start - 1:
+                start = row
+                continue
+            self.beginRemoveRows(QModelIndex(), start, end)
+            del self._tasks[start:end + 1]
+            self.endRemoveRows()
+            if row is not None:
+                start = end = row
+        self._rows = {task.id: row for row, task in enumerate(self._tasks)}
+
+    def sync(self, tasks):
+        """Match the model to a full ``{id: task}`` snapshot (e.g. after restoring the queue)."""
+        self.remove_tasks([task_id for task_id in self._rows if task_id not in tasks])
+        self.update_tasks(tasks.values())
+
+
+class QueueFilterProxyModel(QSortFilterProxyModel):
+    """Filters the queue by status and sorts it by queue order, status or progress."""
+
+    SORT_ROLES = {
+        "Queue order": None,  # unsorted: the order tasks were added in
+        "Status": StatusOrderRole,
+        "Progress": ProgressRole,
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._statuses = None  # None shows every status
+        self.setDynamicSortFilter(True)
+
+    def set_status_filter(self, statuses):
+        """Only show tasks whose status is in ``statuses``; None shows all."""
+        self._statuses = set(statuses) if statuses is not None else None
+        self.invalidateFilter()
+
+    def set_sort_mode(self, mode: str):
+        """Sort by one of ``SORT_ROLES``; progress sorts highest first."""
+        role = self.SORT_ROLES[mode]
+        if role is None:
+            self.sort(-1)
+            return
+        self.setSortRole(role)
+        order = Qt.SortOrder.DescendingOrder if mode == "Progress" else Qt.SortOrder.AscendingOrder
+        self.sort(0, order)
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self._statuses is None:
+            return True
+        return self.sourceModel().task_at(source_row).status in self._statuses
@@ -0,0 +1,202 @@
+# src/video_downloader/archive.py
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "video_downloader", "archive.sqlite3"
+)
+
+# (extractor key, video id, file format, resolution)
+ArchiveKey = Tuple[str, str, str, str]
+
+
+def archive_key(extractor: str, video_id: str, file_format: str,
+                resolution: Optional[Any] = None) -> ArchiveKey:
+    """Build the archive key of one download; audio formats ignore the resolution."""
+    resolution = "" if resolution is None or file_format == "mp3" else str(resolution)
+    return (extractor.lower(), str(video_id), file_format.lower(), resolution)
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings: no false negatives, rare false positives."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        bits = math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))
+        self.num_bits = max(64, bits)
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        # Double hashing: k positions from two 64-bit halves
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7))
+                   for position in self._positions(item))
+
+
+class DownloadArchive:
+    """
+    Persistent record of finished downloads, used to skip them on later runs.
+
+    Entries are keyed by extractor, video ID, file format and resolution, so
+    the same video can still be fetched in another format or quality. Lookups
+    go through an in-memory bloom filter first: videos that were never
+    downloaded (the common case when re-syncing a channel) are answered
+    without touching the database.
+    """
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_PATH, error_rate: float = 0.001):
+        """
+        :param path: SQLite database file, or ':memory:' for a process-local archive
+        :param error_rate: Bloom filter false-positive rate (a false positive only
+                           costs one database lookup)
+        """
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.bloom_negatives = 0
+        self.db_lookups = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS archive ("
+            " extractor TEXT NOT NULL,"
+            " video_id TEXT NOT NULL,"
+            " format TEXT NOT NULL,"
+            " resolution TEXT NOT NULL,"
+            " title TEXT,"
+            " path TEXT,"
+            " downloaded_at REAL NOT NULL,"
+            " PRIMARY KEY (extractor, video_id, format, resolution)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+        self._rebuild_filter()
+
+    @staticmethod
+    def _bloom_item(key: ArchiveKey) -> str:
+        return "\x1f".join(key)
+
+    def _rebuild_filter(self, minimum: int = 0):
+        """Size the bloom filter for the archive (with room to grow) and load every key."""
+        count = self._conn.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+        self._bloom = BloomFilter(max(10000, 2 * max(count, minimum)), self.error_rate)
+        for row in self._conn.execute("SELECT extractor, video_id, format, resolution FROM archive"):
+            self._bloom.add(self._bloom_item(row))
+
+    def contains(self, key: ArchiveKey) -> bool:
+        """Whether this video was already downloaded in this format and resolution."""
+        with self.lock:
+            if self._bloom_item(key) not in self._bloom:
+                self.bloom_negatives += 1
+                return False
+            self.db_lookups += 1
+            row = self._conn.execute(
+                "SELECT 1 FROM archive WHERE extractor = ? AND video_id = ?"
+                " AND format = ? AND resolution = ?",
+                key,
+            ).fetchone()
+        return row is not None
+
+    def add(self, key: ArchiveKey, title: Optional[str] = None, path: Optional[str] = None):
+        """Record a finished download."""
+        self.add_many([(key, title, path)])
+
+    def add_many(self, entries: Iterable[Tuple[ArchiveKey, Optional[str], Optional[str]]]):
+        rows = [key + (title, path, time.time()) for key, title, path in entries]
+        if not rows:
+            return
+        with self.lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO archive"
+                " (extractor, video_id, format, resolution, title, path, downloaded_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            if self._bloom.count + len(rows) > self._bloom.capacity:
+                # Past its capacity the false-positive rate climbs; resize
+                self._rebuild_filter(self._bloom.count + len(rows))
+            else:
+                for row in rows:
+                    self._bloom.add(self._bloom_item(row[:4]))
+
+    def remove(self, key: ArchiveKey):
+        """Forget a download so it is fetched again (the bloom filter keeps a stale bit)."""
+        with self.lock:
+            self._conn.execute(
+                "DELETE FROM archive WHERE extractor = ? AND video_id = ?"
+                " AND format = ? AND resolution = ?",
+                key,
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self._conn.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Get lookup counters and the archive size."""
+        with self.lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM archive").fetchone()[0]
+            return {
+                "entries": entries,
+                "bloom_negatives": self.bloom_negatives,
+                "db_lookups": self.db_lookups,
+                "bloom_bits": self._bloom.num_bits,
+            }
+
+    def close(self):
+        with self.lock:
+            self._conn.close()
+
+
+_default_archive = None
+_default_archive_set = False
+_default_archive_lock = threading.Lock()
+
+
+def get_download_archive() -> Optional[DownloadArchive]:
+    """Get the process-wide archive, opening the default database on first use."""
+    global _default_archive, _default_archive_set
+    with _default_archive_lock:
+        if not _default_archive_set:
+            try:
+                _default_archive = DownloadArchive()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Download archive disabled: {e}")
+                _default_archive = None
+            _default_archive_set = True
+        return _default_archive
+
+
+def set_download_archive(archive: Optional[DownloadArchive]):
+    """Replace the process-wide archive. Pass None to always download."""
+    global _default_archive, _default_archive_set
+    with _default_archive_lock:
+        _default_archive = archive
+        _default_archive_set = True
@@ -0,0 +1,199 @@
+# src/video_downloader/async_queue.py
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from .queue_manager import DownloadQueueManager, DownloadTask
+
+
+class DownloadFailed(Exception):
+    """Raised when awaiting a download that failed; ``task`` holds the details."""
+
+    def __init__(self, task: DownloadTask):
+        super().__init__(task.error_message or "Download failed")
+        self.task = task
+
+
+class DownloadHandle:
+    """
+    Awaitable handle of a queued download.
+
+    ``await handle`` returns the finished ``DownloadTask``, raises
+    ``DownloadFailed`` if it failed and ``asyncio.CancelledError`` if it was
+    cancelled. Cancelling the awaiting coroutine (e.g. through
+    ``asyncio.wait_for``) cancels the download; wrap the handle in
+    ``asyncio.shield`` to keep it running.
+    """
+
+    def __init__(self, queue: "AsyncDownloadQueueManager", task_id: str, future: asyncio.Future):
+        self.task_id = task_id
+        self._queue = queue
+        self._future = future
+        self._watchers: List[asyncio.Event] = []
+        future.add_done_callback(self._on_done)
+
+    def __await__(self):
+        return self._future.__await__()
+
+    @property
+    def task(self) -> Optional[DownloadTask]:
+        """The live task record (None once cleared from the queue)."""
+        return self._queue.manager.get_task_status(self.task_id)
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def cancel(self, partial_files: Optional[str] = None) -> bool:
+        """Cancel the download; a running transfer stops at its next chunk."""
+        return self._queue.manager.cancel_download(self.task_id, partial_files)
+
+    async def progress(self) -> AsyncIterator[DownloadTask]:
+        """
+        Yield the task whenever its progress changes, until it finishes.
+
+        Updates that arrive while the consumer is busy are merged: the next
+        iteration sees the latest state.
+        """
+        changed = asyncio.Event()
+        self._watchers.append(changed)
+        try:
+            while not self._future.done():
+                await changed.wait()
+                changed.clear()
+                task = self.task
+                if task is not None:
+                    yield task
+        finally:
+            self._watchers.remove(changed)
+
+    def _notify(self):
+        for changed in self._watchers:
+            changed.set()
+
+    def _on_done(self, future: asyncio.Future):
+        self._notify()
+        if future.cancelled():
+            # Cancelled from the asyncio side (or already cancelled in the queue)
+            self._queue.manager.cancel_download(self.task_id)
+
+
+class AsyncDownloadQueueManager:
+    """
+    asyncio front end for ``DownloadQueueManager``.
+
+    Downloads still run on the manager's bounded pool of worker threads;
+    their callbacks are handed to the event loop in batches, so tracking
+    thousands of tasks costs one future each and no extra threads. Create and
+    use it from a single event loop.
+    """
+
+    def __init__(self, download_function: Callable, max_workers: int = 3,
+                 progress_rate: float = 10.0, **options: Any):
+        """
+        :param download_function: Blocking download function, e.g. download_video
+        :param max_workers: Downloads running at once (the executor size)
+        :param progress_rate: Maximum progress batches per second passed to the loop
+        :param options: Other DownloadQueueManager arguments (journal, max_per_host, ...)
+        """
+        self.manager = DownloadQueueManager(
+            download_function, max_workers=max_workers, progress_rate=progress_rate, **options
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._handles: Dict[str, DownloadHandle] = {}
+        self._idle_waiters: List[asyncio.Future] = []
+
+        manager = self.manager
+        manager.on_progress_batch = lambda tasks: self._call_soon(self._dispatch_progress, tasks)
+        manager.on_task_completed = lambda task: self._call_soon(self._dispatch_completed, task)
+        manager.on_task_failed = lambda task: self._call_soon(self._dispatch_failed, task)
+        manager.on_task_cancelled = lambda task: self._call_soon(self._dispatch_cancelled, task)
+        manager.on_queue_empty = lambda: self._call_soon(self._dispatch_idle)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def add_download(self, url: str, options: Dict[str, Any], priority: int = 0,
+                     rate_limit: Optional[int] = None) -> DownloadHandle:
+        """Queue a download and return an awaitable handle. Call from the event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        task_id = self.manager.add_download(url, options, priority=priority, rate_limit=rate_limit)
+        # Callbacks for this task are queued behind us on the loop, so the
+        # handle is registered before any of them runs
+        handle = DownloadHandle(self, task_id, loop.create_future())
+        self._handles[task_id] = handle
+        return handle
+
+    def get_handle(self, task_id: str) -> Optional[DownloadHandle]:
+        """The handle of an unfinished download."""
+        return self._handles.get(task_id)
+
+    def get_queue_info(self) -> Dict[str, Any]:
+        return self.manager.get_queue_info()
+
+    def set_max_workers(self, count: int):
+        self.manager.set_max_workers(count)
+
+    async def join(self):
+        """Wait until nothing is pending or downloading."""
+        # A drain notification may be stale by the time it is dispatched; recheck
+        while not self.manager.wait_until_idle(0):
+            waiter = asyncio.get_running_loop().create_future()
+            self._idle_waiters.append(waiter)
+            await waiter
+
+    async def aclose(self, timeout: Optional[float] = 10.0) -> bool:
+        """
+        Stop the workers without blocking the event loop.
+
+        Running downloads are interrupted and requeued as in
+        ``DownloadQueueManager.stop_processing``. Returns True if every worker exited.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.manager.stop_processing, timeout)
+
+    def _call_soon(self, callback, *args):
+        # Called from worker threads
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # the loop has been closed
+
+    def _finish(self, task_id: str) -> Optional[asyncio.Future]:
+        handle = self._handles.pop(task_id, None)
+        if handle is None or handle.done():
+            return None
+        return handle._future
+
+    def _dispatch_progress(self, tasks: List[DownloadTask]):
+        for task in tasks:
+            handle = self._handles.get(task.id)
+            if handle is not None:
+                handle._notify()
+
+    def _dispatch_completed(self, task: DownloadTask):
+        future = self._finish(task.id)
+        if future is not None:
+            future.set_result(task)
+
+    def _dispatch_failed(self, task: DownloadTask):
+        future = self._finish(task.id)
+        if future is not None:
+            future.set_exception(DownloadFailed(task))
+
+    def _dispatch_cancelled(self, task: DownloadTask):
+        future = self._finish(task.id)
+        if future is not None:
+            future.cancel()
+
+    def _dispatch_idle(self):
+        waiters, self._idle_waiters = self._idle_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
@@ -0,0 +1,171 @@
+# src/video_downloader/autoscale.py
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Optional
+
+from .fragments import get_fragment_concurrency
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ScalingDecision:
+    """One change of the worker count made by WorkerAutoscaler."""
+    time: float  # time.time() of the decision
+    workers_before: int
+    workers: int
+    # "grow" (all workers busy, tasks ready to start), "no-gain" (the last step did
+    # not raise throughput), "errors" or "throttled"
+    reason: str
+    rate: float  # aggregate bytes/sec over the last interval
+    failed: int  # tasks failed during the interval
+    throttled: int  # HTTP 429 failures and retried fragment downloads during the interval
+
+
+class WorkerAutoscaler:
+    """
+    AIMD controller for the worker count of a DownloadQueueManager.
+
+    Every ``interval`` seconds it samples the manager's running totals (bytes
+    transferred, finished and failed tasks, HTTP 429 failures) and the
+    fragment back-offs of ``FragmentConcurrency``:
+
+    - any throttling, or a failure rate above ``error_threshold``, cuts the
+      worker count by ``backoff`` (multiplicative decrease) and pauses growth
+      for ``hold`` intervals;
+    - while every worker holds a download and a queued task could start (its
+      host is below ``max_per_host``, not paused and not backing off), the
+      count grows by ``increase`` (additive increase) as long as each step
+      raises the aggregate rate by ``improvement``; a step that does not is
+      undone and growth pauses for ``hold`` intervals (the pipe is full).
+
+    The count stays between ``min_workers`` and ``max_workers``. Every change
+    is passed to ``on_decision`` (from the autoscaler's thread) and kept in
+    ``decisions``.
+    """
+
+    def __init__(self, manager, min_workers: int = 1, max_workers: int = 16,
+                 interval: float = 2.0, increase: int = 1, backoff: float = 0.5,
+                 improvement: float = 0.05, error_threshold: float = 0.2, hold: int = 5):
+        """
+        :param manager: The DownloadQueueManager to resize
+        :param min_workers: Lower bound of the worker count
+        :param max_workers: Upper bound of the worker count
+        :param interval: Seconds between samples
+        :param increase: Workers added per growth step
+        :param backoff: Factor the worker count is multiplied by on errors or throttling
+        :param improvement: Relative rate gain a growth step must bring to be kept
+        :param error_threshold: Share of failed tasks in an interval that counts as errors
+        :param hold: Intervals without growth after a back-off or a step without gain
+        """
+        if not 1 <= min_workers <= max_workers:
+            raise ValueError("need 1 <= min_workers <= max_workers")
+        self.manager = manager
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.interval = interval
+        self.increase = increase
+        self.backoff = backoff
+        self.improvement = improvement
+        self.error_threshold = error_threshold
+        self.hold = hold
+        self.decisions: Deque[ScalingDecision] = deque(maxlen=100)
+        self.on_decision: Optional[Callable[[ScalingDecision], None]] = None
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last = None  # (monotonic time, bytes, completed, failed, throttled)
+        self._held = 0
+        self._settling = False
+        self._rate_before_growth: Optional[float] = None
+
+    def start(self):
+        """Start sampling on a daemon thread; the worker count is clamped to the bounds first."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        workers = min(self.max_workers, max(self.min_workers, self.manager.max_workers))
+        if workers != self.manager.max_workers:
+            self.manager.set_max_workers(workers)
+        self._last = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="WorkerAutoscaler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling; the worker count stays where it is."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.step()
+            except Exception as e:
+                logger.warning(f"Autoscaler step failed: {e}")
+
+    def _sample(self):
+        info = self.manager.get_queue_info()
+        fragments = get_fragment_concurrency()
+        throttled = info["throttled_total"] + (fragments.backoffs if fragments is not None else 0)
+        sample = (time.monotonic(), info["bytes_transferred"], info["completed_total"],
+                  info["failed_total"], throttled)
+        return info, sample
+
+    def step(self) -> Optional[ScalingDecision]:
+        """Take one sample and resize the pool if needed; returns the decision, if any."""
+        info, sample = self._sample()
+        last, self._last = self._last, sample
+        if last is None:
+            return None
+        elapsed = sample[0] - last[0]
+        if elapsed <= 0:
+            return None
+        rate = (sample[1] - last[1]) / elapsed
+        completed, failed, throttled = (now - before for now, before in zip(sample[2:], last[2:]))
+
+        workers = self.manager.max_workers
+        growing, self._rate_before_growth = self._rate_before_growth, None
+        reason = None
+        if throttled:
+            reason, target = "throttled", int(workers * self.backoff)
+        elif failed and failed / (completed + failed) > self.error_threshold:
+            reason, target = "errors", int(workers * self.backoff)
+        elif self._settling:
+            # Workers added or removed in the last interval were still ramping
+            # up; judge a growth step by the interval after
+            self._settling = False
+            self._rate_before_growth = growing
+        elif growing is not None and rate <= growing * (1 + self.improvement):
+            reason, target = "no-gain", workers - self.increase
+        elif self._held:
+            self._held -= 1
+        elif (info["pending"] and info["busy_workers"] >= workers
+              and self.manager.task_queue.has_runnable()):
+            # Another worker would start a task; tasks waiting on a host slot don't count
+            reason, target = "grow", workers + self.increase
+
+        if reason is None:
+            return None
+        target = min(self.max_workers, max(self.min_workers, target))
+        if reason == "grow":
+            if target == workers:
+                return None
+            self._rate_before_growth = rate
+        else:
+            self._held = self.hold
+            if target == workers:
+                return None
+
+        self.manager.set_max_workers(target)
+        self._settling = True
+        decision = ScalingDecision(time.time(), workers, target, reason, rate, failed, throttled)
+        self.decisions.append(decision)
+        logger.info(f"Autoscaler: {workers} -> {target} workers ({reason}, {rate / 1024:.0f} KiB/s)")
+        if self.on_decision:
+            self.on_decision(decision)
+        return decision
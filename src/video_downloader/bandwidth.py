@@ -0,0 +1,193 @@
+# src/video_downloader/bandwidth.py
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# (start "HH:MM", end "HH:MM", bytes/sec or None for unlimited); windows may wrap midnight
+ScheduleWindow = Tuple[str, str, Optional[int]]
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class TokenBucket:
+    """Token bucket that blocks the caller once it has used up its byte budget."""
+
+    def __init__(self, rate: Optional[float] = None, burst_seconds: float = 1.0):
+        self.burst_seconds = burst_seconds
+        self.lock = threading.Lock()
+        self.rate = None
+        self.tokens = 0.0
+        self.last = time.monotonic()
+        self.set_rate(rate)
+
+    def set_rate(self, rate: Optional[float]):
+        """Change the rate in bytes/sec. None means unlimited."""
+        with self.lock:
+            self._refill()
+            self.rate = rate if rate and rate > 0 else None
+            if self.rate is not None:
+                self.tokens = min(self.tokens, self.rate * self.burst_seconds)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate is not None:
+            self.tokens = min(
+                self.tokens + (now - self.last) * self.rate,
+                self.rate * self.burst_seconds,
+            )
+        self.last = now
+
+    def consume(self, nbytes: int):
+        """Take nbytes from the bucket, sleeping off any debt."""
+        with self.lock:
+            if self.rate is None:
+                return
+            self._refill()
+            self.tokens -= nbytes
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if delay > 0:
+            time.sleep(delay)
+
+
+class BandwidthLimiter:
+    """
+    Divides a global bytes/sec budget among the downloads that are running.
+
+    Every active task gets its own token bucket. Whenever a task starts or
+    finishes, or the limit changes, the budget is split again: tasks with a
+    per-task cap below their fair share keep their cap, and what they leave
+    unused is shared by the others. Throttling happens in a progress hook, so
+    it works for every yt-dlp downloader.
+    """
+
+    def __init__(self, limit: Optional[int] = None,
+                 schedule: Optional[List[ScheduleWindow]] = None):
+        """
+        :param limit: Global bytes/sec budget, or None for unlimited
+        :param schedule: Time-of-day windows that override the limit while active
+        """
+        self.lock = threading.Lock()
+        self.limit = limit
+        self.schedule = list(schedule or [])
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._caps: Dict[str, Optional[int]] = {}
+        self._effective_limit = self._scheduled_limit()
+        self._next_schedule_check = time.monotonic() + 1.0
+
+    def _scheduled_limit(self, now: Optional[datetime] = None) -> Optional[int]:
+        now = now or datetime.now()
+        minute = now.hour * 60 + now.minute
+        for start, end, limit in self.schedule:
+            start_minute, end_minute = _minutes(start), _minutes(end)
+            if start_minute <= end_minute:
+                active = start_minute <= minute < end_minute
+            else:  # window wraps midnight
+                active = minute >= start_minute or minute < end_minute
+            if active:
+                return limit
+        return self.limit
+
+    def current_limit(self) -> Optional[int]:
+        """The global budget in effect right now."""
+        with self.lock:
+            return self._effective_limit
+
+    def set_limit(self, limit: Optional[int]):
+        """Change the global budget (used outside scheduled windows). None means unlimited."""
+        with self.lock:
+            self.limit = limit if limit and limit > 0 else None
+            self._effective_limit = self._scheduled_limit()
+            self._rebalance()
+
+    def set_schedule(self, schedule: Optional[List[ScheduleWindow]]):
+        """Replace the time-of-day schedule."""
+        with self.lock:
+            self.schedule = list(schedule or [])
+            self._effective_limit = self._scheduled_limit()
+            self._rebalance()
+
+    def register(self, task_id: str, cap: Optional[int] = None):
+        """Start accounting for a running task, optionally capped at cap bytes/sec."""
+        with self.lock:
+            self._buckets[task_id] = TokenBucket()
+            self._caps[task_id] = cap
+            self._rebalance()
+
+    def unregister(self, task_id: str):
+        """Stop accounting for a task and hand its share to the others."""
+        with self.lock:
+            self._buckets.pop(task_id, None)
+            self._caps.pop(task_id, None)
+            self._rebalance()
+
+    def set_task_cap(self, task_id: str, cap: Optional[int]):
+        """Change the per-task cap of a running task."""
+        with self.lock:
+            if task_id in self._caps:
+                self._caps[task_id] = cap
+                self._rebalance()
+
+    def allocations(self) -> Dict[str, Optional[float]]:
+        """Current bytes/sec allocated to each running task."""
+        with self.lock:
+            return {task_id: bucket.rate for task_id, bucket in self._buckets.items()}
+
+    def _rebalance(self):
+        """Split the budget across running tasks (water-filling over per-task caps)."""
+        rates = {task_id: cap for task_id, cap in self._caps.items()}
+        if self._effective_limit is not None and rates:
+            remaining = float(self._effective_limit)
+            # Capped tasks below the fair share keep their cap, smallest first
+            uncapped = set(rates)
+            for task_id in sorted(
+                (t for t in rates if rates[t] is not None), key=lambda t: rates[t]
+            ):
+                share = remaining / len(uncapped)
+                if rates[task_id] <= share:
+                    remaining -= rates[task_id]
+                    uncapped.discard(task_id)
+                else:
+                    break
+            for task_id in uncapped:
+                rates[task_id] = remaining / len(uncapped)
+        for task_id, bucket in self._buckets.items():
+            bucket.set_rate(rates.get(task_id))
+
+    def throttle(self, task_id: str, nbytes: int):
+        """Account for nbytes transferred by a task, blocking if it is over budget."""
+        if nbytes <= 0:
+            return
+        now = time.monotonic()
+        with self.lock:
+            if self.schedule and now >= self._next_schedule_check:
+                self._next_schedule_check = now + 1.0
+                limit = self._scheduled_limit()
+                if limit != self._effective_limit:
+                    self._effective_limit = limit
+                    self._rebalance()
+            bucket = self._buckets.get(task_id)
+        if bucket is not None:
+            bucket.consume(nbytes)
+
+    def make_progress_hook(self, task_id: str):
+        """Build a yt-dlp progress hook that throttles the given task."""
+        last = {"filename": None, "bytes": 0}
+
+        def hook(data):
+            if data.get("status") != "downloading":
+                return
+            downloaded = data.get("downloaded_bytes") or 0
+            if data.get("filename") != last["filename"]:
+                # New file (or a resumed .part): only count bytes from here on
+                last["filename"] = data.get("filename")
+                last["bytes"] = downloaded
+                return
+            delta = downloaded - last["bytes"]
+            last["bytes"] = downloaded
+            self.throttle(task_id, delta)
+
+        return hook
@@ -0,0 +1,335 @@
+# src/video_downloader/cli.py
+"""
+Headless batch downloader built on DownloadQueueManager.
+
+Reads URLs (one per line, '#' comments allowed) from a file, stdin or the
+command line, downloads them with a pool of workers and writes one JSON object
+per line to stdout for every task event. All other output goes to stderr.
+Exits with status 1 if any task failed. Never imports the GUI (PyQt6).
+"""
+import argparse
+import dataclasses
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from .archive import DownloadArchive, set_download_archive
+from .autoscale import WorkerAutoscaler
+from .downloader import download_video, get_playlist_entries
+from .journal import TaskJournal
+from .metrics import MetricsServer
+from .queue_manager import DEFAULT_POSTPROCESS_WORKERS, DownloadQueueManager
+from .retry import DEFAULT_RETRY_POLICY
+from .session import YoutubeDLSession
+from .tracing import Tracer, set_tracer
+
+DEFAULT_OUTPUT_DIR = "downloaded_content"
+
+
+def parse_fragments(value):
+    """Parse --fragments: 'auto' or a positive number."""
+    if value.lower() == "auto":
+        return "auto"
+    count = int(value)
+    if count < 1:
+        raise argparse.ArgumentTypeError("must be 'auto' or at least 1")
+    return count
+
+
+def parse_bounds(value):
+    """Parse --autoscale bounds like '1:16'."""
+    try:
+        low, high = (int(part) for part in value.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid bounds: {value!r} (expected MIN:MAX)")
+    if not 1 <= low <= high:
+        raise argparse.ArgumentTypeError(f"invalid bounds: {value!r} (need 1 <= MIN <= MAX)")
+    return low, high
+
+
+def parse_rate(value):
+    """Parse a rate like '500K' or '2M' (bytes/sec)."""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    value = value.strip().upper().rstrip("B").rstrip("/S")
+    try:
+        if value and value[-1] in units:
+            return int(float(value[:-1]) * units[value[-1]])
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid rate: {value!r}")
+
+
+def read_urls(args):
+    """Collect URLs from positional arguments and the input file (or stdin)."""
+    lines = list(args.urls)
+    if args.input == "-":
+        if not args.urls or not sys.stdin.isatty():
+            lines.extend(sys.stdin.read().splitlines())
+    elif args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            lines.extend(f.read().splitlines())
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith("#")]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m video_downloader",
+        description="Download videos and playlists headlessly, reporting JSON-lines progress.",
+    )
+    parser.add_argument("urls", nargs="*", help="URLs to download (in addition to --input)")
+    parser.add_argument(
+        "-i", "--input", default="-",
+        help="file with one URL per line; '-' reads stdin (default)",
+    )
+    parser.add_argument(
+        "-o", "--output", default=DEFAULT_OUTPUT_DIR,
+        help=f"download directory (default: {DEFAULT_OUTPUT_DIR})",
+    )
+    parser.add_argument("-w", "--workers", type=int, default=3, help="concurrent downloads (default: 3)")
+    parser.add_argument(
+        "--autoscale", type=parse_bounds, metavar="MIN:MAX",
+        help="adjust the worker count to the measured throughput between MIN and MAX, "
+             "starting from --workers",
+    )
+    parser.add_argument("-f", "--format", choices=["mp4", "mp3"], default="mp4", help="output format")
+    parser.add_argument("-r", "--resolution", help="maximum video height for mp4, e.g. 720")
+    parser.add_argument("--max-per-host", type=int, help="concurrent downloads allowed per site")
+    parser.add_argument("--limit-rate", type=parse_rate, help="global bandwidth limit, e.g. 500K or 2M")
+    parser.add_argument(
+        "--postprocess-workers", type=int, default=DEFAULT_POSTPROCESS_WORKERS,
+        help="threads running ffmpeg post-processing; 0 runs it inside the download "
+             f"worker (default: {DEFAULT_POSTPROCESS_WORKERS})",
+    )
+    parser.add_argument(
+        "--fragments", type=parse_fragments, default="auto",
+        help="HLS/DASH fragments fetched at once, or 'auto' to tune it per site (default: auto)",
+    )
+    parser.add_argument(
+        "--retries", type=int, default=DEFAULT_RETRY_POLICY.max_retries,
+        help="retries of a download that failed with a transient or throttling error "
+             f"(default: {DEFAULT_RETRY_POLICY.max_retries})",
+    )
+    parser.add_argument(
+        "--metrics-port", type=int, metavar="PORT",
+        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics while running",
+    )
+    parser.add_argument(
+        "--trace", metavar="FILE",
+        help="record timing spans of every task and write them to FILE as Chrome trace JSON "
+             "(open in https://ui.perfetto.dev or chrome://tracing)",
+    )
+    parser.add_argument("--journal", help="queue journal file; unfinished tasks in it are resumed")
+    parser.add_argument(
+        "--shutdown-timeout", type=float, default=10.0,
+        help="seconds to wait for running downloads to stop on Ctrl-C (default: 10)",
+    )
+    archive = parser.add_mutually_exclusive_group()
+    archive.add_argument("--archive", help="download archive file (default: the shared archive)")
+    archive.add_argument("--no-archive", action="store_true",
+                         help="download even videos that were downloaded before")
+    return parser
+
+
+class JsonLinesReporter:
+    """Writes queue events as JSON lines, tracking when every top-level task has finished."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.finished = set()  # top-level tasks that finished, possibly before being tracked
+        self.failed = 0
+        self.completed = 0
+        # A playlist counts as completed once any entry did, so failed
+        # entries are counted on their own
+        self.failed_entries = 0
+        self.done = threading.Event()
+        self._last_progress = {}
+
+    def emit(self, event, task=None, **fields):
+        record = {"event": event, "time": round(time.time(), 3)}
+        if task is not None:
+            record.update({"id": task.id, "url": task.url})
+            if task.parent_id:
+                record["parent_id"] = task.parent_id
+        record.update(fields)
+        with self.lock:
+            self.stream.write(json.dumps(record) + "\n")
+            self.stream.flush()
+
+    def track(self, task_ids):
+        """Wait for these top-level tasks; sets ``done`` once all of them have finished."""
+        with self.lock:
+            self.pending.update(set(task_ids) - self.finished)
+            if not self.pending:
+                self.done.set()
+
+    def _finish(self, task):
+        if task.parent_id is not None:
+            return
+        with self.lock:
+            self.finished.add(task.id)
+            if task.id not in self.pending:
+                return
+            self.pending.discard(task.id)
+            if not self.pending:
+                self.done.set()
+
+    def on_started(self, task):
+        self.emit("started", task, title=task.current_title)
+
+    def on_progress(self, task):
+        # Only report whole-percent changes to keep the stream readable
+        percent = int(task.progress)
+        if self._last_progress.get(task.id) == percent:
+            return
+        self._last_progress[task.id] = percent
+        self.emit("progress", task, progress=round(task.progress, 1),
+                  index=task.current_index, total=task.total_count, title=task.current_title)
+
+    def on_completed(self, task):
+        self._last_progress.pop(task.id, None)
+        if task.parent_id is None:
+            self.completed += 1
+        self.emit("completed", task, title=task.current_title, stage_times=task.stage_times,
+                  postprocess_steps=task.postprocess_steps)
+        self._finish(task)
+
+    def on_retrying(self, task):
+        self._last_progress.pop(task.id, None)
+        self.emit("retrying", task, retry=task.retries, kind=task.error_kind, error=task.error_message,
+                  delay=round(max(0.0, task.retry_at - time.time()), 1))
+
+    def on_failed(self, task):
+        self._last_progress.pop(task.id, None)
+        if task.parent_id is None:
+            self.failed += 1
+        else:
+            self.failed_entries += 1
+        self.emit("failed", task, error=task.error_message, stage_times=task.stage_times)
+        self._finish(task)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    # JSON lines own stdout; banners, logs and yt-dlp output go to stderr
+    out = sys.stdout
+    sys.stdout = sys.stderr
+    logging.basicConfig(level=logging.INFO)
+
+    if args.no_archive:
+        set_download_archive(None)
+    elif args.archive:
+        set_download_archive(DownloadArchive(args.archive))
+
+    urls = read_urls(args)
+    journal = TaskJournal(args.journal) if args.journal else None
+    manager = DownloadQueueManager(
+        download_video,
+        max_workers=max(1, args.workers),
+        playlist_expander=get_playlist_entries,
+        session_factory=YoutubeDLSession,
+        max_per_host=args.max_per_host,
+        bandwidth_limit=args.limit_rate,
+        journal=journal,
+        postprocess_workers=max(0, args.postprocess_workers),
+        retry_policy=dataclasses.replace(DEFAULT_RETRY_POLICY, max_retries=max(0, args.retries)),
+    )
+
+    reporter = JsonLinesReporter(out)
+    manager.on_task_started = reporter.on_started
+    manager.on_task_progress = reporter.on_progress
+    manager.on_task_completed = reporter.on_completed
+    manager.on_task_failed = reporter.on_failed
+    manager.on_task_retrying = reporter.on_retrying
+
+    metrics = None
+    if args.metrics_port is not None:
+        metrics = MetricsServer(manager, port=args.metrics_port).start()
+        reporter.emit("metrics", url=metrics.url)
+
+    resumed = manager.restore_from_journal()
+    # Finished tasks from earlier runs are history; keep the journal small
+    manager.clear_completed()
+    if not urls and not resumed:
+        reporter.emit("summary", total=0, completed=0, failed=0)
+        if metrics is not None:
+            metrics.stop()
+        return 0
+
+    resolution_suffix = f"_{args.resolution}p" if args.format == "mp4" and args.resolution else ""
+    options = {
+        "output_path": os.path.join(args.output, f"%(title)s{resolution_suffix}.%(ext)s"),
+        "file_format": args.format,
+        "resolution": args.resolution if args.format == "mp4" else None,
+        "is_playlist": True,
+        "fragment_concurrency": args.fragments,
+    }
+
+    task_ids = list(resumed)
+    for task_id in resumed:
+        reporter.emit("resumed", manager.get_task_status(task_id))
+    for url in urls:
+        task_id = manager.add_download(url, options)
+        reporter.emit("queued", manager.get_task_status(task_id))
+        task_ids.append(task_id)
+    # Tracked once everything is queued; tasks that already finished are skipped
+    reporter.track(task_ids)
+    tracer = None
+    if args.trace:
+        tracer = Tracer()
+        set_tracer(tracer)
+    manager.start_processing()
+    autoscaler = None
+    if args.autoscale:
+        autoscaler = WorkerAutoscaler(manager, min_workers=args.autoscale[0], max_workers=args.autoscale[1])
+        autoscaler.on_decision = lambda decision: reporter.emit(
+            "scaled", workers_before=decision.workers_before, workers=decision.workers,
+            reason=decision.reason, rate=round(decision.rate), failed=decision.failed,
+            throttled=decision.throttled,
+        )
+        autoscaler.start()
+
+    try:
+        while not reporter.done.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        # Running downloads stop at their next chunk and keep their .part files,
+        # so a journaled queue resumes them on the next run
+        if autoscaler is not None:
+            autoscaler.stop()
+        stopped = manager.stop_processing(timeout=args.shutdown_timeout)
+        # Only the interrupted downloads stay in the journal
+        manager.clear_completed()
+        reporter.emit("interrupted", pending=len(reporter.pending), stopped=stopped)
+        return 130
+    finally:
+        if metrics is not None:
+            metrics.stop()
+        if tracer is not None:
+            set_tracer(None)
+            try:
+                tracer.save(args.trace)
+                reporter.emit("trace", path=args.trace, spans=len(tracer))
+            except OSError as e:
+                logging.error(f"Could not write trace {args.trace}: {e}")
+    if autoscaler is not None:
+        autoscaler.stop()
+    manager.clear_completed()
+
+    reporter.emit(
+        "summary",
+        total=len(task_ids),
+        completed=reporter.completed,
+        failed=reporter.failed,
+        failed_entries=reporter.failed_entries,
+    )
+    return 1 if reporter.failed or reporter.failed_entries else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,38 @@
 # src/video_downloader/downloader.py
-import yt_dlp
-from yt_dlp.utils import DownloadError
+import functools
 import logging
 import os
 import re
 from pathlib import Path
 
+from .archive import archive_key, get_download_archive
+from .fragments import FragmentTuner, get_fragment_concurrency
+from .metadata_cache import get_metadata_cache
+from .postprocess import PostProcessJob
+from .retry import ErrorKind, classify_error
+from .scheduler import host_of
+from .tracing import DownloadPhases, get_tracer, span
 
-# Configure logging for error reporting
-logging.basicConfig(level=logging.INFO)
+# yt_dlp is imported inside the functions that need it: importing it costs more
+# than the rest of the application put together, and tools that only need
+# helpers like sanitize_filename should not pay for it. Logging is configured
+# by the entry points (GUI and CLI), not on import.
 logger = logging.getLogger(__name__)
 
+
+def preload_yt_dlp():
+    """
+    Import yt-dlp and its extractors ahead of the first download.
+    
+    Meant to run in a background thread right after startup, so the first
+    download doesn't pay the import cost.
+    """
+    import yt_dlp
+    from yt_dlp.extractor import gen_extractor_classes
+    
+    gen_extractor_classes()
+    return yt_dlp
+
 def sanitize_filename(filename):
     """
     Sanitize a filename by removing or replacing invalid characters.
@@ -32,6 +54,37 @@ def sanitize_filename(filename):
     return sanitized if sanitized else "Unknown"
 
 
+def extract_info_cached(url, ydl_opts, kind="full"):
+    """
+    Extract info for a URL, serving repeated lookups from the metadata cache.
+    
+    :param url: The video or playlist URL
+    :param ydl_opts: Options for the extracting YoutubeDL instance
+    :param kind: Cache namespace; 'full' for resolved info, 'flat' for flat listings
+    :return: Sanitized info dictionary, or None if nothing was extracted
+    """
+    cache = get_metadata_cache()
+    if cache is not None:
+        info = cache.get(url, kind)
+        if info is not None:
+            return info
+    
+    import yt_dlp
+    
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+        if info is None:
+            return None
+        info = ydl.sanitize_info(info)
+    
+    if cache is not None:
+        try:
+            cache.put(url, info, kind)
+        except Exception as e:
+            logger.warning(f"Could not cache info for {url}: {e}")
+    return info
+
+
 def get_playlist_info(url):
     """
     Extract playlist information without downloading.
@@ -40,34 +93,69 @@ def get_playlist_info(url):
     :return: Dictionary with playlist info (title, uploader, count, etc.)
     """
     ydl_opts = {
-        'extract_flat': True,  # Don't extract individual video info
+        'extract_flat': 'in_playlist',  # Don't extract individual video info
         'quiet': True,  # Suppress output
     }
     
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        info = extract_info_cached(url, ydl_opts, kind="flat")
+        if info is None:
+            return None
             
-            if info is None:
-                return None
-                
-            # Check if it's actually a playlist
-            if info.get('_type') != 'playlist':
-                return None
-                
-            return {
-                'title': info.get('title', 'Unknown Playlist'),
-                'uploader': info.get('uploader', 'Unknown'),
-                'description': info.get('description', ''),
-                'entry_count': len(info.get('entries', [])),
-                'id': info.get('id', ''),
-                'webpage_url': info.get('webpage_url', url)
-            }
+        # Check if it's actually a playlist
+        if info.get('_type') != 'playlist':
+            return None
+            
+        return {
+            'title': info.get('title', 'Unknown Playlist'),
+            'uploader': info.get('uploader', 'Unknown'),
+            'description': info.get('description', ''),
+            'entry_count': len(info.get('entries', [])),
+            'id': info.get('id', ''),
+            'webpage_url': info.get('webpage_url', url)
+        }
     except Exception as e:
         print(f"Warning: Could not extract playlist info: {e}")
         return None
 
 
+def get_playlist_entries(url):
+    """
+    List the entries of a playlist so they can be queued as individual tasks.
+    
+    :param url: The playlist URL
+    :return: List of entry dictionaries (url, title, index), or None if the URL
+             is not a playlist or could not be extracted
+    """
+    ydl_opts = {
+        'extract_flat': 'in_playlist',  # Only list entries, don't resolve each video
+        'quiet': True,  # Suppress output
+        'no_warnings': True,  # Suppress warnings
+    }
+    
+    try:
+        info = extract_info_cached(url, ydl_opts, kind="flat")
+        if info is None or info.get('_type') != 'playlist':
+            return None
+        
+        entries = []
+        for index, entry in enumerate(info.get('entries') or [], start=1):
+            if not entry:
+                continue
+            entry_url = entry.get('url') or entry.get('webpage_url')
+            if not entry_url:
+                continue
+            entries.append({
+                'url': entry_url,
+                'title': entry.get('title') or entry_url,
+                'index': index,
+            })
+        return entries
+    except Exception as e:
+        print(f"Warning: Could not list playlist entries: {e}")
+        return None
+
+
 def get_video_info(url):
     """
     Extract video information without downloading.
@@ -81,30 +169,28 @@ def get_video_info(url):
     }
     
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        info = extract_info_cached(url, ydl_opts, kind="full")
+        if info is None:
+            return None
             
-            if info is None:
+        # For single videos or if it's the first video of a playlist
+        if info.get('_type') == 'playlist':
+            # If URL points to a playlist but we want single video info
+            # Get the first video info
+            entries = info.get('entries', [])
+            if entries:
+                info = entries[0]
+            else:
                 return None
                 
-            # For single videos or if it's the first video of a playlist
-            if info.get('_type') == 'playlist':
-                # If URL points to a playlist but we want single video info
-                # Get the first video info
-                entries = info.get('entries', [])
-                if entries:
-                    info = entries[0]
-                else:
-                    return None
-                    
-            return {
-                'title': info.get('title', 'Unknown Video'),
-                'uploader': info.get('uploader', 'Unknown'),
-                'description': info.get('description', ''),
-                'duration': info.get('duration', 0),
-                'id': info.get('id', ''),
-                'webpage_url': info.get('webpage_url', url)
-            }
+        return {
+            'title': info.get('title', 'Unknown Video'),
+            'uploader': info.get('uploader', 'Unknown'),
+            'description': info.get('description', ''),
+            'duration': info.get('duration', 0),
+            'id': info.get('id', ''),
+            'webpage_url': info.get('webpage_url', url)
+        }
     except Exception as e:
         print(f"Warning: Could not extract video info: {e}")
         return None
@@ -130,6 +216,164 @@ def create_organized_folders(base_path, is_playlist=False, playlist_info=None, v
     return format_folder
 
 
+def _announce_info(info):
+    """Print a short description of an extracted video or playlist."""
+    if info.get('_type') == 'playlist':
+        entries = info.get('entries')
+        count = info.get('playlist_count') or (len(entries) if isinstance(entries, list) else '?')
+        print(f"Found playlist: '{info.get('title', 'Unknown Playlist')}' by {info.get('uploader', 'Unknown')} ({count} videos)")
+    else:
+        print(f"Found video: '{info.get('title', 'Unknown Video')}' by {info.get('uploader', 'Unknown')}")
+
+
+@functools.lru_cache(maxsize=4096)
+def url_archive_id(url):
+    """
+    Work out which video a URL points to without any network access.
+    
+    :param url: The video URL
+    :return: (extractor key, video ID), or None if the URL doesn't identify a
+             single video by itself (playlists, short links, unknown sites)
+    """
+    from yt_dlp.extractor import gen_extractor_classes
+    
+    for ie in gen_extractor_classes():
+        if not ie.suitable(url):
+            continue
+        if ie.ie_key() == "Generic":
+            return None
+        try:
+            video_id = ie.get_temp_id(url)
+        except Exception:
+            video_id = None
+        return (ie.ie_key(), video_id) if video_id else None
+    return None
+
+
+def _archive_match_filter(archive, file_format, resolution):
+    """Build a yt-dlp match_filter that skips videos already in the archive."""
+    def match_filter(info, *, incomplete=False):
+        extractor = info.get('extractor_key') or info.get('ie_key')
+        video_id = info.get('id')
+        if extractor and video_id and archive.contains(
+            archive_key(extractor, video_id, file_format, resolution)
+        ):
+            return f"{info.get('title') or video_id} is already in the download archive"
+        return None
+    return match_filter
+
+
+def _record_downloads(archive, info, file_format, resolution):
+    """Add every video of a processed result whose file exists to the archive."""
+    if not info:
+        return
+    entries = info.get('entries') if info.get('_type') == 'playlist' else [info]
+    records = []
+    for entry in entries or []:
+        if not entry or not entry.get('id') or not entry.get('extractor_key'):
+            continue
+        paths = [entry.get('filepath')] + [
+            download.get('filepath') for download in entry.get('requested_downloads') or []
+        ]
+        path = next((p for p in paths if p and os.path.exists(p)), None)
+        if path is None:
+            continue
+        key = archive_key(entry['extractor_key'], entry['id'], file_format, resolution)
+        records.append((key, entry.get('title'), path))
+    try:
+        archive.add_many(records)
+    except Exception as e:
+        logger.warning(f"Could not record downloads in the archive: {e}")
+
+
+def _record_post_processed(archive, file_format, resolution, infos):
+    """Record the videos of a finished PostProcessJob in the archive."""
+    _record_downloads(archive, {'_type': 'playlist', 'entries': infos}, file_format, resolution)
+
+
+def _downloaded_infos(info):
+    """
+    The per-file info dicts of a processed result whose file was written.
+    
+    Rebuilds what yt-dlp would have passed to its postprocessors: the video's
+    info with the fields of each of its ``requested_downloads`` (one per video
+    after merging) on top.
+    """
+    if not info:
+        return []
+    entries = info.get('entries') if info.get('_type') == 'playlist' else [info]
+    infos = []
+    for entry in entries or []:
+        if not entry:
+            continue
+        for download in entry.get('requested_downloads') or []:
+            if download.get('filepath') and os.path.exists(download['filepath']):
+                merged = {key: value for key, value in entry.items() if key != 'requested_downloads'}
+                merged.update(download)
+                infos.append(merged)
+    return infos
+
+
+def download_with_single_extraction(ydl, url, cache_kind="video", announce=True, phases=None):
+    """
+    Extract a URL once and feed the info dict straight into processing.
+    
+    ``YoutubeDL.download`` would extract the URL again after any info lookup, so
+    this extracts without processing and hands the result to ``process_ie_result``.
+    A cached extraction of a single video is reused when available. The
+    extraction is cached before processing, so a download that fails (and is
+    retried) does not have to extract the URL again.
+    
+    :param ydl: The configured YoutubeDL instance that performs the download
+    :param url: The video or playlist URL
+    :param cache_kind: Metadata cache namespace for the processed info
+    :param announce: Whether to print the title banner
+    :param phases: Optional tracing.DownloadPhases told when processing starts
+    :return: The processed info dictionary
+    """
+    from yt_dlp.utils import DownloadError
+    
+    cache = get_metadata_cache()
+    cached = cache.get(url, cache_kind) if cache is not None else None
+    if cached is not None and cached.get('_type', 'video') == 'video':
+        if announce:
+            _announce_info(cached)
+        try:
+            with span("process", cached=True):
+                if phases is not None:
+                    phases.processing()
+                return ydl.process_ie_result(
+                    ydl.sanitize_info(cached, remove_private_keys=True), download=True
+                )
+        except DownloadError as e:
+            if classify_error(e) != ErrorKind.PERMANENT:
+                # The site is failing or throttling, not the cached info: the
+                # caller's retry reuses it instead of extracting again now
+                raise
+            # Stream URLs in the cached info may have expired; extract fresh
+            logger.info(f"Cached info for {url} could not be downloaded, re-extracting: {e}")
+            cache.invalidate(url)
+    
+    with span("extract", url=url):
+        ie_result = ydl.extract_info(url, download=False, process=False)
+    if ie_result is None:
+        raise DownloadError(f"Could not extract information for {url}")
+    if announce:
+        _announce_info(ie_result)
+    if cache is not None and ie_result.get('_type', 'video') == 'video':
+        # Cached before processing so a failed download's retry skips the
+        # extraction; expired stream URLs are handled by the fallback above
+        try:
+            cache.put(url, ydl.sanitize_info(ie_result, remove_private_keys=True), cache_kind)
+        except Exception as e:
+            logger.warning(f"Could not cache info for {url}: {e}")
+    
+    with span("process"):
+        if phases is not None:
+            phases.processing()
+        return ydl.process_ie_result(ie_result, download=True)
+
+
 def download_video(
     url,
     output_path="%(title)s.%(ext)s",
@@ -139,6 +383,11 @@ def download_video(
     progress_hooks=None,
     skip_errors=True,
     organize_folders=True,
+    session=None,
+    use_archive=True,
+    cancel_event=None,
+    defer_postprocessing=False,
+    fragment_concurrency="auto",
 ):
     """
     Downloads a video or playlist from a given URL with specified options.
@@ -151,37 +400,51 @@ def download_video(
     :param progress_hooks: A list of functions to be called on download progress.
     :param skip_errors: If True, skip individual videos that fail instead of aborting.
     :param organize_folders: Whether to organize downloads into folders.
+    :param session: Optional YoutubeDLSession whose long-lived YoutubeDL instances
+                    are reused instead of building a new one for this call.
+    :param use_archive: Skip videos already recorded in the download archive in
+                        this format and resolution, and record new downloads.
+    :param cancel_event: Optional threading.Event; once set, the download stops at
+                         the next chunk and raises yt_dlp's DownloadCancelled.
+    :param defer_postprocessing: Only fetch (and merge) the files, and return the
+                                 ffmpeg steps as a PostProcessJob to run later,
+                                 e.g. on a separate pool.
+    :param fragment_concurrency: Fragments of an HLS/DASH stream fetched at once:
+                                 a number, or 'auto' to tune it per site from the
+                                 measured throughput (see fragments.py).
+    :return: The PostProcessJob with the steps planned for each file (already run
+             unless defer_postprocessing is set), or None if nothing was fetched.
     """
+    import yt_dlp
+    from yt_dlp.utils import DownloadCancelled, DownloadError
+    
+    if cancel_event is not None and cancel_event.is_set():
+        raise DownloadCancelled("Download cancelled")
+    
+    # Skip videos that were already fetched before any network access when the
+    # URL identifies the video by itself
+    archive = get_download_archive() if use_archive else None
+    if archive is not None and not is_playlist:
+        video = url_archive_id(url)
+        if video is not None and archive.contains(archive_key(*video, file_format, resolution)):
+            print(f"Already downloaded, skipping: {url}")
+            return
     
     # Handle folder organization
     final_output_path = output_path
-    playlist_info = None
-    video_info = None
     
     if organize_folders:
         # Extract base directory from output path
         base_dir = os.path.dirname(output_path) if "/" in output_path or "\\" in output_path else "."
         filename_template = os.path.basename(output_path)
         
-        # Get playlist info if it's a playlist
-        if is_playlist:
-            print("Retrieving playlist information...")
-            playlist_info = get_playlist_info(url)
-            if playlist_info:
-                print(f"Found playlist: '{playlist_info['title']}' by {playlist_info['uploader']} ({playlist_info['entry_count']} videos)")
-        else:
-            # Get video info for single video
-            print("Retrieving video information...")
-            video_info = get_video_info(url)
-            if video_info:
-                print(f"Found video: '{video_info['title']}' by {video_info['uploader']}")
-        
-        # Create organized folder structure
+        # The folder layout only depends on the format, so no extraction is needed
+        # here; the info banner is printed from the single extraction below
         download_folder = create_organized_folders(
             base_dir, 
             is_playlist, 
-            playlist_info, 
-            video_info, 
+            None, 
+            None, 
             file_format
         )
         final_output_path = str(download_folder / filename_template)
@@ -193,19 +456,27 @@ def download_video(
         "noplaylist": not is_playlist,
         "postprocessors": [],
         "progress_hooks": progress_hooks or [],
-        "ignoreerrors": skip_errors,  # Skip videos that can't be downloaded
+        # Skip playlist entries that can't be downloaded. A single video fails
+        # outright instead: yt-dlp would otherwise only log the error and return
+        # nothing, losing the cause (e.g. HTTP 429) the caller needs to decide
+        # whether to retry
+        "ignoreerrors": skip_errors and is_playlist,
         "extract_flat": False,  # Extract complete video info
+        "continuedl": True,  # Resume interrupted downloads from their .part files
+        # yt-dlp's API default is 0, which silently drops a fragment on any error
+        # (including HTTP 429) instead of retrying it
+        "fragment_retries": 10,
     }
+    if archive is not None:
+        # Playlist entries (and URLs that need extraction to be identified) are
+        # checked against the archive before their download starts
+        ydl_opts["match_filter"] = _archive_match_filter(archive, file_format, resolution)
 
+    # The ffmpeg steps (audio extraction, remuxing) are not registered with
+    # yt-dlp: they are planned per file from what was actually fetched and run
+    # by a PostProcessJob, so files already in the target format are left alone
     if file_format == "mp3":
         ydl_opts["format"] = "bestaudio/best"
-        ydl_opts["postprocessors"].append(
-            {
-                "key": "FFmpegExtractAudio",
-                "preferredcodec": "mp3",
-                "preferredquality": "192",
-            }
-        )
     else:  # For video formats like mp4, webm, etc.
         # Prefer MP4-compatible streams and merge to a single MP4
         if resolution:
@@ -216,14 +487,8 @@ def download_video(
             format_string = "bv*[ext=mp4]+ba[ext=m4a]/b[ext=mp4]/b"
         ydl_opts["format"] = format_string
 
-        # Ensure final output is a single MP4 (merge/remux instead of re-encode)
+        # Separate video and audio streams are merged straight into an MP4
         ydl_opts["merge_output_format"] = "mp4"
-        ydl_opts["postprocessors"].append(
-            {
-                "key": "FFmpegVideoRemuxer",
-                "preferedformat": "mp4",
-            }
-        )
 
     # Add error hook to track failed downloads
     failed_downloads = []
@@ -244,11 +509,57 @@ def download_video(
     if progress_hooks is None:
         progress_hooks = []
     progress_hooks.append(error_hook)
+    tuner = None
+    if fragment_concurrency == "auto":
+        concurrency = get_fragment_concurrency()
+        if concurrency is not None:
+            tuner = FragmentTuner(concurrency, host_of(url))
+            progress_hooks.append(tuner.progress_hook)
+            ydl_opts["retry_sleep_functions"] = {"http": tuner.http_retry_sleep, "fragment": tuner.retry_sleep}
+        ydl_opts["concurrent_fragment_downloads"] = tuner.level if tuner is not None else 1
+    else:
+        ydl_opts["concurrent_fragment_downloads"] = max(1, int(fragment_concurrency))
+    if cancel_event is not None:
+        def cancel_hook(d):
+            # DownloadCancelled also stops the remaining entries of a playlist,
+            # which ignoreerrors would otherwise carry on with
+            if cancel_event.is_set():
+                raise DownloadCancelled("Download cancelled")
+        
+        progress_hooks.insert(0, cancel_hook)
+    # Format selection, each file's transfer and the ffmpeg merge all happen
+    # inside one yt-dlp call; the hooks mark where each starts and ends
+    tracer = get_tracer()
+    phases = None
+    if tracer is not None:
+        phases = DownloadPhases(tracer)
+        progress_hooks.append(phases.progress_hook)
+        ydl_opts["postprocessor_hooks"] = [phases.postprocessor_hook]
     ydl_opts["progress_hooks"] = progress_hooks
 
+    job = None
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+        cache_kind = "full" if is_playlist else "video"
+        if session is not None:
+            ydl = session.acquire(ydl_opts)
+            if tuner is not None:
+                tuner.params = ydl.params
+            try:
+                info = download_with_single_extraction(ydl, url, cache_kind, announce=organize_folders,
+                                                       phases=phases)
+            finally:
+                session.release()
+        else:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                if tuner is not None:
+                    tuner.params = ydl.params
+                info = download_with_single_extraction(ydl, url, cache_kind, announce=organize_folders,
+                                                       phases=phases)
+        # Archive entries point at the final files, so they are recorded after the job
+        on_finished = None
+        if archive is not None:
+            on_finished = functools.partial(_record_post_processed, archive, file_format, resolution)
+        job = PostProcessJob(_downloaded_infos(info), file_format, on_finished)
             
         # Report summary if there were any failures
         if failed_downloads:
@@ -270,12 +581,18 @@ def download_video(
             if failed_count > 0 and success_count == 0 and is_playlist:
                 raise DownloadError(f"All videos in playlist failed to download. {summary_msg}")
                 
+    except DownloadCancelled:
+        raise
     except DownloadError as e:
         # Extract a cleaner error message from yt-dlp's exception
         if not skip_errors or not is_playlist:
-            raise DownloadError(f"Failed to download: {e.args[0]}")
+            raise DownloadError(f"Failed to download: {e.args[0]}", e.exc_info) from e
         else:
             logger.error(f"Download error (continuing due to skip_errors=True): {e}")
     except Exception as e:
         # Catch any other unexpected errors
-        raise Exception(f"An unexpected error occurred: {e}")
+        raise Exception(f"An unexpected error occurred: {e}") from e
+    
+    if job is not None and not defer_postprocessing:
+        job.run()
+    return job
@@ -0,0 +1,190 @@
+# src/video_downloader/fragments.py
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _HostLevel:
+    level: int
+    best_level: int = 0
+    best_rate: float = 0.0  # bytes/sec measured at best_level
+    additive: bool = False  # after a back-off, ramp up one fragment at a time
+    steady: int = 0  # downloads measured at best_level since the last probe
+
+
+class FragmentConcurrency:
+    """
+    How many fragments of an HLS/DASH download are fetched at once, per host.
+
+    yt-dlp sizes its fragment thread pool when a download starts, so the level
+    is tuned between downloads (the video and audio streams of one task, the
+    entries of a playlist, later tasks on the same site) from the throughput
+    each finished fragmented download reports. While a higher level keeps
+    improving throughput by at least ``improvement``, the level doubles (or
+    grows by one after a back-off); a level that does not pay off is
+    abandoned for the best one seen. Errors and HTTP 429 retries halve it.
+    After ``probe_interval`` downloads at the best level the next one up is
+    tried again, so the level follows changing conditions.
+    """
+
+    def __init__(self, initial: int = 2, minimum: int = 1, maximum: int = 16,
+                 improvement: float = 0.1, probe_interval: int = 8):
+        """
+        :param initial: Level for the first download from a host
+        :param minimum: Lowest level backing off goes to
+        :param maximum: Highest level ramping up goes to
+        :param improvement: Relative throughput gain a higher level must bring
+        :param probe_interval: Downloads at a steady level before probing upwards
+        """
+        self.initial = max(minimum, min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.improvement = improvement
+        self.probe_interval = probe_interval
+        self.lock = threading.Lock()
+        self.backoffs = 0  # downloads that had to retry (errors, HTTP 429)
+        self._hosts: Dict[str, _HostLevel] = {}
+
+    def _state(self, host: str) -> _HostLevel:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostLevel(self.initial)
+        return state
+
+    def level(self, host: str) -> int:
+        """The level the next download from this host should use."""
+        with self.lock:
+            return self._state(host).level
+
+    def record(self, host: str, level: int, num_bytes: int, seconds: float) -> int:
+        """
+        Report the throughput of a finished download.
+
+        :param level: The level it ran with
+        :return: The level for the next download from this host
+        """
+        with self.lock:
+            state = self._state(host)
+            if level != state.level or num_bytes <= 0 or seconds <= 0:
+                # Started before the last change (e.g. by another worker)
+                return state.level
+            rate = num_bytes / seconds
+            previous = state.level
+            if rate > state.best_rate * (1 + self.improvement):
+                state.best_level, state.best_rate = level, rate
+                state.level = min(self.maximum, level + 1 if state.additive else level * 2)
+                state.steady = 0
+            elif level > state.best_level:
+                # The probe did not pay off
+                state.level = state.best_level
+                state.additive = True
+                state.steady = 0
+            else:
+                state.best_rate = rate
+                state.steady += 1
+                if state.steady >= self.probe_interval and level < self.maximum:
+                    state.level = level + 1
+                    state.steady = 0
+            if state.level != previous:
+                logger.debug(f"Fragment concurrency for {host}: {previous} -> {state.level} "
+                             f"({rate / 1024:.0f} KiB/s at {level})")
+            return state.level
+
+    def record_error(self, host: str) -> int:
+        """Back off after a failed or throttled request; returns the new level."""
+        with self.lock:
+            state = self._state(host)
+            self.backoffs += 1
+            previous = state.level
+            state.level = max(self.minimum, state.level // 2)
+            # Measure the new level afresh and climb back carefully
+            state.best_level, state.best_rate = state.level, 0.0
+            state.additive = True
+            state.steady = 0
+            if state.level != previous:
+                logger.debug(f"Fragment concurrency for {host}: {previous} -> {state.level} (backing off)")
+            return state.level
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Current level and best measured throughput per host."""
+        with self.lock:
+            return {
+                host: {"level": state.level, "best_level": state.best_level,
+                       "best_rate": round(state.best_rate)}
+                for host, state in self._hosts.items()
+            }
+
+
+class FragmentTuner:
+    """
+    Feeds the fragmented downloads of one task to a FragmentConcurrency.
+
+    ``progress_hook`` goes into the task's progress hooks, ``retry_sleep`` into
+    yt-dlp's ``retry_sleep_functions`` for fragments and ``http_retry_sleep``
+    for whole-file HTTP downloads, whose retries say nothing about fragment
+    concurrency. Once the task's YoutubeDL exists,
+    ``params`` must be set to its ``ydl.params``: the next download of the task
+    then starts with the updated level.
+    """
+
+    def __init__(self, concurrency: FragmentConcurrency, host: str, max_retry_sleep: float = 4.0):
+        self.concurrency = concurrency
+        self.host = host
+        self.level = concurrency.level(host)
+        self.max_retry_sleep = max_retry_sleep
+        self.params: Optional[Dict[str, Any]] = None
+        self._levels: Dict[str, int] = {}  # file name -> level it started with
+        self._backed_off = False
+
+    def _apply(self, level: int):
+        self.level = level
+        if self.params is not None:
+            self.params["concurrent_fragment_downloads"] = level
+
+    def progress_hook(self, d: Dict[str, Any]):
+        filename = d.get("filename")
+        if d["status"] == "downloading":
+            if d.get("fragment_index") is not None and filename not in self._levels:
+                self._levels[filename] = self.level
+        elif d["status"] == "finished":
+            level = self._levels.pop(filename, None)
+            if level is None:
+                return  # not a fragmented download
+            if self._backed_off:
+                # Throughput with retries in it says little about the level
+                self._backed_off = False
+                return
+            num_bytes = d.get("total_bytes") or d.get("downloaded_bytes") or 0
+            self._apply(self.concurrency.record(self.host, level, num_bytes, d.get("elapsed") or 0))
+
+    def retry_sleep(self, n: int) -> float:
+        """yt-dlp retry sleep function (n: retries so far): back off the level once per download, then wait."""
+        if not self._backed_off:
+            self._backed_off = True
+            self._apply(self.concurrency.record_error(self.host))
+        return self.http_retry_sleep(n)
+
+    def http_retry_sleep(self, n: int) -> float:
+        """yt-dlp retry sleep function (n: retries so far): exponential back-off, level untouched."""
+        return min(self.max_retry_sleep, 0.25 * 2 ** n)
+
+
+_default_concurrency = FragmentConcurrency()
+_default_concurrency_lock = threading.Lock()
+
+
+def get_fragment_concurrency() -> Optional[FragmentConcurrency]:
+    """Get the process-wide tuner used by ``fragment_concurrency="auto"`` downloads."""
+    with _default_concurrency_lock:
+        return _default_concurrency
+
+
+def set_fragment_concurrency(concurrency: Optional[FragmentConcurrency]):
+    """Replace the process-wide tuner. Pass None to fetch one fragment at a time."""
+    global _default_concurrency
+    with _default_concurrency_lock:
+        _default_concurrency = concurrency
@@ -0,0 +1,93 @@
+# src/video_downloader/history.py
+import json
+import threading
+import time
+from collections import deque
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+
+def task_summary(task) -> Dict[str, Any]:
+    """The fields of a finished task worth keeping once it has left memory."""
+    return {
+        "id": task.id,
+        "url": task.url,
+        "status": task.status.value,
+        "error_message": task.error_message,
+        "error_kind": task.error_kind,
+        "retries": task.retries,
+        "title": task.current_title,
+        "parent_id": task.parent_id,
+        "result_path": task.result_path,
+        "bytes": task.downloaded_bytes,
+        "stage_times": task.stage_times,
+        "postprocess_steps": task.postprocess_steps,
+        "archived_at": round(time.time(), 3),
+    }
+
+
+class TaskHistory:
+    """
+    Bounded history of finished tasks.
+
+    Keeps the most recent ``max_entries`` tasks in memory. Older tasks are
+    dropped, or appended as JSON lines to ``spill_path`` when one is given, so a
+    long-running queue never accumulates tasks without bound.
+    """
+
+    def __init__(self, max_entries: int = 1000, spill_path: Optional[str] = None):
+        """
+        :param max_entries: Tasks kept in memory
+        :param spill_path: Optional JSON-lines file that receives evicted tasks
+        """
+        self.max_entries = max_entries
+        self.spill_path = spill_path
+        self.lock = threading.Lock()
+        self._entries = deque(maxlen=max_entries)
+        self.spilled = 0
+        if spill_path:
+            Path(spill_path).parent.mkdir(parents=True, exist_ok=True)
+
+    def append(self, task):
+        self.extend([task])
+
+    def extend(self, tasks: Iterable):
+        """Add finished tasks, evicting (and spilling) the oldest beyond ``max_entries``."""
+        tasks = list(tasks)
+        if not tasks:
+            return
+        with self.lock:
+            overflow = len(self._entries) + len(tasks) - self.max_entries
+            evicted = []
+            if overflow > 0 and self.spill_path:
+                from_entries = min(overflow, len(self._entries))
+                evicted = list(islice(self._entries, from_entries)) + tasks[:overflow - from_entries]
+            self._entries.extend(tasks)
+            if evicted:
+                # Written under the lock so spilled lines stay in eviction order
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(task_summary(task)) + "\n" for task in evicted)
+                self.spilled += len(evicted)
+
+    def recent(self, count: Optional[int] = None) -> list:
+        """The most recent tasks, oldest first."""
+        with self.lock:
+            entries = list(self._entries)
+        return entries if count is None else entries[-count:]
+
+    def iter_spilled(self) -> Iterator[Dict[str, Any]]:
+        """Read back the summaries of tasks spilled to disk, oldest first."""
+        if not self.spill_path or not Path(self.spill_path).exists():
+            return
+        with open(self.spill_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self._entries)
+
+    def __iter__(self):
+        return iter(self.recent())
@@ -0,0 +1,158 @@
+# src/video_downloader/journal.py
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+DEFAULT_JOURNAL_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "video_downloader", "queue.sqlite3"
+)
+
+
+def _json_options(options: Dict[str, Any]) -> str:
+    """Serialize task options, dropping values that can't survive a restart (hooks, sessions)."""
+    serializable = {}
+    for key, value in options.items():
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        serializable[key] = value
+    return json.dumps(serializable, sort_keys=True)
+
+
+class TaskJournal:
+    """
+    Crash-safe record of queue task state, stored in SQLite in WAL mode.
+
+    Every state transition upserts the task's row in one small transaction, so
+    after a crash the journal holds the last known state of every task. Replay
+    is a single ordered scan of the table.
+
+    Rows carry a version taken when the task state is captured (``snapshot``);
+    a row never replaces one with a higher version, so when two threads journal
+    the same task at once the newer state wins whichever write lands last.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL survives process crashes; only an OS crash can lose the last commits
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " id TEXT NOT NULL UNIQUE,"
+            " parent_id TEXT,"
+            " url TEXT NOT NULL,"
+            " options TEXT NOT NULL,"
+            " priority INTEGER NOT NULL DEFAULT 0,"
+            " rate_limit INTEGER,"
+            " status TEXT NOT NULL,"
+            " error_message TEXT,"
+            " current_index INTEGER,"
+            " total_count INTEGER,"
+            " current_title TEXT,"
+            " version INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        if "version" not in columns:
+            # Journal written before rows were versioned
+            self._conn.execute("ALTER TABLE tasks ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._conn.commit()
+        last = self._conn.execute("SELECT MAX(version) FROM tasks").fetchone()[0]
+        self._versions = itertools.count((last or 0) + 1)
+
+    @staticmethod
+    def _row(task, version: int) -> tuple:
+        return (
+            task.id,
+            task.parent_id,
+            task.url,
+            _json_options(task.options),
+            task.priority,
+            task.rate_limit,
+            task.status.value,
+            task.error_message,
+            task.current_index,
+            task.total_count,
+            task.current_title,
+            version,
+        )
+
+    def snapshot(self, tasks: Iterable) -> List[tuple]:
+        """
+        Capture the current state of tasks as rows for ``write``.
+
+        Take the snapshot while holding the lock that guards the tasks' state
+        transitions, so snapshots are versioned in the order the states changed.
+        """
+        return [self._row(task, next(self._versions)) for task in tasks]
+
+    def write(self, rows: List[tuple]):
+        """Persist snapshotted rows in a single transaction, skipping any older than the stored row."""
+        if not rows:
+            return
+        with self.lock:
+            self._conn.executemany(
+                "INSERT INTO tasks (id, parent_id, url, options, priority, rate_limit,"
+                " status, error_message, current_index, total_count, current_title, version)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET"
+                " options = excluded.options, priority = excluded.priority,"
+                " rate_limit = excluded.rate_limit, status = excluded.status,"
+                " error_message = excluded.error_message,"
+                " current_index = excluded.current_index,"
+                " total_count = excluded.total_count,"
+                " current_title = excluded.current_title,"
+                " version = excluded.version"
+                " WHERE excluded.version > tasks.version",
+                rows,
+            )
+            self._conn.commit()
+
+    def record(self, *tasks):
+        """Persist the current state of one or more tasks in a single transaction."""
+        self.record_many(tasks)
+
+    def record_many(self, tasks: Iterable):
+        self.write(self.snapshot(tasks))
+
+    def remove(self, task_ids: Iterable[str]):
+        """Forget tasks, e.g. once they have been cleared from the queue."""
+        with self.lock:
+            self._conn.executemany(
+                "DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in task_ids]
+            )
+            self._conn.commit()
+
+    def load(self) -> List[tuple]:
+        """
+        Read every journaled task in the order it was first queued.
+
+        :return: Rows of (id, parent_id, url, options, priority, rate_limit, status,
+                 error_message, current_index, total_count, current_title)
+        """
+        with self.lock:
+            rows = self._conn.execute(
+                "SELECT id, parent_id, url, options, priority, rate_limit, status,"
+                " error_message, current_index, total_count, current_title"
+                " FROM tasks ORDER BY seq"
+            ).fetchall()
+
+        # Playlist entries share identical options; decode each distinct string once
+        decoded = {}
+        for options in {row[3] for row in rows}:
+            decoded[options] = json.loads(options)
+        return [row[:3] + (decoded[row[3]],) + row[4:] for row in rows]
+
+    def close(self):
+        with self.lock:
+            self._conn.close()
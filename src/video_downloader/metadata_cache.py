@@ -0,0 +1,207 @@
+# src/video_downloader/metadata_cache.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "video_downloader", "metadata.sqlite3"
+)
+DEFAULT_TTL = 3600  # seconds; stream URLs in info dicts expire after a few hours
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Query parameters that never change what a URL points to
+_TRACKING_PARAMS = {"si", "feature", "pp", "fbclid", "gclid", "igshid"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so equivalent links share one cache key.
+
+    :param url: The original URL
+    :return: URL with lowercase scheme/host, no fragment, no tracking
+             parameters and sorted query parameters
+    """
+    parts = urlsplit(url.strip())
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in _TRACKING_PARAMS and not key.startswith("utm_")
+    )
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return urlunsplit((parts.scheme.lower(), host, parts.path, urlencode(query), ""))
+
+
+class MetadataCache:
+    """On-disk LRU cache of yt-dlp extraction results with a TTL."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Open (or create) the cache database.
+
+        :param path: SQLite database file, or ':memory:' for a process-local cache
+        :param ttl: Seconds an entry stays valid after it was stored
+        :param max_bytes: Total size of stored entries before LRU eviction kicks in
+        """
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " info TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+        )
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+
+    @staticmethod
+    def _key(url: str, kind: str) -> str:
+        return f"{kind}:{normalize_url(url)}"
+
+    def get(self, url: str, kind: str = "full") -> Optional[Dict[str, Any]]:
+        """Return a cached info dict, or None on a miss or an expired entry."""
+        key = self._key(url, kind)
+        now = time.time()
+        with self.lock:
+            row = self._conn.execute(
+                "SELECT info, size, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            info, size, created = row
+            if now - created > self.ttl:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self._total_bytes -= size
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(info)
+
+    def put(self, url: str, info: Dict[str, Any], kind: str = "full"):
+        """Store a (JSON-serializable) info dict and evict least recently used entries."""
+        key = self._key(url, kind)
+        data = json.dumps(info)
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self.lock:
+            row = self._conn.execute(
+                "SELECT size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._total_bytes -= row[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, info, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, data, size, now, now),
+            )
+            self._total_bytes += size
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        while self._total_bytes > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed LIMIT 1"
+            ).fetchone()
+            if row is None:
+                self._total_bytes = 0
+                return
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+            self._total_bytes -= row[1]
+            self.evictions += 1
+
+    def invalidate(self, url: Optional[str] = None):
+        """Remove the entries for one URL, or everything when url is None."""
+        with self.lock:
+            if url is None:
+                self._conn.execute("DELETE FROM entries")
+                self._total_bytes = 0
+            else:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE substr(key, instr(key, ':') + 1) = ?",
+                    (normalize_url(url),),
+                )
+                self._total_bytes = self._conn.execute(
+                    "SELECT COALESCE(SUM(size), 0) FROM entries"
+                ).fetchone()[0]
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current cache size."""
+        with self.lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": self._total_bytes,
+            }
+
+    def close(self):
+        with self.lock:
+            self._conn.close()
+
+
+_default_cache = None
+_default_cache_set = False
+_default_cache_lock = threading.Lock()
+
+
+def get_metadata_cache() -> Optional[MetadataCache]:
+    """Get the process-wide cache, opening the default database on first use."""
+    global _default_cache, _default_cache_set
+    with _default_cache_lock:
+        if not _default_cache_set:
+            try:
+                _default_cache = MetadataCache()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Metadata cache disabled: {e}")
+                _default_cache = None
+            _default_cache_set = True
+        return _default_cache
+
+
+def set_metadata_cache(cache: Optional[MetadataCache]):
+    """Replace the process-wide cache. Pass None to disable caching."""
+    global _default_cache, _default_cache_set
+    with _default_cache_lock:
+        _default_cache = cache
+        _default_cache_set = True
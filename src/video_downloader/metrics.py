@@ -0,0 +1,258 @@
+# src/video_downloader/metrics.py
+import bisect
+import http.server
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds (the last bucket, +Inf, is implicit)
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+RATE_BUCKETS = (16e3, 64e3, 256e3, 1e6, 4e6, 16e6, 64e6, 256e6)
+
+_PREFIX = "video_downloader_"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense (not thread-safe on its own)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Count, sum and cumulative (upper bound, count) pairs; the last bound is inf."""
+        cumulative, running = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            running += count
+            cumulative.append((bound, running))
+        return {"count": self.count, "sum": round(self.sum, 3), "buckets": cumulative}
+
+
+class QueueMetrics:
+    """
+    Counters and histograms a DownloadQueueManager feeds as tasks run.
+
+    Queue depth and byte totals are not kept here: the manager already
+    maintains them and merges them in ``DownloadQueueManager.get_metrics()``.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Per attempt: extract (until the first byte), download, handoff, postprocess
+        self.stage_durations: Dict[str, Histogram] = {}
+        # Average bytes/sec of each completed download
+        self.task_rates = Histogram(RATE_BUCKETS)
+        self.retries: Dict[str, int] = {}  # error kind -> retries
+        self.failures: Dict[str, int] = {}  # error kind -> tasks failed
+        self.busy_seconds: Dict[str, float] = {}  # pool -> seconds workers spent on tasks
+
+    def observe_stage(self, stage: str, seconds: float):
+        with self.lock:
+            histogram = self.stage_durations.get(stage)
+            if histogram is None:
+                histogram = self.stage_durations[stage] = Histogram(DURATION_BUCKETS)
+            histogram.observe(seconds)
+
+    def observe_rate(self, bytes_per_second: float):
+        with self.lock:
+            self.task_rates.observe(bytes_per_second)
+
+    def count_retry(self, kind: str):
+        with self.lock:
+            self.retries[kind] = self.retries.get(kind, 0) + 1
+
+    def count_failure(self, kind: str):
+        with self.lock:
+            self.failures[kind] = self.failures.get(kind, 0) + 1
+
+    def add_busy(self, pool: str, seconds: float):
+        with self.lock:
+            self.busy_seconds[pool] = self.busy_seconds.get(pool, 0.0) + seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "stage_durations": {stage: h.snapshot() for stage, h in self.stage_durations.items()},
+                "task_rates": self.task_rates.snapshot(),
+                "retries": dict(self.retries),
+                "failures": dict(self.failures),
+                "busy_seconds": {pool: round(s, 3) for pool, s in self.busy_seconds.items()},
+            }
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Exposition:
+    """Collects metric families and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str, samples: Iterable):
+        """samples: (labels dict, value) pairs."""
+        name = _PREFIX + name
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_labels(labels)} {_value(value)}")
+
+    def histogram(self, name: str, help_text: str, histograms: Dict[str, Dict[str, Any]], label: Optional[str]):
+        """histograms: label value -> Histogram.snapshot() (label None: a single unlabelled histogram)."""
+        name = _PREFIX + name
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for label_value, histogram in histograms.items():
+            base = {label: label_value} if label else {}
+            for bound, count in histogram["buckets"]:
+                self.lines.append(f"{name}_bucket{_labels(dict(base, le=_value(bound)))} {count}")
+            self.lines.append(f"{name}_sum{_labels(base)} {_value(float(histogram['sum']))}")
+            self.lines.append(f"{name}_count{_labels(base)} {histogram['count']}")
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def render_prometheus(snapshot: Dict[str, Any]) -> str:
+    """Render a ``DownloadQueueManager.get_metrics()`` snapshot in the Prometheus text format."""
+    out = _Exposition()
+    out.family("tasks", "gauge", "Tasks in the queue by status.",
+               (({"status": status}, count) for status, count in snapshot["queue"].items()))
+    out.family("tasks_completed_total", "counter", "Downloads completed.",
+               [({}, snapshot["completed_total"])])
+    out.family("tasks_failed_total", "counter", "Downloads failed, by error class.",
+               (({"kind": kind}, count) for kind, count in snapshot["failures"].items()))
+    out.family("retries_total", "counter", "Failed attempts queued for a retry, by error class.",
+               (({"kind": kind}, count) for kind, count in snapshot["retries"].items()))
+    out.family("bytes_transferred_total", "counter", "Bytes received by all downloads.",
+               [({}, snapshot["bytes_transferred"])])
+    out.family("bytes_per_second", "gauge", "Current aggregate download rate.",
+               [({}, snapshot["bytes_per_second"])])
+    # Per host rather than per task: a task label would add a series for every
+    # download ever made (the per-task rates stay in /metrics.json)
+    hosts: Dict[str, List[float]] = {}
+    for task in snapshot["tasks"]:
+        hosts.setdefault(task["host"], []).append(task["bytes_per_second"])
+    out.family("host_bytes_per_second", "gauge", "Current download rate per host.",
+               (({"host": host}, sum(rates)) for host, rates in hosts.items()))
+    out.family("host_downloads", "gauge", "Running downloads per host.",
+               (({"host": host}, len(rates)) for host, rates in hosts.items()))
+    out.histogram("stage_duration_seconds", "Seconds per attempt spent in each stage.",
+                  snapshot["stage_durations"], "stage")
+    out.histogram("task_throughput_bytes_per_second", "Average rate of each completed download.",
+                  {"": snapshot["task_rates"]}, None)
+    pools = snapshot["workers"]
+    out.family("workers", "gauge", "Worker threads per pool.",
+               (({"pool": pool}, stats["size"]) for pool, stats in pools.items()))
+    out.family("workers_busy", "gauge", "Workers currently running a task, per pool.",
+               (({"pool": pool}, stats["busy"]) for pool, stats in pools.items()))
+    out.family("worker_utilisation", "gauge", "Busy workers / workers, per pool.",
+               (({"pool": pool}, stats["utilisation"]) for pool, stats in pools.items()))
+    out.family("worker_busy_seconds_total", "counter", "Seconds workers spent on tasks, per pool.",
+               (({"pool": pool}, stats["busy_seconds"]) for pool, stats in pools.items()))
+    out.family("paused_hosts", "gauge", "Hosts paused by the circuit breaker.",
+               [({}, len(snapshot["paused_hosts"]))])
+    return out.render()
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        try:
+            snapshot = self.server.manager.get_metrics()
+        except Exception as e:
+            logger.warning(f"Could not collect metrics: {e}")
+            self.send_error(500)
+            return
+        if path == "/metrics":
+            body = render_prometheus(snapshot).encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            body = json.dumps(snapshot, default=str).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MetricsServer:
+    """
+    Serves a DownloadQueueManager's metrics over HTTP on a daemon thread.
+
+    ``/metrics`` is the Prometheus text format, ``/metrics.json`` the
+    ``get_metrics()`` snapshot. Binds to localhost by default; port 0 picks a
+    free port (see ``url``).
+    """
+
+    def __init__(self, manager, port: int = 9464, host: str = "127.0.0.1"):
+        """
+        :param manager: The DownloadQueueManager to report on
+        :param port: TCP port to listen on
+        :param host: Interface to bind
+        """
+        self.manager = manager
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2] if self._server else (self.host, self.port)
+        return f"http://{host}:{port}/metrics"
+
+    def start(self):
+        if self._server is not None:
+            return self
+        self._server = http.server.ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.manager = self.manager
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+        logger.info(f"Serving metrics at {self.url}")
+        return self
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
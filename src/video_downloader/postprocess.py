@@ -0,0 +1,133 @@
+# src/video_downloader/postprocess.py
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .tracing import span
+
+# Post-processing YoutubeDL instances, one per thread and postprocessor chain;
+# building one costs far more than skipping a step that has nothing to do
+_local = threading.local()
+
+EXTRACT_MP3 = {"key": "FFmpegExtractAudio", "preferredcodec": "mp3", "preferredquality": "192"}
+REMUX_MP4 = {"key": "FFmpegVideoRemuxer", "preferedformat": "mp4"}
+CONVERT_MP4 = {"key": "FFmpegVideoConvertor", "preferedformat": "mp4"}
+# Not an ffmpeg step: the file already is an MP4 under another extension
+RENAME_MP4 = {"key": "Rename", "ext": "mp4"}
+# Span names of the steps in a trace (see tracing.py)
+_SPAN_NAMES = {"FFmpegExtractAudio": "extract_audio", "FFmpegVideoRemuxer": "remux",
+               "FFmpegVideoConvertor": "convert", "Rename": "rename"}
+
+# Codecs (yt-dlp codec strings, up to the first dot) an MP4 container can hold;
+# anything else has to be re-encoded rather than remuxed
+MP4_VIDEO_CODECS = frozenset(["avc1", "avc3", "h264", "hev1", "hvc1", "h265", "av01", "vp09", "vp9", "mp4v"])
+MP4_AUDIO_CODECS = frozenset(["mp4a", "aac", "mp3", "opus", "ac-3", "ec-3", "flac", "alac"])
+# ISO base media files that only differ from .mp4 by their extension
+MP4_ALIASES = frozenset(["m4v"])
+
+
+def _codec(value: Optional[str]) -> Optional[str]:
+    """Normalise a codec string ('avc1.64001F' -> 'avc1'); None if absent or unknown."""
+    if not value or value == "none":
+        return None
+    return value.split(".")[0].lower()
+
+
+def plan_postprocessing(info: Dict[str, Any], file_format: str) -> List[Dict[str, Any]]:
+    """
+    The postprocessor steps one downloaded file needs to end up as ``file_format``.
+
+    Looks at the container (``ext``) and codecs of the file that was actually
+    fetched: a file that already is an MP4 (or MP3) gets no step at all, an
+    MP4 under another name is renamed, other containers are remuxed when
+    their codecs fit in MP4 and converted otherwise. Unknown codecs are
+    assumed to fit.
+
+    :param info: Info dict of the downloaded file
+    :param file_format: Target format ('mp4' or 'mp3')
+    :return: yt-dlp ``postprocessors`` entries, in order
+    """
+    ext = (info.get("ext") or "").lower()
+    if file_format == "mp3":
+        return [] if ext == "mp3" else [EXTRACT_MP3]
+    if ext == "mp4":
+        return []
+    if ext in MP4_ALIASES:
+        return [RENAME_MP4]
+    vcodec, acodec = _codec(info.get("vcodec")), _codec(info.get("acodec"))
+    if (vcodec is None or vcodec in MP4_VIDEO_CODECS) and (acodec is None or acodec in MP4_AUDIO_CODECS):
+        return [REMUX_MP4]
+    return [CONVERT_MP4]
+
+
+def _post_processor(postprocessors: List[Dict[str, Any]]):
+    import yt_dlp
+
+    instances = getattr(_local, "instances", None)
+    if instances is None:
+        instances = _local.instances = {}
+    key = json.dumps(postprocessors, sort_keys=True)
+    ydl = instances.get(key)
+    if ydl is None:
+        ydl = instances[key] = yt_dlp.YoutubeDL({"postprocessors": postprocessors})
+    return ydl
+
+
+def _rename(info: Dict[str, Any], ext: str) -> Dict[str, Any]:
+    path = info["filepath"]
+    new_path = os.path.splitext(path)[0] + "." + ext
+    os.replace(path, new_path)
+    return dict(info, filepath=new_path, ext=ext)
+
+
+class PostProcessJob:
+    """
+    Post-processing split off from a download so it can run on another pool.
+
+    Holds the processed info dicts of the files that were fetched, each with
+    the steps ``plan_postprocessing`` chose for it. ``run()`` applies them,
+    then calls ``on_finished`` with the final info dicts.
+    """
+
+    def __init__(self, infos: List[Dict[str, Any]], file_format: str,
+                 on_finished: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        """
+        :param infos: Info dicts of the downloaded videos (with ``filepath`` set)
+        :param file_format: Target format ('mp4' or 'mp3')
+        :param on_finished: Called with the post-processed info dicts
+        """
+        self.plans: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]] = [
+            (info, plan_postprocessing(info, file_format)) for info in infos
+        ]
+        self.on_finished = on_finished
+
+    @property
+    def steps(self) -> Dict[str, List[str]]:
+        """Planned step names per file name (an empty list: nothing to do)."""
+        return {
+            os.path.basename(info["filepath"]): [pp["key"] for pp in postprocessors]
+            for info, postprocessors in self.plans
+        }
+
+    def run(self) -> List[Dict[str, Any]]:
+        """
+        Run the planned steps on every file.
+
+        :raises yt_dlp.utils.PostProcessingError: If an ffmpeg step fails
+        """
+        infos = []
+        for info, postprocessors in self.plans:
+            name = os.path.basename(info["filepath"])
+            if postprocessors and postprocessors[0]["key"] == RENAME_MP4["key"]:
+                with span("rename", "postprocess", file=name):
+                    info = _rename(info, RENAME_MP4["ext"])
+                postprocessors = postprocessors[1:]
+            if postprocessors:
+                steps = "+".join(_SPAN_NAMES.get(pp["key"], pp["key"]) for pp in postprocessors)
+                with span(steps, "postprocess", file=name):
+                    info = _post_processor(postprocessors).post_process(info["filepath"], info)
+            infos.append(info)
+        if self.on_finished is not None:
+            self.on_finished(infos)
+        return infos
@@ -0,0 +1,37 @@
+# src/video_downloader/profiles.py
+import json
+import threading
+from typing import Any, Dict
+
+
+class OptionProfiles:
+    """
+    Interns task option dicts so tasks queued with the same settings share one dict.
+
+    A queue typically holds thousands of tasks but only a handful of distinct
+    option sets (output template, format, resolution). Interned dicts are shared
+    and must be treated as read-only; copy one before changing it. Only dicts
+    whose values are all JSON are interned: values such as hooks or sessions
+    are usually new objects per task, so those dicts get a private copy instead
+    of a table entry that would never be reused.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._profiles: Dict[str, Dict[str, Any]] = {}
+
+    def intern(self, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the shared dict equal to ``options``, registering a copy if it is new."""
+        try:
+            key = json.dumps(options, sort_keys=True)
+        except (TypeError, ValueError):
+            return dict(options)
+        with self.lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                profile = self._profiles[key] = dict(options)
+            return profile
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self._profiles)
@@ -0,0 +1,84 @@
+# src/video_downloader/progress.py
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class ProgressCoalescer:
+    """
+    Coalesces per-task progress updates and delivers them in batches.
+
+    Only the latest update of each task is kept. Changed tasks are handed to
+    ``deliver`` as one list at most ``max_rate`` times per second: the first
+    update after a quiet period goes out at once, later ones wait for the next
+    slot, so the last update of a burst is always delivered.
+    """
+
+    def __init__(self, deliver: Callable[[List], None], max_rate: float = 10.0):
+        """
+        :param deliver: Called with a list of changed tasks, from a background thread
+        :param max_rate: Maximum number of batches per second
+        """
+        self.deliver = deliver
+        self.interval = 1.0 / max_rate
+        self.cond = threading.Condition()
+        # Held while a batch is being delivered, so a flush never overtakes it
+        self._delivering = threading.Lock()
+        self._pending: Dict[str, object] = {}  # task id -> task, in first-changed order
+        self._next_batch = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    def update(self, task):
+        """Record that a task's progress changed."""
+        with self.cond:
+            was_idle = not self._pending
+            self._pending[task.id] = task
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, daemon=True, name="ProgressCoalescer"
+                )
+                self._thread.start()
+            if was_idle:
+                self.cond.notify()
+
+    def flush(self, task=None):
+        """
+        Deliver pending updates now, from the calling thread.
+
+        :param task: Only deliver this task's pending update (e.g. right before
+                     its completion is reported); None delivers everything
+        """
+        with self._delivering:
+            with self.cond:
+                if task is None:
+                    batch = list(self._pending.values())
+                    self._pending.clear()
+                else:
+                    pending = self._pending.pop(task.id, None)
+                    batch = [pending] if pending is not None else []
+            self._deliver(batch)
+
+    def _deliver(self, batch):
+        if not batch:
+            return
+        try:
+            self.deliver(batch)
+        except Exception as e:
+            print(f"DEBUG: Progress delivery failed: {e}")
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self._pending:
+                    self.cond.wait()
+                delay = self._next_batch - time.monotonic()
+            if delay > 0:
+                # Let updates accumulate until the next slot
+                time.sleep(delay)
+                continue
+            with self._delivering:
+                with self.cond:
+                    batch = list(self._pending.values())
+                    self._pending.clear()
+                    self._next_batch = time.monotonic() + self.interval
+                self._deliver(batch)
@@ -1,68 +1,250 @@
 # src/video_downloader/queue_manager.py
+import glob
+import itertools
+import os
+import sys
 import threading
-from queue import Queue
-from dataclasses import dataclass
-from typing import Optional, Callable, Dict, Any
+import time
+from queue import Empty, Full, Queue
+from dataclasses import dataclass, field
+from typing import Optional, Callable, Dict, Any, Iterable, List, Sequence, Set
 from enum import Enum
 import uuid
 
+from .bandwidth import BandwidthLimiter
+from .history import TaskHistory
+from .metrics import QueueMetrics
+from .profiles import OptionProfiles
+from .progress import ProgressCoalescer
+from .retry import DEFAULT_RETRY_POLICY, CircuitBreaker, ErrorKind, RetryPolicy, classify_error, retry_after
+from .scheduler import TaskScheduler, host_of
+from .tracing import bind_task, get_tracer, span
+
 
 class DownloadStatus(Enum):
     PENDING = "pending"
     DOWNLOADING = "downloading" 
+    POSTPROCESSING = "postprocessing"
     COMPLETED = "completed"
     FAILED = "failed"
     CANCELLED = "cancelled"
 
 
-@dataclass
+# Slotted records (Python 3.10+) keep per-task overhead small in very large queues
+_RECORD = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Statuses that keep the queue from being idle
+_BUSY = (DownloadStatus.PENDING, DownloadStatus.DOWNLOADING, DownloadStatus.POSTPROCESSING)
+
+# Default size of the post-processing pool: ffmpeg steps are CPU-bound
+DEFAULT_POSTPROCESS_WORKERS = os.cpu_count() or 2
+
+# What happens to the .part files of a cancelled download
+PARTIAL_FILE_POLICIES = ("keep", "delete")
+
+
+class TaskCancelled(Exception):
+    """Raised from a progress hook to stop a download whose task was cancelled."""
+
+
+@dataclass(**_RECORD)
 class DownloadTask:
     """Represents a single download task in the queue."""
     id: str
     url: str
-    options: Dict[str, Any]
+    options: Dict[str, Any]  # shared between tasks with the same settings; treat as read-only
     status: DownloadStatus = DownloadStatus.PENDING
+    priority: int = 0  # higher runs first
+    rate_limit: Optional[int] = None  # per-task cap in bytes/sec
     progress: float = 0.0
     error_message: Optional[str] = None
+    error_kind: Optional[str] = None  # ErrorKind value of the last failure
+    retries: int = 0  # attempts made after the first one
+    retry_at: Optional[float] = None  # time.time() the pending retry is due
     result_path: Optional[str] = None
     # Playlist tracking (if applicable)
     current_index: Optional[int] = None
     total_count: Optional[int] = None
     current_title: Optional[str] = None
+    # Bytes across all files of this task (known so far)
+    downloaded_bytes: int = 0
+    total_bytes: int = 0
+    speed: Optional[float] = None  # bytes/sec at the last progress update
+    # Playlist fan-out: children point at their parent, parents aggregate children
+    parent_id: Optional[str] = None
+    child_ids: Sequence[str] = ()  # a list once the playlist has been expanded
+    children_finished: int = 0
+    children_completed: int = 0
+    children_failed: int = 0
+    # Seconds spent in each stage: fetch (split into extract, until the first
+    # byte, and download), handoff (waiting for a post-processing worker) and
+    # postprocess; no handoff or postprocess when post-processing runs inline
+    stage_times: Optional[Dict[str, float]] = None
+    # Post-processing steps planned per downloaded file (an empty list when the
+    # file was already in the requested format)
+    postprocess_steps: Optional[Dict[str, List[str]]] = None
+
+
+@dataclass(**_RECORD)
+class _ActiveDownload:
+    """Worker-side state of a running download, used to interrupt it."""
+    cancel_event: threading.Event
+    filenames: Set[str] = field(default_factory=set)  # files the download has written to
+    released: bool = False  # host slot and bandwidth share already handed back
+    delete_partial: bool = False  # remove .part files once the download has stopped
+    requeue: bool = False  # interrupted by shutdown: back to PENDING instead of CANCELLED
+    replaced: bool = False  # another worker took over; this one exits once unwound
+
+
+def _remove_partial_files(filenames: Iterable[str]):
+    """Delete the .part, fragment and resume-state files left behind for these outputs."""
+    for filename in filenames:
+        paths = [filename + ".part", filename + ".ytdl"]
+        paths += glob.glob(glob.escape(filename + ".part") + "-Frag*")
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"DEBUG: Could not remove partial file {path}: {e}")
+
+
+def _has_work(job) -> bool:
+    """Whether a post-processing job has a step to run (jobs without ``steps`` are assumed to)."""
+    steps = getattr(job, "steps", None)
+    return steps is None or any(steps.values())
 
 
 class DownloadQueueManager:
     """Manages a queue of download tasks and processes them with multiple worker threads."""
     
-    def __init__(self, download_function: Callable, max_workers: int = 3):
+    def __init__(self, download_function: Callable, max_workers: int = 3,
+                 playlist_expander: Optional[Callable] = None,
+                 session_factory: Optional[Callable] = None,
+                 max_per_host: Optional[int] = None,
+                 bandwidth_limit: Optional[int] = None,
+                 journal=None,
+                 progress_rate: Optional[float] = None,
+                 history_size: int = 1000,
+                 history_path: Optional[str] = None,
+                 partial_files: str = "keep",
+                 postprocess_workers: Optional[int] = None,
+                 postprocess_queue_size: Optional[int] = None,
+                 retry_policy: Optional[RetryPolicy] = DEFAULT_RETRY_POLICY):
+        if partial_files not in PARTIAL_FILE_POLICIES:
+            raise ValueError(f"partial_files must be one of {PARTIAL_FILE_POLICIES}, not {partial_files!r}")
         self.download_function = download_function
-        self.task_queue = Queue()
+        # Optional callable(url) -> list of entry dicts used to split playlists
+        # into individual tasks that run across all workers
+        self.playlist_expander = playlist_expander
+        # Optional callable() -> session object; each worker keeps one for its
+        # lifetime and passes it to download_function as ``session``
+        self.session_factory = session_factory
+        # Priority queue that also caps concurrent downloads per host
+        self.task_queue = TaskScheduler(max_per_host=max_per_host)
+        # Failed downloads are classified (see retry.py); transient and throttled
+        # ones go back into the queue after a back-off instead of failing. A
+        # host that keeps failing is paused by the circuit breaker. None fails
+        # every error at once.
+        self.retry_policy = retry_policy
+        self.circuit_breaker = None
+        if retry_policy is not None and retry_policy.failure_threshold:
+            self.circuit_breaker = CircuitBreaker(retry_policy.failure_threshold, retry_policy.cooldown)
+        # Global bytes/sec budget shared by all running downloads
+        self.bandwidth = BandwidthLimiter(limit=bandwidth_limit)
+        # Optional TaskJournal that persists every state transition
+        self.journal = journal
+        # Optional cap on progress callbacks per second; updates in between are
+        # coalesced per task and delivered together
+        self._progress = ProgressCoalescer(self._deliver_progress, progress_rate) if progress_rate else None
         self.active_tasks = {}  # id -> DownloadTask
-        self.completed_tasks = []
+        # Tasks removed by clear_completed; only the newest history_size are kept,
+        # older ones are appended to history_path (JSON lines) if given
+        self.completed_tasks = TaskHistory(history_size, history_path)
+        # Tasks with identical options share one options dict
+        self.option_profiles = OptionProfiles()
+        # Optional post-processing stage: download_function is called with
+        # defer_postprocessing=True and the job it returns (anything with a run()
+        # method) runs on its own pool of postprocess_workers threads, so download
+        # workers go straight back to fetching. The hand-off queue is bounded;
+        # download workers wait when it is full.
+        self.postprocess_workers = postprocess_workers
+        self._postprocess_queue = None
+        if postprocess_workers:
+            self._postprocess_queue = Queue(maxsize=postprocess_queue_size or 2 * postprocess_workers)
+        self._postprocess_threads = []
+        # Hand-offs are accepted only while the post-processing workers run;
+        # stop_processing closes them and waits for the ones under way
+        # (under self.lock) before sending the workers their sentinels
+        self._postprocess_open = False
+        self._handoffs = 0
+        # Default for cancel_download: "keep" leaves .part files so the same
+        # download resumes if it is queued again, "delete" removes them
+        self.partial_files = partial_files
         self.is_running = False
         self.worker_threads = []
         self.max_workers = max_workers
+        self._worker_numbers = itertools.count(1)
+        self._pool_size = 0  # workers that will keep taking tasks (under self.lock)
         self.lock = threading.Lock()
+        self._handoffs_done = threading.Condition(self.lock)
+        self._child_progress = {}  # parent id -> {child id: progress}
+        self._running: Dict[str, _ActiveDownload] = {}  # task id -> running download
+        # Aggregates over active_tasks, kept current on every transition (under self.lock)
+        self._status_counts = {status: 0 for status in DownloadStatus}
+        # Expanded playlists whose entries are running: counted as DOWNLOADING
+        # (they keep the queue busy) but not reported as downloads
+        self._playlists_running = 0
+        self._bytes_downloaded = 0
+        self._bytes_expected = 0
+        # Running totals for throughput monitors such as WorkerAutoscaler; unlike
+        # the aggregates they are not reduced when tasks are cleared
+        self._bytes_transferred = 0
+        self._completed_total = 0
+        self._failed_total = 0
+        self._throttled_total = 0
+        self._retries_total = 0
+        # Stage durations, rates, retries and failures by error class, worker
+        # busy time; see get_metrics()
+        self.metrics = QueueMetrics()
+        self._postprocess_busy = 0  # post-processing workers running a job (under self.lock)
+        # Set while nothing is pending or downloading
+        self._idle = threading.Event()
+        self._idle.set()
         
         # Callbacks
         self.on_task_started = None
         self.on_task_progress = None
+        self.on_progress_batch = None  # list of tasks; used instead of on_task_progress if set
         self.on_task_completed = None
         self.on_task_failed = None
-        self.on_queue_empty = None
+        self.on_task_cancelled = None
+        self.on_task_retrying = None  # a failed task went back into the queue
+        self.on_queue_empty = None  # once each time the queue drains
     
-    def add_download(self, url: str, options: Dict[str, Any]) -> str:
-        """Add a download task to the queue. Returns task ID."""
+    def add_download(self, url: str, options: Dict[str, Any], priority: int = 0,
+                     rate_limit: Optional[int] = None) -> str:
+        """
+        Add a download task to the queue. Returns task ID.
+        
+        :param priority: Higher priority runs first
+        :param rate_limit: Optional cap for this task in bytes/sec
+        """
         print(f"DEBUG: add_download() called with URL='{url}', options={options}")
         
         task_id = str(uuid.uuid4())
-        task = DownloadTask(id=task_id, url=url, options=options.copy())
+        task = DownloadTask(
+            id=task_id, url=url, options=self.option_profiles.intern(options),
+            priority=priority, rate_limit=rate_limit
+        )
         print(f"DEBUG: Created task with ID={task_id}")
         
         with self.lock:
-            self.active_tasks[task_id] = task
+            self._track(task)
             self.task_queue.put(task)
             print(f"DEBUG: Added task to queue, total tasks: {len(self.active_tasks)}")
+        self._journal_record(task)
         
         # Start processing if not already running
         if not self.is_running:
@@ -80,9 +262,119 @@ class DownloadQueueManager:
             if task_id in self.active_tasks:
                 task = self.active_tasks[task_id]
                 if task.status == DownloadStatus.PENDING:
-                    task.status = DownloadStatus.CANCELLED
-                    return True
-        return False
+                    self._set_status(task, DownloadStatus.CANCELLED)
+                else:
+                    return False
+            else:
+                return False
+        self._journal_record(task)
+        self._check_idle()
+        return True
+
+    def cancel_download(self, task_id: str, partial_files: Optional[str] = None) -> bool:
+        """
+        Cancel a pending or running download (or every entry of a playlist).
+
+        A running download stops at its next chunk boundary. Its status becomes
+        CANCELLED and its worker slot is handed back right away, so the next
+        task can start while the transfer unwinds. A task waiting for or in
+        post-processing is cancelled too: a queued job is skipped, a running
+        one finishes but no longer changes the task.
+
+        :param partial_files: "keep" or "delete" the download's .part files;
+                              defaults to the manager's ``partial_files`` policy
+        :return: False if the task is unknown or already finished
+        """
+        policy = partial_files or self.partial_files
+        if policy not in PARTIAL_FILE_POLICIES:
+            raise ValueError(f"partial_files must be one of {PARTIAL_FILE_POLICIES}, not {policy!r}")
+
+        with self.lock:
+            task = self.active_tasks.get(task_id)
+            if task is None or task.status not in _BUSY:
+                return False
+            if task.child_ids:
+                # Expanded playlist: cancel its unfinished entries, and the playlist itself
+                targets = [self.active_tasks[c] for c in task.child_ids if c in self.active_tasks]
+                targets = [t for t in targets if t.status in _BUSY]
+                self._set_status(task, DownloadStatus.CANCELLED)
+            else:
+                targets = [task]
+
+            interrupted = []
+            postprocessing = []
+            for target in targets:
+                if target.status == DownloadStatus.POSTPROCESSING:
+                    postprocessing.append(target)
+                elif target.status == DownloadStatus.DOWNLOADING:
+                    active = self._running[target.id]
+                    active.delete_partial = policy == "delete"
+                    active.cancel_event.set()
+                    active.released = True
+                    if self.is_running:
+                        # The worker leaves the pool once its download unwinds
+                        active.replaced = True
+                        self._pool_size -= 1
+                    self._child_progress.get(target.parent_id, {}).pop(target.id, None)
+                    interrupted.append(target)
+                # Pending entries are dropped when a worker takes them
+                self._set_status(target, DownloadStatus.CANCELLED)
+
+        for target in interrupted:
+            self.bandwidth.unregister(target.id)
+            self.task_queue.task_done(target)
+            print(f"DEBUG: Interrupting download of task {target.id}")
+        if interrupted:
+            self._resize_pool()
+        self._journal_record(*targets, *([task] if task.child_ids else []))
+
+        for target in targets:
+            self._flush_progress(target)
+            if self.on_task_cancelled:
+                self.on_task_cancelled(target)
+        for target in interrupted + postprocessing:
+            self._finish_child(target)
+        if task.child_ids and self.on_task_cancelled:
+            self.on_task_cancelled(task)
+        self._check_idle()
+        return True
+
+    def set_priority(self, task_id: str, priority: int) -> bool:
+        """Change the priority of a pending download (and its pending playlist entries)."""
+        with self.lock:
+            task = self.active_tasks.get(task_id)
+            if task is None:
+                return False
+            child_ids = list(task.child_ids)
+        
+        changed = self.task_queue.reprioritize(task_id, priority)
+        for child_id in child_ids:
+            changed = self.task_queue.reprioritize(child_id, priority) or changed
+        if changed:
+            task.priority = priority
+            with self.lock:
+                children = [self.active_tasks[c] for c in child_ids if c in self.active_tasks]
+            self._journal_record(task, *children)
+        return changed
+    
+    def set_bandwidth_limit(self, limit: Optional[int]):
+        """Change the global bandwidth budget in bytes/sec. None means unlimited."""
+        self.bandwidth.set_limit(limit)
+    
+    def set_bandwidth_schedule(self, schedule):
+        """Set time-of-day bandwidth windows as (start "HH:MM", end "HH:MM", bytes/sec)."""
+        self.bandwidth.set_schedule(schedule)
+    
+    def set_task_rate_limit(self, task_id: str, limit: Optional[int]) -> bool:
+        """Change the per-task cap of a queued or running download."""
+        with self.lock:
+            task = self.active_tasks.get(task_id)
+            if task is None:
+                return False
+            task.rate_limit = limit
+        self.bandwidth.set_task_cap(task_id, limit)
+        self._journal_record(task)
+        return True
     
     def get_task_status(self, task_id: str) -> Optional[DownloadTask]:
         """Get the current status of a task."""
@@ -95,88 +387,716 @@ class DownloadQueueManager:
             return self.active_tasks.copy()
     
     def get_queue_info(self) -> Dict[str, Any]:
-        """Get information about the current queue state."""
-        with self.lock:
-            pending_count = sum(1 for task in self.active_tasks.values() 
-                              if task.status == DownloadStatus.PENDING)
-            downloading_count = sum(1 for task in self.active_tasks.values() 
-                                  if task.status == DownloadStatus.DOWNLOADING)
-            completed_count = sum(1 for task in self.active_tasks.values() 
-                                if task.status == DownloadStatus.COMPLETED)
-            failed_count = sum(1 for task in self.active_tasks.values() 
-                             if task.status == DownloadStatus.FAILED)
-            
+        """Get information about the current queue state (constant time)."""
+        with self.lock:
+            counts = self._status_counts
             return {
-                "pending": pending_count,
-                "downloading": downloading_count,
-                "completed": completed_count,
-                "failed": failed_count,
+                "pending": counts[DownloadStatus.PENDING],
+                "downloading": counts[DownloadStatus.DOWNLOADING] - self._playlists_running,
+                "postprocessing": counts[DownloadStatus.POSTPROCESSING],
+                "playlists": self._playlists_running,
+                "completed": counts[DownloadStatus.COMPLETED],
+                "failed": counts[DownloadStatus.FAILED],
+                "cancelled": counts[DownloadStatus.CANCELLED],
                 "total": len(self.active_tasks),
+                "bytes_downloaded": self._bytes_downloaded,
+                "bytes_expected": self._bytes_expected,
+                "bytes_transferred": self._bytes_transferred,
+                "completed_total": self._completed_total,
+                "failed_total": self._failed_total,
+                "throttled_total": self._throttled_total,
+                "retries_total": self._retries_total,
+                "workers": self.max_workers,
+                "busy_workers": len(self._running),  # workers holding a download
                 "is_processing": self.is_running
             }
     
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Snapshot of the queue's performance for dashboards and alerts.
+        
+        Queue depth by status, running totals, the current rate of each running
+        download and their sum, stage duration and per-task rate histograms,
+        retries and failures by error class, and the size, busy workers and
+        busy seconds of each worker pool. ``metrics.render_prometheus`` turns
+        it into the Prometheus text format (``MetricsServer`` serves it).
+        """
+        info = self.get_queue_info()
+        with self.lock:
+            running = [self.active_tasks[task_id] for task_id in self._running if task_id in self.active_tasks]
+            postprocess_busy = self._postprocess_busy
+        tasks = [
+            {
+                "id": task.id,
+                "url": task.url,
+                "host": host_of(task.url),
+                "bytes_per_second": round(task.speed or 0),
+                "downloaded_bytes": task.downloaded_bytes,
+                "total_bytes": task.total_bytes,
+            }
+            for task in running if task.status == DownloadStatus.DOWNLOADING
+        ]
+        snapshot = self.metrics.snapshot()
+        busy_seconds = snapshot.pop("busy_seconds")
+        pools = {"download": (info["workers"], len(tasks))}
+        if self.postprocess_workers:
+            pools["postprocess"] = (self.postprocess_workers, postprocess_busy)
+        snapshot.update({
+            "time": round(time.time(), 3),
+            "queue": {status.value: info[status.value] for status in DownloadStatus},
+            "completed_total": info["completed_total"],
+            "failed_total": info["failed_total"],
+            "throttled_total": info["throttled_total"],
+            "retries_total": info["retries_total"],
+            "bytes_transferred": info["bytes_transferred"],
+            "bytes_per_second": sum(task["bytes_per_second"] for task in tasks),
+            "tasks": tasks,
+            "workers": {
+                pool: {"size": size, "busy": busy, "utilisation": round(busy / size, 3) if size else 0.0,
+                       "busy_seconds": busy_seconds.get(pool, 0.0)}
+                for pool, (size, busy) in pools.items()
+            },
+            "paused_hosts": {host: round(left, 1) for host, left in self.task_queue.paused_hosts().items()},
+        })
+        return snapshot
+    
     def start_processing(self):
         """Start processing the download queue with multiple worker threads."""
         print("DEBUG: start_processing() called")
         
-        if self.is_running:
-            print("DEBUG: Already running, returning")
-            return
-            
-        print("DEBUG: Setting is_running=True")
-        self.is_running = True
-        
-        # Create and start worker threads
-        print(f"DEBUG: Creating {self.max_workers} worker threads")
-        for i in range(self.max_workers):
-            worker_thread = threading.Thread(
-                target=self._process_queue, 
-                daemon=True,
-                name=f"DownloadWorker-{i+1}"
-            )
-            worker_thread.start()
-            self.worker_threads.append(worker_thread)
-            print(f"DEBUG: Started worker thread {i+1}")
+        with self.lock:
+            if self.is_running:
+                print("DEBUG: Already running, returning")
+                return
+            print("DEBUG: Setting is_running=True")
+            self.is_running = True
+            # Workers still finishing a download from a timed-out stop rejoin the pool
+            self._pool_size += self.task_queue.withdraw_sentinels()
         
+        print(f"DEBUG: Starting pool of {self.max_workers} worker threads")
+        self._resize_pool()
+        if self._postprocess_queue is not None:
+            self._postprocess_threads = [t for t in self._postprocess_threads if t.is_alive()]
+            for _ in range(self.postprocess_workers - len(self._postprocess_threads)):
+                thread = threading.Thread(
+                    target=self._process_postprocessing,
+                    daemon=True,
+                    name=f"PostProcessWorker-{len(self._postprocess_threads) + 1}"
+                )
+                thread.start()
+                self._postprocess_threads.append(thread)
+            with self.lock:
+                self._postprocess_open = True
         print("DEBUG: start_processing() completed")
     
-    def stop_processing(self):
-        """Stop processing the download queue."""
-        self.is_running = False
+    def set_max_workers(self, count: int):
+        """
+        Resize the worker pool while the queue is running.
+        
+        Extra workers start right away; when shrinking, workers exit as they
+        finish their current download.
+        """
+        if count < 1:
+            raise ValueError("max_workers must be at least 1")
+        with self.lock:
+            self.max_workers = count
+        self._resize_pool()
+    
+    def _resize_pool(self):
+        """Start or stop workers until the pool matches max_workers."""
+        with self.lock:
+            if not self.is_running:
+                return
+            delta = self.max_workers - self._pool_size
+            if delta < 0:
+                self.task_queue.put_sentinels(-delta)
+            elif delta > 0:
+                # Workers that have not picked up their stop signal yet stay on
+                delta -= self.task_queue.withdraw_sentinels(delta)
+            self._pool_size = self.max_workers
+            for _ in range(delta):
+                self._start_worker()
+    
+    def _start_worker(self):
+        worker_thread = threading.Thread(
+            target=self._process_queue, 
+            daemon=True,
+            name=f"DownloadWorker-{next(self._worker_numbers)}"
+        )
+        worker_thread.start()
+        # Workers that have exited (stopped or retired) are dropped here
+        self.worker_threads = [t for t in self.worker_threads if t.is_alive()]
+        self.worker_threads.append(worker_thread)
+        print(f"DEBUG: Started worker thread {worker_thread.name}")
+    
+    def stop_processing(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stop processing the download queue.
+        
+        Idle workers exit at once. Without a timeout, running downloads are
+        allowed to finish. With one, they are interrupted at their next chunk
+        and go back to PENDING (their .part files are kept, so they resume when
+        processing starts again), and workers get at most ``timeout`` seconds to
+        exit. Returns True if every worker has exited; stragglers stay in
+        ``worker_threads``.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.lock:
+            self.is_running = False
+            # Downloads that finish from now on post-process inline
+            self._postprocess_open = False
+            # One sentinel per worker; sentinels are handed out ahead of queued tasks
+            self.task_queue.put_sentinels(self._pool_size)
+            self._pool_size = 0
+            if timeout is not None:
+                for active in self._running.values():
+                    if not active.cancel_event.is_set():
+                        active.requeue = True
+                        active.cancel_event.set()
         
         # Wait for all worker threads to finish
-        for worker_thread in self.worker_threads:
-            worker_thread.join()
-        self.worker_threads.clear()
+        for worker_thread in list(self.worker_threads):
+            worker_thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        self.worker_threads = [t for t in self.worker_threads if t.is_alive()]
+        
+        # Post-processing workers finish the jobs already handed over, then exit
+        # on their sentinel; hand-offs still waiting for room in the queue go
+        # in ahead of it
+        with self._handoffs_done:
+            self._handoffs_done.wait_for(
+                lambda: self._handoffs == 0,
+                None if deadline is None else max(0.0, deadline - time.monotonic()),
+            )
+        for thread in self._postprocess_threads:
+            try:
+                self._postprocess_queue.put(None, timeout=None if deadline is None
+                                            else max(0.0, deadline - time.monotonic()))
+            except Full:
+                break
+        for thread in self._postprocess_threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        self._postprocess_threads = [t for t in self._postprocess_threads if t.is_alive()]
+        if self._postprocess_queue is not None:
+            # Jobs the workers had no time left for go back to PENDING; fetching
+            # them again finds the finished file and only post-processes it
+            while True:
+                try:
+                    item = self._postprocess_queue.get_nowait()
+                except Empty:
+                    break
+                if item is not None and item[0].status == DownloadStatus.POSTPROCESSING:
+                    self._requeue_interrupted(item[0])
+        
+        if self._progress is not None:
+            self._progress.flush()
+        return not self.worker_threads and not self._postprocess_threads
+    
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until no task is pending or downloading and the callbacks of the
+        last one have run. Returns False if ``timeout`` seconds passed first.
+        """
+        return self._idle.wait(timeout)
     
     def clear_completed(self):
         """Remove all completed and failed tasks from memory."""
+        finished = [DownloadStatus.COMPLETED, DownloadStatus.FAILED, DownloadStatus.CANCELLED]
         with self.lock:
+            # Entries of a playlist that is still running stay until the playlist finishes
             to_remove = [task_id for task_id, task in self.active_tasks.items() 
-                        if task.status in [DownloadStatus.COMPLETED, DownloadStatus.FAILED, DownloadStatus.CANCELLED]]
-            for task_id in to_remove:
-                self.completed_tasks.append(self.active_tasks.pop(task_id))
+                        if task.status in finished
+                        and (task.parent_id is None or task.parent_id not in self._child_progress)]
+            removed = [self.active_tasks[task_id] for task_id in to_remove]
+            for task in removed:
+                self._untrack(task)
+        self.completed_tasks.extend(removed)
+        if self.journal is not None:
+            self.journal.remove(to_remove)
+    
+    def _track(self, task: DownloadTask):
+        """Add a task to active_tasks and the aggregates. Caller holds the lock."""
+        self.active_tasks[task.id] = task
+        self._status_counts[task.status] += 1
+        if task.status in _BUSY and self._idle.is_set():
+            self._idle.clear()
+        self._bytes_downloaded += task.downloaded_bytes
+        self._bytes_expected += task.total_bytes
+    
+    def _untrack(self, task: DownloadTask):
+        """Remove a task from active_tasks and the aggregates. Caller holds the lock."""
+        del self.active_tasks[task.id]
+        self._status_counts[task.status] -= 1
+        self._bytes_downloaded -= task.downloaded_bytes
+        self._bytes_expected -= task.total_bytes
+    
+    def _set_status(self, task: DownloadTask, status: DownloadStatus):
+        """Change a task's status, keeping the counters in step. Caller holds the lock."""
+        if task.id in self.active_tasks:
+            self._status_counts[task.status] -= 1
+            self._status_counts[status] += 1
+            if task.child_ids:
+                self._playlists_running += ((status == DownloadStatus.DOWNLOADING)
+                                            - (task.status == DownloadStatus.DOWNLOADING))
+            if status in _BUSY:
+                if self._idle.is_set():
+                    self._idle.clear()
+            elif status != task.status and not task.child_ids:
+                # Playlist parents only aggregate their entries
+                if status == DownloadStatus.COMPLETED:
+                    self._completed_total += 1
+                elif status == DownloadStatus.FAILED:
+                    self._failed_total += 1
+        task.status = status
+    
+    def _check_idle(self):
+        """Mark the queue idle and fire on_queue_empty once it has drained."""
+        with self.lock:
+            counts = self._status_counts
+            if self._idle.is_set() or any(counts[status] for status in _BUSY):
+                return
+            self._idle.set()
+        if self.on_queue_empty:
+            print("DEBUG: Calling on_queue_empty")
+            self.on_queue_empty()
+    
+    def _set_bytes(self, task: DownloadTask, downloaded: int, total: int):
+        """Update a task's byte counts and the totals."""
+        with self.lock:
+            if task.id in self.active_tasks:
+                self._bytes_downloaded += downloaded - task.downloaded_bytes
+                self._bytes_expected += total - task.total_bytes
+                self._bytes_transferred += max(0, downloaded - task.downloaded_bytes)
+            task.downloaded_bytes = downloaded
+            task.total_bytes = total
+    
+    def _notify_progress(self, task: DownloadTask):
+        """Report a progress change, coalesced when a progress rate is set."""
+        if self._progress is not None:
+            self._progress.update(task)
+        else:
+            self._deliver_progress([task])
+    
+    def _deliver_progress(self, tasks: List[DownloadTask]):
+        if self.on_progress_batch:
+            self.on_progress_batch(tasks)
+        elif self.on_task_progress:
+            for task in tasks:
+                self.on_task_progress(task)
+    
+    def _flush_progress(self, task: DownloadTask):
+        """Deliver a task's last progress update before its final state is reported."""
+        if self._progress is not None:
+            self._progress.flush(task)
+    
+    def _journal_record(self, *tasks):
+        """Persist task state transitions when a journal is configured."""
+        if self.journal is None:
+            return
+        try:
+            # Snapshot under the lock that orders transitions: if another thread
+            # journals the same task meanwhile, the journal keeps the newer row
+            with self.lock:
+                rows = self.journal.snapshot(tasks)
+            self.journal.write(rows)
+        except Exception as e:
+            print(f"DEBUG: Failed to journal task state: {e}")
+    
+    def restore_from_journal(self) -> List[str]:
+        """
+        Rebuild the queue from the journal after a restart or crash.
+        
+        Finished tasks are restored as history. Interrupted downloads go back to
+        PENDING and continue from their ``.part`` files when they run again.
+        Returns the IDs of the top-level tasks that still have work to do.
+        """
+        if self.journal is None:
+            return []
+        
+        records = self.journal.load()
+        intern = self.option_profiles.intern
+        # load() decodes each distinct options string once; intern each of those once
+        profiles = {}
+        statuses = {status.value: status for status in DownloadStatus}
+        pending, downloading = DownloadStatus.PENDING, DownloadStatus.DOWNLOADING
+        unfinished_statuses = _BUSY
+        unfinished = []
+        requeue = []
+        resumed = []
+        # Rows per journaled status, added to the counters in one go below
+        # (what _track does per task; restored tasks carry no bytes)
+        tallies = dict.fromkeys(statuses, 0)
+        with self.lock:
+            active_tasks = self.active_tasks
+            # Rows come in queueing order, so a playlist precedes its entries
+            for (task_id, parent_id, url, options, priority, rate_limit, status,
+                 error_message, current_index, total_count, current_title) in records:
+                tallies[status] += 1
+                status = statuses[status]
+                profile = profiles.get(id(options))
+                if profile is None:
+                    profile = profiles[id(options)] = intern(options)
+                task = DownloadTask(
+                    id=task_id,
+                    url=url,
+                    options=profile,
+                    status=status,
+                    priority=priority,
+                    rate_limit=rate_limit,
+                    error_message=error_message,
+                    current_index=current_index,
+                    total_count=total_count,
+                    current_title=current_title,
+                    parent_id=parent_id,
+                )
+                active_tasks[task_id] = task
+                if status in unfinished_statuses:
+                    # Post-processing is redone too: the fetched file is found
+                    # on disk, so only the ffmpeg steps run again
+                    unfinished.append(task)
+                elif status == DownloadStatus.COMPLETED:
+                    task.progress = 100.0
+                
+                # Re-link playlist entries to their parents
+                parent = active_tasks.get(parent_id) if parent_id else None
+                if parent is not None:
+                    if not parent.child_ids:
+                        parent.child_ids = []
+                    parent.child_ids.append(task_id)
+                    if status not in unfinished_statuses:
+                        parent.children_finished += 1
+                        if status == DownloadStatus.COMPLETED:
+                            parent.children_completed += 1
+                        elif status == DownloadStatus.FAILED:
+                            parent.children_failed += 1
+            
+            counts = self._status_counts
+            for value, count in tallies.items():
+                counts[statuses[value]] += count
+            if unfinished:
+                self._idle.clear()
+            for task in unfinished:
+                if task.child_ids:
+                    # Expanded playlist: its entries are requeued individually
+                    if task.status is not downloading:
+                        counts[task.status] -= 1
+                        counts[downloading] += 1
+                        task.status = downloading
+                    self._playlists_running += 1
+                    self._child_progress[task.id] = {}
+                    task.progress = task.children_finished * 100.0 / len(task.child_ids)
+                    if self._settle_parent(task):
+                        del self._child_progress[task.id]
+                    elif task.parent_id is None:
+                        resumed.append(task.id)
+                else:
+                    if task.status is not pending:
+                        counts[task.status] -= 1
+                        counts[pending] += 1
+                        task.status = pending
+                    requeue.append(task)
+                    if task.parent_id is None:
+                        resumed.append(task.id)
+            self.task_queue.put_many(requeue)
+        
+        print(f"DEBUG: Restored {len(records)} tasks from journal, {len(resumed)} to resume")
+        return resumed
+    
+    def _requeue_interrupted(self, task: DownloadTask):
+        """Put a download interrupted by shutdown back in the queue to resume later."""
+        with self.lock:
+            self._set_status(task, DownloadStatus.PENDING)
+            self._child_progress.get(task.parent_id, {}).pop(task.id, None)
+            self.task_queue.put(task)
+        self._journal_record(task)
+    
+    def _settle_parent(self, parent: DownloadTask) -> bool:
+        """Set a playlist's final status once all entries are done. Caller holds the lock."""
+        if parent.children_finished < len(parent.child_ids):
+            return False
+        if parent.status == DownloadStatus.CANCELLED:
+            pass  # cancelled as a whole; entries that finished first are kept
+        elif parent.children_completed > 0:
+            self._set_status(parent, DownloadStatus.COMPLETED)
+            parent.progress = 100.0
+        elif parent.children_failed > 0:
+            self._set_status(parent, DownloadStatus.FAILED)
+            parent.error_message = f"All {parent.children_failed} playlist entries failed"
+        else:
+            self._set_status(parent, DownloadStatus.CANCELLED)
+        return True
+    
+    def _expand_playlist(self, task: DownloadTask) -> bool:
+        """Queue one child task per playlist entry. Returns True if the task was expanded."""
+        if (self.playlist_expander is None or task.parent_id is not None
+                or not task.options.get("is_playlist")):
+            return False
+        
+        entries = self.playlist_expander(task.url)
+        if not entries:
+            # Not a playlist (or listing failed): download it as a single task
+            return False
+        
+        # Children share one options dict; workers copy it before adding hooks
+        child_options = self.option_profiles.intern(dict(task.options, is_playlist=False))
+        
+        children = [
+            DownloadTask(
+                id=str(uuid.uuid4()),
+                url=entry["url"],
+                options=child_options,
+                parent_id=task.id,
+                priority=task.priority,
+                rate_limit=task.rate_limit,
+                current_index=entry.get("index"),
+                total_count=len(entries),
+                current_title=entry.get("title"),
+            )
+            for entry in entries
+        ]
+        with self.lock:
+            if task.status == DownloadStatus.CANCELLED:
+                # Cancelled while its entries were being listed; nothing to queue
+                return True
+            task.total_count = len(entries)
+            task.child_ids = [child.id for child in children]
+            self._set_status(task, DownloadStatus.DOWNLOADING)
+            self._child_progress[task.id] = {}
+        
+        # Journal before queueing so no entry can finish before it is recorded
+        self._journal_record(task, *children)
+        with self.lock:
+            for child in children:
+                self._track(child)
+            self.task_queue.put_many(children)
+        
+        if self.on_task_started:
+            self.on_task_started(task)
+        return True
+    
+    def _update_parent_progress(self, child: DownloadTask):
+        """Recompute a playlist's progress from its finished and running children."""
+        with self.lock:
+            parent = self.active_tasks.get(child.parent_id)
+            running = self._child_progress.get(child.parent_id)
+            if parent is None or running is None or not parent.child_ids:
+                return
+            if child.id in running:
+                running[child.id] = child.progress
+            parent.progress = (
+                parent.children_finished * 100.0 + sum(running.values())
+            ) / len(parent.child_ids)
+            parent.current_index = child.current_index
+            parent.current_title = child.current_title
+        
+        self._notify_progress(parent)
+    
+    def _finish_child(self, child: DownloadTask):
+        """Record a finished child and complete its playlist once all entries are done."""
+        if child.parent_id is None:
+            return
+        
+        with self.lock:
+            parent = self.active_tasks.get(child.parent_id)
+            running = self._child_progress.get(child.parent_id)
+            if parent is None or running is None:
+                return
+            running.pop(child.id, None)
+            was_cancelled = parent.status == DownloadStatus.CANCELLED
+            parent.children_finished += 1
+            if child.status == DownloadStatus.COMPLETED:
+                parent.children_completed += 1
+            elif child.status == DownloadStatus.FAILED:
+                parent.children_failed += 1
+            
+            total = len(parent.child_ids)
+            parent.progress = (parent.children_finished * 100.0 + sum(running.values())) / total
+            finished = self._settle_parent(parent)
+            if finished:
+                del self._child_progress[parent.id]
+        
+        if finished:
+            self._journal_record(parent)
+            self._flush_progress(parent)
+        
+        if not finished:
+            self._notify_progress(parent)
+        elif parent.status == DownloadStatus.COMPLETED:
+            if self.on_task_completed:
+                self.on_task_completed(parent)
+        elif parent.status == DownloadStatus.FAILED:
+            if self.on_task_failed:
+                self.on_task_failed(parent)
+        elif not was_cancelled:
+            # Every entry was cancelled individually
+            if self.on_task_cancelled:
+                self.on_task_cancelled(parent)
+    
+    def _record_fetch(self, task: DownloadTask, started: float, first_byte: Optional[float]):
+        """Record the stage times and average rate of a fetch that just returned."""
+        ended = time.monotonic()
+        if first_byte is None:
+            first_byte = ended  # nothing was downloaded (e.g. already in the archive)
+        task.stage_times = {
+            "fetch": round(ended - started, 3),
+            "extract": round(first_byte - started, 3),
+            "download": round(ended - first_byte, 3),
+        }
+        self.metrics.observe_stage("extract", first_byte - started)
+        self.metrics.observe_stage("download", ended - first_byte)
+        if ended > first_byte and task.downloaded_bytes:
+            self.metrics.observe_rate(task.downloaded_bytes / (ended - first_byte))
+    
+    def _record_host_result(self, task: DownloadTask, kind: Optional[ErrorKind]):
+        """Feed an attempt's outcome (None: success) to the circuit breaker, pausing or resuming its host."""
+        if self.circuit_breaker is None:
+            return
+        host = host_of(task.url)
+        if kind in (ErrorKind.TRANSIENT, ErrorKind.THROTTLED):
+            cooldown = self.circuit_breaker.record_failure(host)
+            if cooldown is not None:
+                print(f"DEBUG: Pausing downloads from {host} for {cooldown:.1f}s")
+                self.task_queue.pause_host(host, cooldown)
+        # A permanent error still means the host answered
+        elif self.circuit_breaker.record_success(host):
+            print(f"DEBUG: Resuming downloads from {host}")
+            self.task_queue.resume_host(host)
+    
+    def _report_finished(self, task: DownloadTask):
+        """Journal a task that just completed or failed and fire its callback."""
+        with span("report", "queue", status=task.status.value):
+            self._journal_record(task)
+            self._flush_progress(task)
+
+            if task.status == DownloadStatus.COMPLETED:
+                if self.on_task_completed:
+                    print(f"DEBUG: Calling on_task_completed for task {task.id}")
+                    self.on_task_completed(task)
+            elif self.on_task_failed:
+                print(f"DEBUG: Calling on_task_failed for task {task.id}")
+                self.on_task_failed(task)
+            self._finish_child(task)
+    
+    def _process_postprocessing(self):
+        """Post-processing worker: runs the jobs download workers hand over."""
+        print(f"DEBUG: Worker thread {threading.current_thread().name} started")
+        while True:
+            item = self._postprocess_queue.get()
+            if item is None:
+                break
+            task, job, handed_over = item
+            self._run_postprocess_job(task, job, handed_over)
+            self._check_idle()
+        print(f"DEBUG: Worker thread {threading.current_thread().name} exiting")
+    
+    def _run_postprocess_job(self, task: DownloadTask, job, handed_over: float, pool: bool = True):
+        """
+        Run a POSTPROCESSING task's job and report the task.
+
+        :param handed_over: ``time.monotonic()`` when the download worker let go of it
+        :param pool: False when a download worker runs it itself (while stopping)
+        """
+        if task.status != DownloadStatus.POSTPROCESSING:
+            return  # cancelled while waiting in the hand-off queue
+        started = time.monotonic()
+        task.stage_times["handoff"] = round(started - handed_over, 3)
+        if pool:
+            with self.lock:
+                self._postprocess_busy += 1
+        bind_task(task.id)
+        error = None
+        try:
+            with span("postprocess_job", "queue"):
+                job.run()
+        except Exception as e:
+            print(f"DEBUG: Post-processing failed for task {task.id}: {e}")
+            error = e
+        finally:
+            if pool:
+                with self.lock:
+                    self._postprocess_busy -= 1
+        with self.lock:
+            # cancel_download settles the task itself if it got there first
+            finished = task.status == DownloadStatus.POSTPROCESSING
+            if finished and error is None:
+                self._set_status(task, DownloadStatus.COMPLETED)
+                task.progress = 100.0
+            elif finished:
+                self._set_status(task, DownloadStatus.FAILED)
+                task.error_message = f"Post-processing failed: {error}"
+        if finished and error is not None:
+            self.metrics.count_failure("postprocess")
+        elapsed = time.monotonic() - started
+        task.stage_times["postprocess"] = round(elapsed, 3)
+        self.metrics.observe_stage("handoff", started - handed_over)
+        self.metrics.observe_stage("postprocess", elapsed)
+        if pool:
+            self.metrics.add_busy("postprocess", elapsed)
+        if finished:
+            try:
+                self._report_finished(task)
+            except Exception as e:
+                print(f"DEBUG: Worker {threading.current_thread().name} exception in callback: {e}")
+        bind_task(None)
     
     def _process_queue(self):
         """Main worker thread function that processes download tasks."""
         print(f"DEBUG: Worker thread {threading.current_thread().name} started")
+        session = self.session_factory() if self.session_factory else None
         
-        while self.is_running:
+        retired = False
+        while not retired:
             try:
+                # The previous task (and its callbacks) is finished
+                bind_task(None)
+                self._check_idle()
                 print(f"DEBUG: Worker {threading.current_thread().name} waiting for task...")
-                # Get next task from queue (blocks if queue is empty)
-                task = self.task_queue.get(timeout=1.0)
+                # Get next task from queue (blocks until a task or a stop sentinel arrives)
+                waited = time.perf_counter()
+                task = self.task_queue.get()
+                if task is None:
+                    print(f"DEBUG: Worker {threading.current_thread().name} received stop signal")
+                    break
                 print(f"DEBUG: Worker {threading.current_thread().name} got task {task.id}")
-                
+                # Spans of this iteration (see tracing.py) are tagged with the task
+                tracer = get_tracer()
+                task_started = time.perf_counter()
+                if tracer is not None:
+                    bind_task(task.id)
+                    tracer.add("wait", waited, task_started, "queue")
+
                 # Skip cancelled tasks
                 if task.status == DownloadStatus.CANCELLED:
                     print(f"DEBUG: Task {task.id} was cancelled, skipping")
-                    self.task_queue.task_done()
+                    self._finish_child(task)
+                    self.task_queue.task_done(task)
+                    continue
+                
+                # Split playlists into child tasks so every worker can take entries
+                try:
+                    with span("expand", "queue"):
+                        expanded = self._expand_playlist(task)
+                except Exception as e:
+                    print(f"DEBUG: Could not expand task {task.id}, downloading as a whole: {e}")
+                    expanded = False
+                if expanded:
+                    print(f"DEBUG: Task {task.id} expanded into {len(task.child_ids)} entries")
+                    self.task_queue.task_done(task)
                     continue
                 
-                # Update task status
+                # Update task status; a cancel may have landed since the check above
                 with self.lock:
-                    task.status = DownloadStatus.DOWNLOADING
+                    cancelled = task.status == DownloadStatus.CANCELLED
+                    if not cancelled:
+                        self._set_status(task, DownloadStatus.DOWNLOADING)
+                        active = self._running[task.id] = _ActiveDownload(threading.Event())
+                        if task.parent_id in self._child_progress:
+                            self._child_progress[task.parent_id][task.id] = 0.0
+                if cancelled:
+                    print(f"DEBUG: Task {task.id} was cancelled, skipping")
+                    self._finish_child(task)
+                    self.task_queue.task_done(task)
+                    continue
+                self._journal_record(task)
                 print(f"DEBUG: Task {task.id} status set to DOWNLOADING")
                 
                 # Notify task started
@@ -184,67 +1104,191 @@ class DownloadQueueManager:
                     print(f"DEBUG: Calling on_task_started for task {task.id}")
                     self.on_task_started(task)
                 
-                # Set up progress hook for this task
+                # Set up progress hook for this task; bytes of earlier files
+                # (e.g. the video stream before the audio) stay counted
+                current_file = {"name": None, "downloaded": 0, "total": 0, "first_byte": None}
+                
+                def cancel_hook(data):
+                    # Runs on every chunk, ahead of throttling and progress reporting
+                    if active.cancel_event.is_set():
+                        raise TaskCancelled(f"Task {task.id} was cancelled")
+                
                 def progress_hook(data):
                     if data.get("status") == "downloading":
+                        if current_file["first_byte"] is None:
+                            current_file["first_byte"] = time.monotonic()
+                        task.speed = data.get("speed")
                         info = data.get("info_dict", {}) or {}
                         # Capture playlist progress if available
-                        task.current_index = info.get("playlist_index") or info.get("playlist_autonumber")
-                        task.total_count = info.get("n_entries") or info.get("playlist_count")
+                        task.current_index = (
+                            info.get("playlist_index") or info.get("playlist_autonumber") or task.current_index
+                        )
+                        task.total_count = (
+                            info.get("n_entries") or info.get("playlist_count") or task.total_count
+                        )
                         task.current_title = info.get("title") or task.current_title
 
                         total_bytes = data.get("total_bytes") or data.get("total_bytes_estimate", 0)
                         if total_bytes > 0:
                             task.progress = (data.get("downloaded_bytes", 0) / total_bytes) * 100
-                        if self.on_task_progress:
-                            self.on_task_progress(task)
+                        if data.get("filename") != current_file["name"]:
+                            current_file["name"] = data.get("filename")
+                            if current_file["name"]:
+                                active.filenames.add(current_file["name"])
+                            current_file["downloaded"] = task.downloaded_bytes
+                            current_file["total"] = task.total_bytes
+                        self._set_bytes(
+                            task,
+                            current_file["downloaded"] + (data.get("downloaded_bytes") or 0),
+                            current_file["total"] + int(total_bytes or 0),
+                        )
+                        self._notify_progress(task)
+                        if task.parent_id is not None:
+                            self._update_parent_progress(task)
                 
-                # Add progress hook to options
+                # Add progress hooks to options; throttling runs first so the
+                # progress callback sees the rate-limited timing
                 options = task.options.copy()
+                if self.playlist_expander is not None and options.get("is_playlist"):
+                    # The expander found no entries, so this is a single video; download
+                    # it as one so a failure fails the task instead of being skipped
+                    options["is_playlist"] = False
                 existing_hooks = options.get("progress_hooks", [])
-                options["progress_hooks"] = existing_hooks + [progress_hook]
+                self.bandwidth.register(task.id, task.rate_limit)
+                options["progress_hooks"] = existing_hooks + [
+                    cancel_hook,
+                    self.bandwidth.make_progress_hook(task.id),
+                    progress_hook,
+                ]
+                # Lets the download function stop on its own terms (download_video
+                # aborts yt-dlp with DownloadCancelled, which also ends a playlist)
+                options["cancel_event"] = active.cancel_event
+                if session is not None:
+                    options["session"] = session
+                if self._postprocess_queue is not None:
+                    options["defer_postprocessing"] = True
                 
+                retry_delay = None
+                fetch_started = time.monotonic()
                 try:
                     print(f"DEBUG: Worker {threading.current_thread().name} calling download_function for task {task.id}")
                     # Execute the download
-                    self.download_function(task.url, **options)
+                    with span("download_function", "queue", attempt=task.retries + 1):
+                        job = self.download_function(task.url, **options)
+                    self._record_fetch(task, fetch_started, current_file["first_byte"])
+                    task.postprocess_steps = getattr(job, "steps", None)
                     print(f"DEBUG: Worker {threading.current_thread().name} download completed for task {task.id}")
+                    self._record_host_result(task, None)
                     
-                    # Mark as completed
+                    # Mark as completed (or hand the ffmpeg steps to the
+                    # post-processing stage), unless it was cancelled while finishing up
+                    handoff = self._postprocess_queue is not None and job is not None
+                    if handoff and not _has_work(job):
+                        # Nothing for ffmpeg to do: finish here instead of
+                        # waiting for room in the hand-off queue
+                        job.run()
+                        handoff = False
                     with self.lock:
-                        task.status = DownloadStatus.COMPLETED
-                        task.progress = 100.0
-                    
-                    if self.on_task_completed:
-                        print(f"DEBUG: Calling on_task_completed for task {task.id}")
-                        self.on_task_completed(task)
+                        interrupted = active.cancel_event.is_set() and not active.requeue
+                        if interrupted:
+                            pass
+                        elif handoff:
+                            self._set_status(task, DownloadStatus.POSTPROCESSING)
+                        else:
+                            self._set_status(task, DownloadStatus.COMPLETED)
+                            task.progress = 100.0
+                    if interrupted:
+                        pass
+                    elif handoff:
+                        self._journal_record(task)
+                        self._notify_progress(task)
+                        with self.lock:
+                            queued = self._postprocess_open
+                            if queued:
+                                self._handoffs += 1
+                        if queued:
+                            try:
+                                # Blocks while the hand-off queue is full
+                                with span("handoff", "queue"):
+                                    self._postprocess_queue.put((task, job, time.monotonic()))
+                            finally:
+                                with self._handoffs_done:
+                                    self._handoffs -= 1
+                                    self._handoffs_done.notify_all()
+                        else:
+                            # Stopping: the post-processing workers may be gone
+                            self._run_postprocess_job(task, job, time.monotonic(), pool=False)
+                    else:
+                        self._report_finished(task)
                         
                 except Exception as e:
+                    if active.cancel_event.is_set():
+                        print(f"DEBUG: Worker {threading.current_thread().name} stopped cancelled task {task.id}")
+                        if active.requeue:
+                            self._requeue_interrupted(task)
+                        continue
                     print(f"DEBUG: Worker {threading.current_thread().name} download failed for task {task.id}: {e}")
                     import traceback
                     traceback.print_exc()
-                    # Mark as failed
+                    kind = classify_error(e)
+                    self._record_host_result(task, kind)
+                    if self.retry_policy is not None:
+                        retry_delay = self.retry_policy.delay(kind, task.retries, retry_after(e))
+                    # Back into the queue after a back-off, or mark as failed
                     with self.lock:
-                        task.status = DownloadStatus.FAILED
                         task.error_message = str(e)
-                    
-                    if self.on_task_failed:
-                        print(f"DEBUG: Calling on_task_failed for task {task.id}")
-                        self.on_task_failed(task)
+                        task.error_kind = kind.value
+                        if kind == ErrorKind.THROTTLED:
+                            self._throttled_total += 1
+                        if retry_delay is not None:
+                            task.retries += 1
+                            task.retry_at = time.time() + retry_delay
+                            self._retries_total += 1
+                            self._set_status(task, DownloadStatus.PENDING)
+                            self._child_progress.get(task.parent_id, {}).pop(task.id, None)
+                        else:
+                            self._set_status(task, DownloadStatus.FAILED)
+                    if retry_delay is None:
+                        self.metrics.count_failure(kind.value)
+                    else:
+                        self.metrics.count_retry(kind.value)
+                    if retry_delay is None:
+                        self._report_finished(task)
+                    else:
+                        print(f"DEBUG: Retrying task {task.id} ({kind.value}) in {retry_delay:.1f}s, "
+                              f"retry {task.retries}")
+                        task.progress = 0.0
+                        self._set_bytes(task, 0, 0)
+                        self._journal_record(task)
+                        if self.on_task_retrying:
+                            self.on_task_retrying(task)
                 
                 finally:
-                    # Mark task as done
-                    print(f"DEBUG: Worker {threading.current_thread().name} marking task {task.id} as done")
-                    self.task_queue.task_done()
+                    self.metrics.add_busy("download", time.monotonic() - fetch_started)
+                    with self.lock:
+                        del self._running[task.id]
+                        released = active.released
+                        retired = active.replaced
+                        active.released = True
+                    if not released:
+                        self.bandwidth.unregister(task.id)
+                        # Mark task as done
+                        print(f"DEBUG: Worker {threading.current_thread().name} marking task {task.id} as done")
+                        self.task_queue.task_done(task)
+                    if active.delete_partial:
+                        _remove_partial_files(active.filenames)
+                    if retry_delay is not None:
+                        # Queued only now, so no other worker can pick it up
+                        # before this one has let go of it
+                        self.task_queue.put(task, delay=retry_delay)
+                    if tracer is not None:
+                        tracer.add("task", task_started, time.perf_counter(), "queue",
+                                   {"url": task.url, "status": task.status.value})
                         
             except Exception as e:
                 print(f"DEBUG: Worker {threading.current_thread().name} exception in main loop: {e}")
-                # Timeout or other error - continue processing
                 continue
         
         print(f"DEBUG: Worker thread {threading.current_thread().name} exiting")
-        
-        # Notify queue is empty
-        if self.on_queue_empty:
-            print("DEBUG: Calling on_queue_empty")
-            self.on_queue_empty()
+        if session is not None:
+            session.close()
@@ -0,0 +1,221 @@
+# src/video_downloader/retry.py
+import http.client
+import logging
+import random
+import re
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorKind(Enum):
+    TRANSIENT = "transient"  # server errors, timeouts, dropped connections: try again soon
+    THROTTLED = "throttled"  # the site refused the request rate (HTTP 429): try again later
+    PERMANENT = "permanent"  # anything else (unavailable video, 404, bad URL): do not retry
+
+
+# Statuses worth another try besides 5xx
+_TRANSIENT_STATUSES = frozenset([408, 425])
+
+# Error messages matched when no HTTP status or exception type gives the answer
+# (yt-dlp wraps most failures in DownloadError/ExtractorError with the cause in the text).
+# A bare "429" can be a title, an ID or a byte count, so it only counts in HTTP wording
+_THROTTLED = re.compile(
+    r"HTTP Error 429\b|status(?: code)?[:= ]+429\b|Too Many Requests|rate[- ]limit",
+    re.IGNORECASE,
+)
+_TRANSIENT = re.compile(
+    r"HTTP Error (?:408|5\d\d)|timed out|Connection (?:reset|refused|aborted)|Remote end closed"
+    r"|IncompleteRead|Temporary failure in name resolution|Network is unreachable"
+    r"|Service Unavailable|Bad Gateway|Gateway Time-?out",
+    re.IGNORECASE,
+)
+
+
+def _causes(exc: BaseException) -> Iterator[BaseException]:
+    """The exception and everything it wraps (__cause__, __context__, yt-dlp's exc_info and cause)."""
+    seen = set()
+    stack = [exc]
+    while stack:
+        error = stack.pop()
+        if not isinstance(error, BaseException) or id(error) in seen:
+            continue
+        seen.add(id(error))
+        yield error
+        exc_info = getattr(error, "exc_info", None)
+        if isinstance(exc_info, tuple) and len(exc_info) > 1:
+            stack.append(exc_info[1])
+        stack += [getattr(error, "cause", None), error.__context__, error.__cause__]
+
+
+def _http_status(error: BaseException) -> Optional[int]:
+    # yt-dlp's networking HTTPError has .status, urllib's HTTPError has .code
+    for name in ("status", "code"):
+        value = getattr(error, name, None)
+        if isinstance(value, int) and 100 <= value <= 599:
+            return value
+    return None
+
+
+def classify_error(exc: BaseException) -> ErrorKind:
+    """
+    Decide whether a failed download is worth retrying.
+
+    Looks through the exception chain for an HTTP status first (429 is
+    throttled, 408/5xx transient, other 4xx permanent), then for network
+    exceptions (connection errors, timeouts), then matches the error messages.
+    Anything unrecognised is permanent.
+    """
+    causes = list(_causes(exc))
+    for error in causes:
+        status = _http_status(error)
+        if status == 429:
+            return ErrorKind.THROTTLED
+        if status is not None and (status >= 500 or status in _TRANSIENT_STATUSES):
+            return ErrorKind.TRANSIENT
+        if status is not None and status >= 400:
+            return ErrorKind.PERMANENT
+    for error in causes:
+        if isinstance(error, (ConnectionError, TimeoutError, socket.timeout, http.client.IncompleteRead)):
+            return ErrorKind.TRANSIENT
+    message = " ".join(str(error) for error in causes)
+    if _THROTTLED.search(message):
+        return ErrorKind.THROTTLED
+    if _TRANSIENT.search(message):
+        return ErrorKind.TRANSIENT
+    return ErrorKind.PERMANENT
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header on an HTTP error in the chain, if any."""
+    for error in _causes(exc):
+        headers = getattr(error, "headers", None)
+        if headers is None:
+            headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers is None:
+            continue
+        try:
+            value = headers.get("Retry-After")
+        except Exception:
+            continue
+        if value is not None and str(value).strip().isdigit():
+            return float(str(value).strip())
+    return None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    How often and how long after a failure a download is tried again.
+
+    Retry n (counting from 0) waits ``base_delay * 2**n`` seconds, or
+    ``throttle_delay * 2**n`` after throttling, capped at ``max_delay``. The
+    last ``jitter`` fraction of the wait is random, so tasks that failed
+    together do not all come back at the same moment. A Retry-After header
+    sent by the site is honoured (up to ``max_delay``).
+
+    ``failure_threshold`` and ``cooldown`` configure the CircuitBreaker a
+    DownloadQueueManager builds from the policy.
+    """
+    max_retries: int = 3  # retries after the first attempt; 0 disables retrying
+    base_delay: float = 2.0
+    throttle_delay: float = 15.0
+    max_delay: float = 300.0
+    jitter: float = 0.5
+    failure_threshold: int = 5  # consecutive failures that pause a host; 0 never pauses
+    cooldown: float = 30.0  # seconds a host is paused the first time
+
+    def delay(self, kind: ErrorKind, retries: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt, or None if the task should fail.
+
+        :param kind: Classification of the error
+        :param retries: Retries made so far
+        :param retry_after: Delay the site asked for, if any
+        """
+        if kind == ErrorKind.PERMANENT or retries >= self.max_retries:
+            return None
+        base = self.throttle_delay if kind == ErrorKind.THROTTLED else self.base_delay
+        delay = min(self.max_delay, base * 2 ** retries)
+        delay -= random.uniform(0, delay * self.jitter)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker over transient and throttled failures.
+
+    After ``failure_threshold`` such failures in a row from one host (a success
+    resets the count), ``record_failure`` returns a cool-down: the caller stops
+    dispatching to that host for that long, then lets a single download through
+    as a probe. A probe that fails opens the circuit again with twice the
+    cool-down (up to ``max_cooldown``); a success closes it. Failures reported
+    while the circuit is open (downloads started before it opened) are ignored.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0, max_cooldown: float = 600.0):
+        """
+        :param failure_threshold: Consecutive failures that open the circuit
+        :param cooldown: Seconds the host is paused the first time
+        :param max_cooldown: Upper bound of the doubled cool-down
+        """
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.lock = threading.Lock()
+        self._failures: Dict[str, int] = {}  # host -> consecutive failures
+        self._trips: Dict[str, int] = {}  # host -> times opened since the last success
+        self._open_until: Dict[str, float] = {}  # host -> monotonic end of the cool-down
+
+    def record_failure(self, host: str) -> Optional[float]:
+        """Count a transient or throttled failure; returns the cool-down if the circuit opens."""
+        with self.lock:
+            if time.monotonic() < self._open_until.get(host, 0.0):
+                return None
+            failures = self._failures.get(host, 0) + 1
+            if failures < self.failure_threshold:
+                self._failures[host] = failures
+                return None
+            # Open; the next failure (the probe's) opens it again right away
+            self._failures[host] = self.failure_threshold - 1
+            trips = self._trips[host] = self._trips.get(host, 0) + 1
+            cooldown = min(self.max_cooldown, self.cooldown * 2 ** (trips - 1))
+            self._open_until[host] = time.monotonic() + cooldown
+        logger.warning(f"Circuit open for {host}: pausing downloads for {cooldown:.1f}s")
+        return cooldown
+
+    def record_success(self, host: str) -> bool:
+        """Reset the host's failure count; returns True if its circuit had opened."""
+        with self.lock:
+            self._failures.pop(host, None)
+            self._open_until.pop(host, None)
+            opened = self._trips.pop(host, None) is not None
+        if opened:
+            logger.info(f"Circuit closed for {host}")
+        return opened
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Consecutive failures, times opened and remaining cool-down per host."""
+        now = time.monotonic()
+        with self.lock:
+            hosts = set(self._failures) | set(self._trips)
+            return {
+                host: {
+                    "failures": self._failures.get(host, 0),
+                    "trips": self._trips.get(host, 0),
+                    "open_for": round(max(0.0, self._open_until.get(host, 0.0) - now), 1),
+                }
+                for host in hosts
+            }
@@ -0,0 +1,236 @@
+# src/video_downloader/scheduler.py
+import functools
+import heapq
+import itertools
+import threading
+import time
+from queue import Empty
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+
+@functools.lru_cache(maxsize=1024)
+def _host_of_netloc(prefix: str) -> str:
+    host = (urlsplit(prefix).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host
+
+
+def host_of(url: str) -> str:
+    """Get the host a URL downloads from, used to group per-host limits."""
+    # Only the scheme://netloc prefix matters; it repeats across a playlist's entries
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        return _host_of_netloc(url)
+    netloc = rest.split("/", 1)[0].split("?", 1)[0].split("#", 1)[0]
+    return _host_of_netloc(f"{scheme}://{netloc}")
+
+
+class TaskScheduler:
+    """
+    Priority queue of download tasks with per-host concurrency limits.
+
+    Higher ``task.priority`` runs first. Ordering is starvation-free: a task's
+    sort key is its enqueue time minus ``priority * aging_interval`` seconds, so
+    a waiting task eventually overtakes newer tasks of any priority. Tasks whose
+    host already has ``max_per_host`` downloads running are held back while
+    tasks for other hosts are handed out.
+
+    A task can be put with a ``delay`` (a retry waiting out its back-off); it is
+    held back until then without occupying a worker. A host can be paused
+    (``pause_host``): none of its tasks are handed out until the pause ends,
+    then only one at a time until ``resume_host`` is called.
+
+    The interface mirrors ``queue.Queue`` (``put``/``get``/``task_done``), except
+    that ``task_done`` takes the finished task so its host slot can be freed.
+    Workers are stopped with sentinels: after ``put_sentinels(n)`` the next n
+    calls to ``get`` return None, ahead of any queued task.
+    """
+
+    def __init__(self, max_per_host: Optional[int] = None, aging_interval: float = 30.0):
+        self.max_per_host = max_per_host
+        self.aging_interval = aging_interval
+        self.cond = threading.Condition()
+        self._heaps: Dict[str, list] = {}  # host -> heap of entries
+        self._entries: Dict[str, list] = {}  # task id -> live heap entry
+        self._running: Dict[str, int] = {}  # host -> downloads in progress
+        self._delayed: list = []  # heap of (ready time, tie-breaker, entry)
+        self._paused: Dict[str, float] = {}  # host -> monotonic end of its pause
+        self._seq = itertools.count()
+        self._sentinels = 0  # undelivered stop signals
+
+    def _push(self, task, enqueued: float, ready: float = 0.0):
+        host = host_of(task.url)
+        key = enqueued - task.priority * self.aging_interval
+        # [sort key, tie-breaker, enqueue time, host, task, valid, ready time]
+        entry = [key, next(self._seq), enqueued, host, task, True, ready]
+        if ready > time.monotonic():
+            heapq.heappush(self._delayed, (ready, entry[1], entry))
+        else:
+            heapq.heappush(self._heaps.setdefault(host, []), entry)
+        self._entries[task.id] = entry
+
+    def put(self, task, delay: float = 0.0):
+        """
+        Add a task to the queue.
+
+        :param delay: Seconds before the task may be handed out
+        """
+        with self.cond:
+            now = time.monotonic()
+            self._push(task, now, now + delay if delay > 0 else 0.0)
+            self.cond.notify()
+
+    def put_many(self, tasks: Iterable):
+        """Add several tasks at once (e.g. playlist entries or a restored journal)."""
+        with self.cond:
+            now = time.monotonic()
+            touched = set()
+            for task in tasks:
+                host = host_of(task.url)
+                entry = [now - task.priority * self.aging_interval, next(self._seq), now, host, task, True, 0.0]
+                self._heaps.setdefault(host, []).append(entry)
+                self._entries[task.id] = entry
+                touched.add(host)
+            # One heapify per host is cheaper than a push per task
+            for host in touched:
+                heapq.heapify(self._heaps[host])
+            self.cond.notify_all()
+
+    def reprioritize(self, task_id: str, priority: int) -> bool:
+        """Change the priority of a queued task. Returns False if it is not queued."""
+        with self.cond:
+            entry = self._entries.get(task_id)
+            if entry is None:
+                return False
+            entry[5] = False  # lazily dropped when it reaches the top of its heap
+            task = entry[4]
+            task.priority = priority
+            self._push(task, entry[2], entry[6])
+            self.cond.notify()
+            return True
+
+    def put_sentinels(self, count: int = 1):
+        """Make the next ``count`` calls to ``get`` return None (tells workers to exit)."""
+        with self.cond:
+            self._sentinels += count
+            self.cond.notify_all()
+
+    def withdraw_sentinels(self, count: Optional[int] = None) -> int:
+        """Take back up to ``count`` (default: all) undelivered sentinels; returns how many."""
+        with self.cond:
+            withdrawn = self._sentinels if count is None else min(count, self._sentinels)
+            self._sentinels -= withdrawn
+            return withdrawn
+
+    def pause_host(self, host: str, seconds: float):
+        """Hand out no task for ``host`` for ``seconds``, then one at a time until resumed."""
+        with self.cond:
+            self._paused[host] = time.monotonic() + seconds
+
+    def resume_host(self, host: str):
+        """Lift a pause on ``host``."""
+        with self.cond:
+            if self._paused.pop(host, None) is not None:
+                self.cond.notify_all()
+
+    def paused_hosts(self) -> Dict[str, float]:
+        """Paused hosts and the seconds left of their pause (0 while probing)."""
+        now = time.monotonic()
+        with self.cond:
+            return {host: max(0.0, until - now) for host, until in self._paused.items()}
+
+    def _has_capacity(self, host: str, now: float) -> bool:
+        until = self._paused.get(host)
+        if until is not None and (now < until or self._running.get(host, 0)):
+            return False
+        return self.max_per_host is None or self._running.get(host, 0) < self.max_per_host
+
+    def _release_delayed(self, now: float):
+        """Move delayed entries whose time has come into their host's heap."""
+        delayed = self._delayed
+        while delayed and delayed[0][0] <= now:
+            entry = heapq.heappop(delayed)[2]
+            if entry[5]:
+                heapq.heappush(self._heaps.setdefault(entry[3], []), entry)
+
+    def _next_wakeup(self, now: float) -> Optional[float]:
+        """When the next delayed entry or host pause comes due, if ever."""
+        times = [until for until in self._paused.values() if until > now]
+        if self._delayed:
+            times.append(self._delayed[0][0])
+        return min(times) if times else None
+
+    def _next_entry(self, now: float):
+        """Find the best queued entry whose host has a free slot."""
+        best = None
+        for host in list(self._heaps):
+            heap = self._heaps[host]
+            while heap and not heap[0][5]:
+                heapq.heappop(heap)
+            if not heap:
+                del self._heaps[host]
+                continue
+            if self._has_capacity(host, now) and (best is None or heap[0][:2] < best[:2]):
+                best = heap[0]
+        return best
+
+    def get(self, timeout: Optional[float] = None):
+        """
+        Remove and return the next runnable task, blocking until one is available.
+        Returns None instead when a sentinel is pending.
+
+        :raises queue.Empty: If no task became runnable within ``timeout`` seconds
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.cond:
+            while True:
+                if self._sentinels:
+                    self._sentinels -= 1
+                    return None
+                now = time.monotonic()
+                self._release_delayed(now)
+                entry = self._next_entry(now)
+                if entry is not None:
+                    host = entry[3]
+                    heapq.heappop(self._heaps[host])
+                    del self._entries[entry[4].id]
+                    self._running[host] = self._running.get(host, 0) + 1
+                    return entry[4]
+                remaining = None if deadline is None else deadline - now
+                if remaining is not None and remaining <= 0:
+                    raise Empty
+                # Wake up for the next delayed task or the end of a pause
+                wakeup = self._next_wakeup(now)
+                if wakeup is not None:
+                    remaining = wakeup - now if remaining is None else min(remaining, wakeup - now)
+                self.cond.wait(remaining)
+
+    def task_done(self, task):
+        """Free the host slot held by a task returned from ``get``."""
+        with self.cond:
+            host = host_of(task.url)
+            count = self._running.get(host, 0) - 1
+            if count > 0:
+                self._running[host] = count
+            else:
+                self._running.pop(host, None)
+            self.cond.notify()
+
+    def has_runnable(self) -> bool:
+        """Whether a queued task could be handed out now (not held back by its host or a delay)."""
+        with self.cond:
+            now = time.monotonic()
+            self._release_delayed(now)
+            return self._next_entry(now) is not None
+
+    def qsize(self) -> int:
+        """Number of queued (not yet running) tasks."""
+        with self.cond:
+            return len(self._entries)
+
+    def running_by_host(self) -> Dict[str, int]:
+        """Downloads in progress per host."""
+        with self.cond:
+            return dict(self._running)
@@ -0,0 +1,126 @@
+# src/video_downloader/session.py
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Options consumed while a YoutubeDL instance is being constructed. Tasks that
+# differ in any of these need their own instance; everything else is read from
+# ``ydl.params`` at download time and can be overridden per task.
+CONSTRUCTION_OPTIONS = (
+    "postprocessors",
+    "quiet",
+    "no_warnings",
+    "verbose",
+    "cookiefile",
+    "cookiesfrombrowser",
+    "proxy",
+    "http_headers",
+    "impersonate",
+    "download_archive",
+    "restrictfilenames",
+)
+
+
+class YoutubeDLSession:
+    """
+    Long-lived YoutubeDL instances reused across tasks.
+
+    Reusing an instance keeps extractor initialisation, the cookie jar and open
+    HTTP connections alive between tasks. A session is meant to be owned by a
+    single worker thread; it is not safe to run two tasks on it concurrently.
+    """
+
+    def __init__(self):
+        self._instances = {}  # construction key -> YoutubeDL
+        self._base_params = {}  # construction key -> params shared by every task
+        self._format_selectors = {}  # (construction key, format) -> selector
+        self._progress_hooks = []  # hooks of the task currently using the session
+        self._postprocessor_hooks = []
+        self.tasks_served = 0
+
+    def _dispatch_progress(self, data):
+        for hook in self._progress_hooks:
+            hook(data)
+
+    def _dispatch_postprocessor(self, data):
+        for hook in self._postprocessor_hooks:
+            hook(data)
+
+    def acquire(self, ydl_opts):
+        """
+        Get a YoutubeDL configured for one task.
+
+        :param ydl_opts: The task's full YoutubeDL options
+        :return: A YoutubeDL instance; do not close it, the session owns it
+        """
+        key = json.dumps(
+            {name: ydl_opts.get(name) for name in CONSTRUCTION_OPTIONS},
+            sort_keys=True,
+            default=str,
+        )
+        task_params = {
+            name: value for name, value in ydl_opts.items()
+            if name not in CONSTRUCTION_OPTIONS and name not in ("progress_hooks", "postprocessor_hooks")
+        }
+
+        ydl = self._instances.get(key)
+        if ydl is None:
+            import yt_dlp  # deferred: see the note in downloader.py
+
+            # yt-dlp registers hooks at construction, so the instance gets
+            # dispatchers that forward to whichever task is using it
+            ydl = yt_dlp.YoutubeDL(dict(ydl_opts, progress_hooks=[], postprocessor_hooks=[]))
+            ydl.add_progress_hook(self._dispatch_progress)
+            ydl.add_postprocessor_hook(self._dispatch_postprocessor)
+            self._instances[key] = ydl
+            # Remember the params without this task's overrides, so options set
+            # by one task never leak into the next
+            self._base_params[key] = {
+                name: value for name, value in ydl.params.items()
+                if name not in task_params or name == "outtmpl"
+            }
+        else:
+            # Reset to the shared params and apply this task's overrides in place;
+            # downloaders read ydl.params by reference
+            outtmpl = task_params.pop("outtmpl", None)
+            ydl.params.clear()
+            ydl.params.update(self._base_params[key])
+            ydl.params.update(task_params)
+            if outtmpl is not None:
+                templates = dict(ydl.params.get("outtmpl") or {})
+                templates.update(outtmpl if isinstance(outtmpl, dict) else {"default": outtmpl})
+                ydl.params["outtmpl"] = templates
+
+            format_spec = task_params.get("format")
+            if format_spec in (None, "-") or callable(format_spec):
+                ydl.format_selector = format_spec
+            else:
+                selector = self._format_selectors.get((key, format_spec))
+                if selector is None:
+                    selector = ydl.build_format_selector(format_spec)
+                    self._format_selectors[(key, format_spec)] = selector
+                ydl.format_selector = selector
+
+        self._progress_hooks = list(ydl_opts.get("progress_hooks") or [])
+        self._postprocessor_hooks = list(ydl_opts.get("postprocessor_hooks") or [])
+        self.tasks_served += 1
+        return ydl
+
+    def release(self):
+        """Detach the current task's hooks once its download has finished."""
+        self._progress_hooks = []
+        self._postprocessor_hooks = []
+
+    def close(self):
+        """Close all instances, saving cookies and closing network connections."""
+        for ydl in self._instances.values():
+            try:
+                ydl.close()
+            except Exception as e:
+                logger.warning(f"Failed to close downloader session: {e}")
+        self._instances.clear()
+        self._base_params.clear()
+        self._format_selectors.clear()
+        self._progress_hooks = []
+        self._postprocessor_hooks = []
@@ -0,0 +1,193 @@
+# src/video_downloader/tracing.py
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+class Tracer:
+    """
+    Records timed spans for export as Chrome trace JSON.
+
+    Spans land in a bounded buffer (the oldest are dropped past
+    ``max_events``) tagged with the recording thread and the task bound to it
+    (``bind_task``). ``export()`` returns the Chrome trace event format, which
+    chrome://tracing and https://ui.perfetto.dev open as a timeline with one
+    track per worker thread.
+    """
+
+    def __init__(self, max_events: int = 1_000_000):
+        """:param max_events: Spans kept; older ones are dropped"""
+        self.pid = os.getpid()
+        self._events = deque(maxlen=max_events)  # (name, cat, start, end, tid, args)
+        self._thread_names: Dict[int, str] = {}
+
+    def add(self, name: str, start: float, end: float, cat: str = "download",
+            args: Optional[Dict[str, Any]] = None, tid: Optional[int] = None):
+        """
+        Record a finished span.
+
+        :param start: ``time.perf_counter()`` when it began
+        :param end: ``time.perf_counter()`` when it ended
+        :param args: Extra fields shown with the span; the bound task ID is added
+        :param tid: Thread to show it on (default: the calling thread)
+        """
+        if tid is None:
+            thread = threading.current_thread()
+            tid = thread.ident
+            if tid not in self._thread_names:
+                self._thread_names[tid] = thread.name
+        task_id = getattr(_local, "task_id", None)
+        if task_id is not None:
+            args = dict(args, task=task_id) if args else {"task": task_id}
+        self._events.append((name, cat, start, end, tid, args))
+
+    def __len__(self):
+        return len(self._events)
+
+    def export(self) -> Dict[str, Any]:
+        """The recorded spans as a Chrome trace (``{"traceEvents": [...]}``)."""
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+            for tid, name in list(self._thread_names.items())
+        ]
+        for name, cat, start, end, tid, args in list(self._events):
+            event = {
+                "name": name, "cat": cat, "ph": "X", "pid": self.pid, "tid": tid,
+                "ts": round(start * 1e6, 1), "dur": round((end - start) * 1e6, 1),
+            }
+            if args:
+                event["args"] = args
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def save(self, path: str):
+        """Write ``export()`` to a JSON file."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.export(), f, default=str)
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer: Tracer, name: str, cat: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.add(self.name, self.start, time.perf_counter(), self.cat, self.args)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+_local = threading.local()
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Get the process-wide tracer, or None while tracing is off (the default)."""
+    return _tracer
+
+
+def set_tracer(tracer: Optional[Tracer]):
+    """Start recording spans into ``tracer``; None turns tracing off."""
+    global _tracer
+    with _tracer_lock:
+        _tracer = tracer
+
+
+def span(name: str, cat: str = "download", **args):
+    """
+    Context manager timing a block as a span of the process-wide tracer.
+
+    With tracing off this returns a shared no-op context manager, so an
+    instrumented block costs one global lookup.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NO_SPAN
+    return _Span(tracer, name, cat, args)
+
+
+def bind_task(task_id: Optional[str]):
+    """Tag the spans recorded on this thread with a task ID (None to stop)."""
+    _local.task_id = task_id
+
+
+class DownloadPhases:
+    """
+    Spans for the phases yt-dlp runs inside one ``process_ie_result`` call.
+
+    ``progress_hook`` and ``postprocessor_hook`` go into the yt-dlp options;
+    ``processing()`` is called right before processing starts. Records
+    ``select_formats`` (processing start to the first byte), one ``transfer``
+    per downloaded file and one span per yt-dlp postprocessor (``merge`` for
+    the merger), all on the thread that created the object.
+    """
+
+    _NAMES = {"Merger": "merge"}
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self.tid = threading.get_ident()
+        self._task_id = getattr(_local, "task_id", None)
+        self._selecting: Optional[float] = None
+        self._transfers: Dict[str, float] = {}  # file name -> start
+        self._postprocessors: Dict[str, float] = {}  # postprocessor -> start
+
+    def _add(self, name, start, args):
+        if self._task_id is not None:
+            args["task"] = self._task_id
+        self.tracer.add(name, start, time.perf_counter(), "download", args, tid=self.tid)
+
+    def processing(self):
+        self._selecting = time.perf_counter()
+
+    def progress_hook(self, d: Dict[str, Any]):
+        filename = d.get("filename")
+        if d["status"] == "downloading":
+            if filename not in self._transfers:
+                now = self._transfers[filename] = time.perf_counter()
+                if self._selecting is not None:
+                    start, self._selecting = self._selecting, None
+                    self.tracer.add("select_formats", start, now, "download",
+                                    {"task": self._task_id} if self._task_id else None, tid=self.tid)
+        elif d["status"] in ("finished", "error"):
+            start = self._transfers.pop(filename, None)
+            if start is not None:
+                self._add("transfer", start, {
+                    "file": os.path.basename(filename or ""),
+                    "bytes": d.get("total_bytes") or d.get("downloaded_bytes"),
+                    "status": d["status"],
+                })
+
+    def postprocessor_hook(self, d: Dict[str, Any]):
+        name = d.get("postprocessor")
+        if d.get("status") == "started":
+            self._postprocessors[name] = time.perf_counter()
+        elif d.get("status") == "finished":
+            start = self._postprocessors.pop(name, None)
+            if start is not None:
+                self._add(self._NAMES.get(name, name), start, {"postprocessor": name})